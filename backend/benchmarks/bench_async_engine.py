@@ -0,0 +1,90 @@
+"""
+Benchmark: many concurrent film scrapes on the async scraping engine.
+
+Starts --films film scrapes at once (details plus 30 review pages each)
+against the local Letterboxd stub, both as coroutines gathered on the engine
+and as sync calls from a thread per film (how the Flask views use it), and
+reports wall time and the number of live threads.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_engine --films 20 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.helpers import http_client
+from src.helpers.scrapers import (
+    movie_details_scraper,
+    movie_details_scraper_async,
+    scrape_reviews,
+    scrape_reviews_async,
+)
+from benchmarks.stub_letterboxd import StubLetterboxd, redirect_requests
+
+
+def film_url(i):
+    """A distinct film URL per concurrent scrape."""
+    return f"https://letterboxd.com/film/film-{i}/"
+
+
+async def scrape_film_async(i, workers):
+    """The scraping performed by one /movie_details call, as a coroutine."""
+    return await asyncio.gather(
+        movie_details_scraper_async(film_url(i)),
+        scrape_reviews_async(film_url(i), n=30, max_workers=workers),
+    )
+
+
+def scrape_film_sync(i, workers):
+    """The scraping performed by one /movie_details call, from a thread."""
+    movie_details_scraper(film_url(i))
+    return scrape_reviews(film_url(i), n=30, max_workers=workers)
+
+
+def run_async(films, workers):
+    """Gathers every film scrape on the engine; returns (seconds, threads)."""
+    async def scrape_all():
+        return await asyncio.gather(*(scrape_film_async(i, workers) for i in range(films)))
+
+    start = time.perf_counter()
+    http_client.run(scrape_all())
+    return time.perf_counter() - start, threading.active_count()
+
+
+def run_threads(films, workers):
+    """Runs each film scrape on its own thread; returns (seconds, peak threads)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=films) as executor:
+        futures = [executor.submit(scrape_film_sync, i, workers) for i in range(films)]
+        threads = threading.active_count()
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start, threads
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--films", type=int, default=20, help="concurrent film scrapes")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency (s)")
+    parser.add_argument("--workers", type=int, default=8, help="pages in flight per film")
+    args = parser.parse_args()
+
+    with StubLetterboxd(latency=args.latency) as stub:
+        with redirect_requests(stub):
+            print(f"{args.films} concurrent film scrapes, latency={args.latency * 1000:.0f}ms, "
+                  f"global limit={http_client.MAX_CONCURRENT_REQUESTS} requests")
+            print(f"{'mode':<22} {'time (s)':>9} {'threads':>8} {'pages':>6}")
+            for mode, run in (("coroutines on engine", run_async),
+                              ("thread per film", run_threads)):
+                stub.reset_counters()
+                seconds, threads = run(args.films, args.workers)
+                print(f"{mode:<22} {seconds:>9.3f} {threads:>8} {len(stub.requests):>6}")
+
+
+if __name__ == "__main__":
+    main()
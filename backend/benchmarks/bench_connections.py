@@ -0,0 +1,71 @@
+"""
+Benchmark: TCP/TLS connections opened per API request, before and after pooling.
+
+Replays the scraping done by /movie_details and /roast against a local TLS
+Letterboxd stub and counts the connections the stub accepts, once with a
+throwaway client per page (the old behaviour) and once through the shared
+client.
+
+Usage (from backend/):
+    python -m benchmarks.bench_connections --requests 3
+"""
+
+import argparse
+import time
+
+from src.helpers.scrapers import movie_details_scraper, scrape_reviews
+from src.helpers.scrapers_roast import scrape_user_reviews, scrape_user_stats
+from benchmarks.stub_letterboxd import StubLetterboxd, redirect_requests
+
+FILM_URL = "https://letterboxd.com/film/the-brutalist/"
+USERNAME = "someuser"
+
+
+def movie_details_request():
+    """The scraping performed by one /movie_details call."""
+    movie_details_scraper(FILM_URL)
+    scrape_reviews(FILM_URL, n=30, max_workers=8)
+
+
+def roast_request():
+    """The scraping performed by one /roast call."""
+    scrape_user_reviews(USERNAME, n_pages=10)
+    scrape_user_stats(USERNAME)
+
+
+def measure(stub, endpoint, pooled, n_requests):
+    """Returns (pages, connections, seconds) per request for an endpoint."""
+    with redirect_requests(stub, pooled=pooled):
+        stub.reset_counters()
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            endpoint()
+        elapsed = time.perf_counter() - start
+    return (
+        len(stub.requests) / n_requests,
+        stub.connections / n_requests,
+        elapsed / n_requests,
+    )
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency (s)")
+    parser.add_argument("--requests", type=int, default=3, help="API requests per mode")
+    args = parser.parse_args()
+
+    endpoints = {"/movie_details": movie_details_request, "/roast": roast_request}
+
+    with StubLetterboxd(latency=args.latency, tls=True) as stub:
+        print(f"TLS stub, latency={args.latency * 1000:.0f}ms, "
+              f"{args.requests} API requests per mode (per-request averages)")
+        print(f"{'endpoint':<15} {'mode':<10} {'pages':>6} {'conns':>6} {'time (s)':>9}")
+        for name, endpoint in endpoints.items():
+            for mode, pooled in (("before", False), ("after", True)):
+                pages, conns, seconds = measure(stub, endpoint, pooled, args.requests)
+                print(f"{name:<15} {mode:<10} {pages:>6.0f} {conns:>6.1f} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: summary prompt size, latency and coverage, raw vs extractive input.
+
+Builds the reviews of a popular film as select_reviews would pass them on,
+then generates the summary with SUMMARY_INPUT=raw and with extractive input
+at several word targets. Gemini is replaced by the stub model, whose latency
+grows with the prompt size. Since the stub cannot judge summaries, quality is
+approximated by coverage: the cosine similarity between the TF-IDF centroid
+of all review sentences and that of the sentences sent to the model.
+
+Usage (from backend/):
+    python -m benchmarks.bench_extractive_summary --targets 1000 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+
+from src.helpers.extractive_summary import (
+    centroid,
+    cosine,
+    extractive_summary,
+    split_sentences,
+    tfidf_vectors,
+)
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+from benchmarks.stub_gemini import add_latency_arguments, stub_gemini
+from benchmarks.stub_letterboxd import varied_review_text
+
+
+def film_reviews_text(n=300, seed=0):
+    """Returns read_reviews output for n reviews of one to six sentences."""
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(n):
+        sentences = [
+            varied_review_text(i * 10 + s, rng.choice((5, 9, 14, 22))).capitalize() + "."
+            for s in range(rng.randint(1, 6))
+        ]
+        reviews.append({"review_text": " ".join(sentences)})
+    return LetterboxdReviewAnalyzer().read_reviews(reviews)
+
+
+def coverage(reviews, summary_input):
+    """Returns the cosine similarity of the input's centroid to the reviews' centroid."""
+    sentences = [sentence for _, sentence in split_sentences(reviews)]
+    picked = {sentence for _, sentence in split_sentences(summary_input)}
+    vectors = tfidf_vectors(sentences)
+    return cosine(
+        centroid(vectors),
+        centroid([v for s, v in zip(sentences, vectors) if s in picked]),
+    )
+
+
+def measure(analyzer, reviews, mode, target, runs, **stub_options):
+    """Returns the mean prompt tokens and the median summary latency for a mode."""
+    latencies = []
+    with stub_gemini(**stub_options) as prompt_tokens, redirect_stdout(StringIO()), \
+            patch("src.helpers.letterboxd_analyzers.SUMMARY_INPUT", mode), \
+            patch("src.helpers.letterboxd_analyzers.EXTRACTIVE_TARGET_WORDS", target):
+        for _ in range(runs):
+            start = time.perf_counter()
+            analyzer.generate_summary(reviews, "key")
+            latencies.append(time.perf_counter() - start)
+    return statistics.mean(prompt_tokens), statistics.median(latencies)
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reviews", type=int, default=300)
+    parser.add_argument("--targets", type=int, nargs="+", default=[1500, 1000, 500],
+                        help="EXTRACTIVE_TARGET_WORDS values to compare")
+    parser.add_argument("--runs", type=int, default=3)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    analyzer = LetterboxdReviewAnalyzer()
+    reviews = film_reviews_text(args.reviews)
+    stub_options = {"latency": args.latency, "latency_per_1k_tokens": args.latency_per_1k}
+    print(f"{args.reviews} reviews, {len(reviews.split())} words, stub Gemini "
+          f"{args.latency * 1000:.0f}ms + {args.latency_per_1k * 1000:.0f}ms per 1k tokens")
+    print(f"{'input':<18} {'words':>6} {'prompt tokens':>14} {'extract (ms)':>13} "
+          f"{'latency (s)':>12} {'coverage':>9}")
+
+    tokens, latency = measure(analyzer, reviews, "raw", 0, args.runs, **stub_options)
+    print(f"{'raw':<18} {len(reviews.split()):>6} {tokens:>14.0f} {0:>13.1f} "
+          f"{latency:>12.2f} {1:>9.3f}")
+    for target in args.targets:
+        start = time.perf_counter()
+        summary_input = extractive_summary(reviews, target)
+        extract_ms = (time.perf_counter() - start) * 1000
+        tokens, latency = measure(analyzer, reviews, "extractive", target, args.runs,
+                                  **stub_options)
+        print(f"{f'extractive {target}':<18} {len(summary_input.split()):>6} {tokens:>14.0f} "
+              f"{extract_ms:>13.1f} {latency:>12.2f} "
+              f"{coverage(reviews, summary_input):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: time and prompt savings of near-duplicate review collapsing.
+
+Generates film reviews in which a share are meme one-liners ("peak", emoji
+strings) and lightly edited copies of other reviews, then times
+collapse_near_duplicates on growing review counts. Reports the reviews left
+after exact-text deduplication and after near-duplicate collapsing, and the
+estimated prompt tokens of each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_near_duplicates --sizes 1000 5000 20000
+"""
+
+import argparse
+import random
+import time
+
+from src.helpers.near_duplicates import collapse_near_duplicates
+from src.helpers.review_selection import estimate_tokens
+from benchmarks.stub_letterboxd import varied_review_text
+
+MEMES = ("peak", "PEAK.", "peak cinema", "ok", "😭😭😭", "😭😭", "mid", "Mid.",
+         "masterpiece", "masterpiece!!", "10/10", "i need to lie down")
+
+
+def generate_reviews(n, duplicate_share, seed=0):
+    """Returns n reviews of which about duplicate_share are memes or edited copies."""
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < duplicate_share / 2:
+            text = rng.choice(MEMES)
+        elif roll < duplicate_share and reviews:
+            text = rng.choice(reviews)["review_text"] + rng.choice(("", " 10/10", "!!", " ok"))
+        else:
+            text = varied_review_text(i, rng.choice((6, 20, 45, 120)))
+        reviews.append({"rating": "★★★", "review_text": text})
+    return reviews
+
+
+def prompt_tokens(reviews):
+    """Estimates the tokens of the joined reviews."""
+    return estimate_tokens(" >>>".join(r["review_text"] for r in reviews))
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--duplicates", type=float, default=0.3,
+                        help="share of meme and copied reviews")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'reviews':>8} {'exact':>7} {'near':>7} {'tokens':>8} {'exact':>8} "
+          f"{'near':>8} {'time (ms)':>10}")
+    for size in args.sizes:
+        reviews = generate_reviews(size, args.duplicates)
+        exact = list({r["review_text"]: r for r in reviews}.values())
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            kept = collapse_near_duplicates(reviews)
+            timings.append(time.perf_counter() - start)
+        print(f"{size:>8} {len(exact):>7} {len(kept):>7} {prompt_tokens(reviews):>8} "
+              f"{prompt_tokens(exact):>8} {prompt_tokens(kept):>8} "
+              f"{min(timings) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: parse time and peak memory per page for each HTML parser backend.
+
+Parses canned Letterboxd pages (the same ones the stub server serves) with
+every installed backend, running the scrapers' real extraction code, and
+reports the mean time per page and the peak Python allocation measured with
+tracemalloc. Allocations made inside C libraries such as libxml2 are not
+visible to tracemalloc, so the memory column covers the Python-side tree.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parsers --iterations 50
+"""
+
+import argparse
+from unittest.mock import patch
+
+from src.helpers.parsers import available_backends, make_soup
+from src.helpers.scrapers import parse_review_page, parse_movie_details
+from src.helpers.scrapers_roast import parse_user_reviews_page
+from benchmarks.stub_letterboxd import (
+    film_reviews_page,
+    film_details_page,
+    user_reviews_page,
+    user_stats_page,
+    measure_parse,
+)
+
+
+def parse_user_stats(html_content):
+    """Extracts the statistics headings like scrape_user_stats does."""
+    soup = make_soup(html_content)
+    return soup.find_all("h4", class_="yir-member-statistic statistic")
+
+
+PAGES = {
+    "film reviews": (film_reviews_page(3, 30), parse_review_page),
+    "film details": (film_details_page("the-brutalist"), parse_movie_details),
+    "user reviews": (user_reviews_page(2, 10), parse_user_reviews_page),
+    "user stats": (user_stats_page(), parse_user_stats),
+}
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50, help="parses per page")
+    args = parser.parse_args()
+
+    print(f"{'page':<14} {'size (KB)':>9} {'backend':<12} {'ms/page':>8} {'peak KB':>8}")
+    for name, (html_content, parse) in PAGES.items():
+        for backend in available_backends():
+            with patch("src.helpers.parsers.HTML_PARSER", backend):
+                elapsed, peak = measure_parse(parse, html_content, args.iterations)
+            print(f"{name:<14} {len(html_content.encode()) / 1024:>9.1f} {backend:<12} "
+                  f"{elapsed * 1000:>8.2f} {peak / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
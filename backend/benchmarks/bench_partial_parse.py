@@ -0,0 +1,61 @@
+"""
+Benchmark: full versus partial (SoupStrainer) parsing of review pages.
+
+Parses every page of the test fixture corpus with PARTIAL_PARSE off and on,
+for each installed parser backend, and reports the mean parse time and the
+peak Python allocation measured with tracemalloc. Allocations made inside C
+libraries such as libxml2 are not visible to tracemalloc, so the memory
+column covers the BeautifulSoup tree, which is what the strainer shrinks.
+
+Usage (from backend/):
+    python -m benchmarks.bench_partial_parse --iterations 50
+"""
+
+import argparse
+import os
+from unittest.mock import patch
+
+from src.helpers.parsers import available_backends
+from src.helpers.scrapers import parse_review_page
+from src.helpers.scrapers_roast import parse_user_reviews_page
+from benchmarks.stub_letterboxd import measure_parse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tests", "fixtures")
+
+
+def parser_for(name):
+    """Returns the scraper parse function for a fixture page."""
+    return parse_user_reviews_page if name.startswith("user_") else parse_review_page
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50, help="parses per page")
+    args = parser.parse_args()
+
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), encoding="utf-8") as fixture:
+                pages[name] = fixture.read()
+
+    print(f"{'page':<30} {'backend':<12} {'full ms':>8} {'part ms':>8} "
+          f"{'full KB':>8} {'part KB':>8} {'mem saved':>9}")
+    for name, html_content in pages.items():
+        for backend in available_backends():
+            results = {}
+            for partial in (False, True):
+                with patch("src.helpers.parsers.HTML_PARSER", backend), \
+                        patch("src.helpers.parsers.PARTIAL_PARSE", partial):
+                    results[partial] = measure_parse(
+                        parser_for(name), html_content, args.iterations
+                    )
+            (full_time, full_peak), (part_time, part_peak) = results[False], results[True]
+            print(f"{name:<30} {backend:<12} {full_time * 1000:>8.2f} {part_time * 1000:>8.2f} "
+                  f"{full_peak / 1024:>8.0f} {part_peak / 1024:>8.0f} "
+                  f"{1 - part_peak / full_peak:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
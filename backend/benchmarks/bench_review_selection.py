@@ -0,0 +1,86 @@
+"""
+Benchmark: prompt size and Gemini latency with and without review selection.
+
+Builds the reviews of a popular film (30 pages of 12 reviews, with a realistic
+share of empty, duplicated and very long reviews), then runs get_results on
+the joined reviews as-is and after select_reviews at several token budgets.
+Gemini is replaced by the stub model, whose latency grows with the prompt
+size; reported prompt tokens are estimates (see review_selection).
+
+Usage (from backend/):
+    python -m benchmarks.bench_review_selection --budgets 8000 4000
+"""
+
+import argparse
+import statistics
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+from src.helpers.review_selection import select_reviews
+from benchmarks.stub_gemini import add_latency_arguments, stub_gemini
+from benchmarks.stub_letterboxd import varied_review_text
+
+# Word counts cycled through the reviews: mostly short, a few essays
+REVIEW_LENGTHS = (8, 25, 60, 12, 0, 40, 450, 18, 90, 5, 30, 1200)
+
+# One-liners that many different reviewers post
+COMMON_REVIEWS = ("masterpiece", "10/10 no notes", "mid", "i need to lie down")
+
+
+def popular_film_reviews(pages=30, per_page=12):
+    """Returns the scraped reviews of a film with many reviews."""
+    reviews = []
+    for page in range(1, pages + 1):
+        for i in range(per_page):
+            words = REVIEW_LENGTHS[(page + i) % len(REVIEW_LENGTHS)]
+            text = varied_review_text(page * per_page + i, words) if words else ""
+            if (page * per_page + i) % 9 == 0:
+                text = COMMON_REVIEWS[(page + i) % len(COMMON_REVIEWS)]
+            stars = (page * 3 + i) % 10
+            reviews.append({
+                "rating": "★" * (stars // 2) + "½" * (stars % 2) if stars else None,
+                "review_text": text,
+            })
+    return reviews
+
+
+def measure(analyzer, reviews, runs, **stub_options):
+    """Runs get_results and returns the mean prompt tokens and median latency."""
+    latencies = []
+    with stub_gemini(**stub_options) as prompt_tokens, redirect_stdout(StringIO()):
+        reviews_text = analyzer.read_reviews(reviews)
+        for _ in range(runs):
+            start = time.perf_counter()
+            analyzer.get_results(reviews_text, ["key"] * 3, ["key"] * 3)
+            latencies.append(time.perf_counter() - start)
+    return statistics.mean(prompt_tokens), statistics.median(latencies)
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[8000, 4000, 2000],
+                        help="REVIEW_TOKEN_BUDGET values to compare")
+    parser.add_argument("--runs", type=int, default=3)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    analyzer = LetterboxdReviewAnalyzer()
+    reviews = popular_film_reviews()
+    stub_options = {"latency": args.latency, "latency_per_1k_tokens": args.latency_per_1k}
+    print(f"{len(reviews)} reviews, stub Gemini {args.latency * 1000:.0f}ms "
+          f"+ {args.latency_per_1k * 1000:.0f}ms per 1k tokens")
+    print(f"{'selection':<16} {'reviews':>8} {'prompt tokens':>14} {'latency (s)':>12}")
+
+    tokens, latency = measure(analyzer, reviews, args.runs, **stub_options)
+    print(f"{'none':<16} {len(reviews):>8} {tokens:>14.0f} {latency:>12.2f}")
+    for budget in args.budgets:
+        selected = select_reviews(reviews, token_budget=budget)
+        tokens, latency = measure(analyzer, selected, args.runs, **stub_options)
+        print(f"{f'budget {budget}':<16} {len(selected):>8} {tokens:>14.0f} {latency:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: sequential versus concurrent review-page fetching in scrape_reviews.
+
+Runs scrape_reviews(n=30) against the local Letterboxd stub with injected
+latency and reports p50/p95 wall time for each worker count.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scrape_reviews --latency 0.05 --runs 10
+"""
+
+import argparse
+import time
+
+from src.helpers.scrapers import scrape_reviews
+from benchmarks.stub_letterboxd import StubLetterboxd, redirect_requests, percentile
+
+FILM_URL = "https://letterboxd.com/film/the-brutalist/"
+
+
+def time_scrape(n, max_workers, runs):
+    """Returns wall times of repeated scrape_reviews calls and the review count."""
+    samples = []
+    count = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        reviews = scrape_reviews(FILM_URL, n=n, max_workers=max_workers)
+        samples.append(time.perf_counter() - start)
+        count = len(reviews)
+    return samples, count
+
+
+def main():
+    """Runs the benchmark and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=30, help="review pages per call")
+    parser.add_argument(
+        "--available", type=int, default=None,
+        help="review pages the stub film has (defaults to --n)",
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency (s)")
+    parser.add_argument("--runs", type=int, default=10, help="calls per configuration")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 4, 8, 16],
+        help="worker counts to compare (1 = today's sequential loop)",
+    )
+    args = parser.parse_args()
+
+    available = args.available or args.n
+    with StubLetterboxd(latency=args.latency, review_pages=available) as stub:
+        with redirect_requests(stub):
+            print(f"scrape_reviews n={args.n}, pages available={available}, "
+                  f"latency={args.latency * 1000:.0f}ms, runs={args.runs}")
+            print(f"{'workers':>8} {'reviews':>8} {'p50 (s)':>9} {'p95 (s)':>9}")
+            for workers in args.workers:
+                samples, count = time_scrape(args.n, workers, args.runs)
+                print(f"{workers:>8} {count:>8} {percentile(samples, 50):>9.3f} "
+                      f"{percentile(samples, 95):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
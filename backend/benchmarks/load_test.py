@@ -0,0 +1,164 @@
+"""
+Load test: requests/sec and tail latency of the API under concurrent users.
+
+Starts the API in a child process with Letterboxd and Gemini replaced by
+local stubs, either as the ASGI app under uvicorn or as the Flask app on its
+threaded development server, then runs 10/50/200 concurrent users that each
+send requests back to back for a fixed duration.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --server asgi --endpoint movie_details
+    python -m benchmarks.load_test --server flask --users 10 50 --duration 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.stub_letterboxd import StubLetterboxd, redirect_requests, percentile
+from benchmarks.stub_gemini import stub_gemini
+
+ENDPOINTS = ("movie_details", "roast", "taste")
+
+
+def free_port():
+    """Returns a free TCP port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(server, port, letterboxd_latency, gemini_latency, rate_limit):
+    """Runs the API with stubbed dependencies until the process is terminated."""
+    # pylint: disable=import-outside-toplevel
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull), \
+            StubLetterboxd(latency=letterboxd_latency, review_pages=30) as stub, \
+            redirect_requests(stub, rate_limit=rate_limit), stub_gemini(latency=gemini_latency):
+        # Every request is for a new film or user, so keep profiles uncached too
+        with patch("src.helpers.scrapers_roast.PROFILE_CACHE", None):
+            if server == "asgi":
+                import uvicorn
+                from src.asgi import app
+                uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning",
+                            lifespan="on", backlog=2048)
+            else:
+                from werkzeug.serving import make_server
+                from src.app import app
+                make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def request_body(endpoint, i):
+    """A request for a distinct film/user so no cache can answer it."""
+    film_url = f"https://letterboxd.com/film/film-{i}/"
+    if endpoint == "movie_details":
+        return {"film_url": film_url}
+    if endpoint == "roast":
+        return {"username": f"user{i}"}
+    return {"film_url": film_url, "username": f"user{i}"}
+
+
+async def run_users(base_url, endpoint, users, duration):
+    """
+    Runs concurrent users that start requests for duration seconds.
+
+    Returns the latencies of successful requests, the error count and the wall
+    time until the last request finished.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(10 ** 9))
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    async def user(client):
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            body = request_body(endpoint, next(counter))
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{base_url}/{endpoint}", json=body)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        await asyncio.gather(*(user(client) for _ in range(users)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def wait_until_up(base_url, timeout=30):
+    """Polls the metrics endpoint until the server answers."""
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(f"{base_url}/metrics")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def main():
+    """Runs the load test and prints a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--server", choices=("asgi", "flask"), default="asgi")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="movie_details")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 50, 200],
+                        help="concurrent user levels")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--letterboxd-latency", type=float, default=0.05,
+                        help="stub Letterboxd latency (s)")
+    parser.add_argument("--gemini-latency", type=float, default=1.0,
+                        help="stub Gemini latency (s)")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Letterboxd requests/s of the server (0 = unlimited)")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve,
+        args=(args.server, port, args.letterboxd_latency, args.gemini_latency,
+              args.rate_limit),
+        daemon=True,
+    )
+    server.start()
+    try:
+        asyncio.run(wait_until_up(base_url))
+        print(f"{args.server} server, /{args.endpoint}, {args.duration:.0f}s per level, "
+              f"Letterboxd {args.letterboxd_latency * 1000:.0f}ms, "
+              f"Gemini {args.gemini_latency * 1000:.0f}ms")
+        print(f"{'users':>6} {'requests':>9} {'errors':>7} {'req/s':>7} "
+              f"{'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8}")
+        for users in args.users:
+            latencies, errors, elapsed = asyncio.run(
+                run_users(base_url, args.endpoint, users, args.duration)
+            )
+            if not latencies:
+                print(f"{users:>6} {0:>9} {errors:>7}")
+                continue
+            print(f"{users:>6} {len(latencies):>9} {errors:>7} "
+                  f"{len(latencies) / elapsed:>7.1f} "
+                  f"{percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} "
+                  f"{percentile(latencies, 99):>8.2f}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Gemini API used by the benchmarks.
+
+Replaces the Gemini models built by gemini_clients with a fake that answers
+every prompt after an injected latency, in the formats the analyzers parse,
+so whole API requests can be load tested without network access or quota.
+The latency can grow with the prompt size to model the cost of long prompts.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.helpers.gemini_clients import clear_models
+from src.helpers.review_selection import estimate_tokens
+
+SUMMARY = (
+    "Critics and audiences praise the lead performance and the score, while "
+    "many reviews find the second act slow and the ending rushed."
+)
+
+ASPECTS = '{"Acting": [60, 5], "Music": [45, 3], "Pacing": [10, 35], "Ending": [8, 30]}'
+
+ROAST = "You rate everything three stars and call it a personality."
+
+
+class StubModel:  # pylint: disable=too-few-public-methods
+    """A GenerativeModel whose generate_content sleeps and returns canned text."""
+
+    latency = 0.5
+    latency_per_1k_tokens = 0.0
+    prompt_tokens = []
+
+    def __init__(self, _api_key, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **_kwargs):
+        """Answers a prompt with canned text after the configured latency."""
+        tokens = estimate_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        time.sleep(self.latency + self.latency_per_1k_tokens * tokens / 1000)
+        if "cinematic aspects" in prompt:
+            return SimpleNamespace(text=ASPECTS)
+        if "roast" in prompt.lower():
+            return SimpleNamespace(text=ROAST)
+        return SimpleNamespace(text=SUMMARY)
+
+
+@contextmanager
+def stub_gemini(latency=0.5, use_cache=False, latency_per_1k_tokens=0.0):
+    """
+    Routes every Gemini call to StubModel.
+
+    The result cache is switched off unless use_cache is set, so that repeated
+    requests keep calling the model. Yields the list that the (estimated)
+    token count of every prompt is appended to.
+    """
+    prompt_tokens = []
+    model = type("StubModel", (StubModel,), {
+        "latency": latency,
+        "latency_per_1k_tokens": latency_per_1k_tokens,
+        "prompt_tokens": prompt_tokens,
+    })
+    with ExitStack() as stack:
+        clear_models()
+        stack.callback(clear_models)
+        stack.enter_context(patch("src.helpers.gemini_clients.new_model", model))
+        if not use_cache:
+            stack.enter_context(
+                patch("src.helpers.letterboxd_analyzers.RESULT_CACHE", None)
+            )
+        yield prompt_tokens
+
+
+def add_latency_arguments(parser):
+    """Adds the stub latency options of the benchmarks that call Gemini."""
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="stub Gemini base latency (s)")
+    parser.add_argument("--latency-per-1k", type=float, default=0.1,
+                        help="stub Gemini latency per 1k prompt tokens (s)")
@@ -0,0 +1,409 @@
+"""
+Local stand-in for letterboxd.com used by the benchmarks.
+
+Serves canned film, review, profile and stats pages with an injected
+per-request latency so scraper changes can be measured without touching
+the real site.
+"""
+
+import os
+import random
+import re
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+
+from src.helpers import http_client
+
+LETTERBOXD_URL = "https://letterboxd.com"
+
+PAGE_CHROME_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Letterboxd</title>
+<link rel="stylesheet" href="/static/css/main.css">
+<script>window.dataLayer = window.dataLayer || [];{script}</script>
+</head>
+<body class="film backdropped">
+<header class="site-header">
+<nav class="main-nav">
+<ul>{nav}</ul>
+</nav>
+</header>
+<div id="content" class="site-body">
+"""
+
+PAGE_CHROME_FOOT = """
+</div>
+<aside class="sidebar">{sidebar}</aside>
+<footer class="site-footer"><ul>{footer}</ul></footer>
+<script src="/static/js/main.js"></script>
+</body>
+</html>
+"""
+
+REVIEW_WORDS = (
+    "the film looks gorgeous but the second act drags a little while the "
+    "score carries every scene and the lead gives a career best performance "
+    "that alone makes it worth the ticket even if the ending felt rushed"
+).split()
+
+
+def _chrome(body):
+    """Wraps page content in header, navigation, sidebar and footer markup."""
+    nav = "".join(
+        f'<li class="nav-item"><a href="/section/{i}/">Section {i}</a></li>'
+        for i in range(40)
+    )
+    sidebar = "".join(
+        f'<section class="panel"><h3>Popular {i}</h3>'
+        f'<a href="/film/popular-{i}/"><img src="/poster/{i}.jpg" alt=""></a></section>'
+        for i in range(30)
+    )
+    footer = "".join(f'<li><a href="/about/{i}/">About {i}</a></li>' for i in range(25))
+    script = "dataLayer.push({'event': 'pageview', 'value': 1});" * 60
+    return (
+        PAGE_CHROME_HEAD.format(script=script, nav=nav)
+        + body
+        + PAGE_CHROME_FOOT.format(sidebar=sidebar, footer=footer)
+    )
+
+
+def _paginator(page, last_page):
+    """Renders the Letterboxd paginator for the given page."""
+    if last_page <= 1:
+        return ""
+    items = "".join(
+        f'<li class="paginate-page{" paginate-current" if i == page else ""}">'
+        f'<a href="page/{i}/">{i}</a></li>'
+        for i in sorted(
+            {1, page, last_page}
+            | set(range(max(1, page - 2), min(last_page, page + 2) + 1))
+        )
+    )
+    return f'<div class="pagination"><ul>{items}</ul></div>'
+
+
+# A larger vocabulary with a Zipf-like word frequency
+VOCABULARY = REVIEW_WORDS + [f"{word}{i}" for i in range(400)
+                             for word in ("scene", "shot", "actor", "line", "cut")]
+VOCABULARY_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def varied_review_text(seed, words=60):
+    """
+    Returns deterministic review text that differs from review to review.
+
+    Reviews that only rotated one sentence would be collapsed as
+    near-duplicates by select_reviews, leaving a single review per film.
+    """
+    rng = random.Random(seed)
+    return " ".join(rng.choices(VOCABULARY, weights=VOCABULARY_WEIGHTS, k=words))
+
+
+def film_reviews_page(page, last_page, per_page=12):
+    """Renders one page of a film's popular reviews."""
+    if page > last_page:
+        return _chrome('<section class="viewing-list"><ul></ul></section>')
+    reviews = "".join(
+        '<li class="film-detail">'
+        '<div class="film-detail-content">'
+        f'<p class="attribution"><a href="/member{i}/">Member {i}</a></p>'
+        f'<span class="rating rated-{(page + i) % 10 + 1}">'
+        f'{"★" * ((page + i) % 5 + 1)}</span>'
+        '<div class="body-text -prose js-review-body">'
+        f'<p>{varied_review_text(f"film-{page}-{i}")}</p></div>'
+        '<p class="like-link-target"><a href="#">Like review</a></p>'
+        "</div></li>"
+        for i in range(per_page)
+    )
+    return _chrome(
+        f'<section class="viewing-list"><ul class="film-list">{reviews}</ul></section>'
+        + _paginator(page, last_page)
+    )
+
+
+def film_details_page(slug):
+    """Renders a film's main page."""
+    return _chrome(
+        f'<div id="backdrop" data-backdrop="https://a.ltrbxd.com/{slug}.jpg"></div>'
+        '<section class="film-header">'
+        '<h1 class="headline-1 filmtitle">'
+        f'<span class="name js-widont prettify">{slug.title()}</span></h1>'
+        '<div class="releaseyear"><a href="/films/year/2024/">2024</a></div>'
+        '<span class="directorlist"><a href="/director/someone/">Some One</a></span>'
+        "</section>"
+        '<div class="truncate"><p>A film about a film, told over one long night.</p></div>'
+        '<div id="tab-genres"><a class="text-slug">Drama</a><a class="text-slug">Thriller</a></div>'
+    )
+
+
+def profile_page(username):
+    """Renders a member's profile page."""
+    return _chrome(f'<section class="profile-header"><h1>{username}</h1></section>')
+
+
+def user_reviews_page(page, last_page, per_page=12):
+    """Renders one page of a member's reviews."""
+    if page > last_page:
+        return _chrome("")
+    reviews = "".join(
+        '<div class="film-detail-content">'
+        f'<h2 class="headline-2 prettify">'
+        f'<a href="/film/film-{page}-{i}/">Film {page}-{i}</a></h2>'
+        '<small class="metadata"><a href="/films/year/2020/">2020</a></small>'
+        f'<span class="rating">{"★" * ((page + i) % 5 + 1)}</span>'
+        '<span class="date">Watched 01 Jan 2024</span>'
+        '<div class="body-text -prose js-review-body">'
+        f'<p>{varied_review_text(f"user-{page}-{i}", 40)}</p></div>'
+        "</div>"
+        for i in range(per_page)
+    )
+    return _chrome(reviews + _paginator(page, last_page))
+
+
+def user_stats_page():
+    """Renders a member's stats page."""
+    stats = "".join(
+        f'<h4 class="yir-member-statistic statistic">{value}</h4>'
+        for value in ("4 years", "1,200 hours", "310 directors", "42 countries",
+                      "12 days", "88 days")
+    )
+    return _chrome(stats)
+
+
+class StubLetterboxdHandler(BaseHTTPRequestHandler):
+    """Routes Letterboxd-shaped paths to the canned pages."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    ROUTES = (
+        (re.compile(r"^/film/[\w-]+/reviews/by/activity/page/(\d+)/$"), "reviews"),
+        (re.compile(r"^/film/([\w-]+)/$"), "film"),
+        (re.compile(r"^/[\w-]+/films/reviews/(?:page/(\d+)/)?$"), "user_reviews"),
+        (re.compile(r"^/[\w-]+/stats/?$"), "stats"),
+        (re.compile(r"^/([\w-]+)/$"), "profile"),
+    )
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serves a canned page after the configured latency."""
+        self.respond(send_body=True)
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        """Serves a canned page's headers after the configured latency."""
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        """Sends the status and headers of the requested page, and its body."""
+        stub = self.server.stub
+        stub.record_request(self.path)
+        time.sleep(stub.latency)
+        body = self.render(stub)
+        if body is None:
+            self.send_response(404)
+            body = "<html><body>Not found</body></html>"
+        else:
+            self.send_response(200)
+        payload = body.encode("utf-8")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(payload)
+
+    def render(self, stub):
+        """Returns the page body for the requested path, or None for a 404."""
+        for pattern, kind in self.ROUTES:
+            match = pattern.match(self.path)
+            if not match:
+                continue
+            if kind == "reviews":
+                return film_reviews_page(int(match.group(1)), stub.review_pages)
+            if kind == "film":
+                return film_details_page(match.group(1))
+            if kind == "user_reviews":
+                return user_reviews_page(int(match.group(1) or 1), stub.user_review_pages)
+            if kind == "stats":
+                return user_stats_page()
+            return profile_page(match.group(1))
+        return None
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keeps benchmark output quiet."""
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded server with a deep listen backlog that counts connections."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, handler, stub):
+        self.stub = stub
+        super().__init__(address, handler)
+
+    def finish_request(self, request, client_address):
+        """Counts the connection and runs the TLS handshake off the accept loop."""
+        self.stub.record_connection()
+        if self.stub.ssl_context is not None:
+            try:
+                request = self.stub.ssl_context.wrap_socket(request, server_side=True)
+            except (ssl.SSLError, OSError):
+                return
+        super().finish_request(request, client_address)
+
+
+def _self_signed_context(directory):
+    """Creates a server TLS context with a throwaway certificate for 127.0.0.1."""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+class StubLetterboxd:  # pylint: disable=too-many-instance-attributes
+    """A threaded HTTP server serving canned Letterboxd pages on localhost."""
+
+    def __init__(self, latency=0.05, review_pages=30, user_review_pages=10, tls=False):
+        self.latency = latency
+        self.review_pages = review_pages
+        self.user_review_pages = user_review_pages
+        self.tls = tls
+        self.requests = []
+        self.connections = 0
+        self.ssl_context = None
+        self.cafile = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._tmpdir = None
+
+    @property
+    def base_url(self):
+        """The URL the stub is listening on."""
+        host, port = self._server.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}"
+
+    def record_request(self, path):
+        """Remembers a served path so benchmarks can count requests."""
+        with self._lock:
+            self.requests.append(path)
+
+    def record_connection(self):
+        """Counts an accepted TCP connection."""
+        with self._lock:
+            self.connections += 1
+
+    def reset_counters(self):
+        """Clears the request and connection counters."""
+        with self._lock:
+            self.requests = []
+            self.connections = 0
+
+    def rewrite(self, url):
+        """Points a letterboxd.com URL at the stub."""
+        return url.replace(LETTERBOXD_URL, self.base_url, 1)
+
+    def __enter__(self):
+        if self.tls:
+            self._tmpdir = tempfile.mkdtemp()
+            self.ssl_context, self.cafile = _self_signed_context(self._tmpdir)
+        self._server = StubServer(("127.0.0.1", 0), StubLetterboxdHandler, self)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+@contextmanager
+def redirect_requests(stub, pooled=True, use_cache=False, rate_limit=0):
+    """
+    Routes every scraper request aimed at letterboxd.com to the stub.
+
+    The engine's rate limiter is set to rate_limit requests per second, off
+    by default, so that the benchmarks measure the code rather than the cap
+    whatever LETTERBOXD_RATE_LIMIT is set to.
+
+    With pooled=False each request goes through its own throwaway client,
+    which is how the scrapers fetched pages before the shared client existed.
+    The scraper caches are switched off unless use_cache is set, so that
+    repeated runs keep hitting the stub.
+    """
+    # Ignore SSL_CERT_FILE and friends so the stub's own certificate is used
+    verify = ssl.create_default_context(cafile=stub.cafile) if stub.cafile else True
+    shared_get = http_client.get
+
+    async def get(url, headers=None, timeout=http_client.DEFAULT_TIMEOUT, method="GET"):
+        if pooled:
+            return await shared_get(
+                stub.rewrite(url), headers=headers, timeout=timeout, method=method
+            )
+        async with httpx.AsyncClient(verify=verify, trust_env=False) as client:
+            return await client.request(
+                method, stub.rewrite(url), headers=headers, timeout=timeout
+            )
+
+    # Start a fresh engine whose client trusts the stub
+    http_client.close_engine()
+    with ExitStack() as stack:
+        stack.enter_context(patch(
+            "src.helpers.http_client.create_client",
+            partial(http_client.create_client, verify=verify, trust_env=False),
+        ))
+        stack.enter_context(patch("src.helpers.http_client.get", get))
+        stack.enter_context(patch("src.helpers.http_client.RATE_LIMIT", rate_limit))
+        if not use_cache:
+            for cache in ("scrapers.SCRAPER_CACHE", "scrapers_roast.USER_CACHE",
+                          "http_client.VALIDATOR_CACHE"):
+                stack.enter_context(patch(f"src.helpers.{cache}", None))
+        try:
+            yield
+        finally:
+            http_client.close_engine()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def measure_parse(parse, html_content, iterations):
+    """Returns (mean seconds, tracemalloc peak bytes) for parsing one page."""
+    parse(html_content)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse(html_content)
+    elapsed = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    parse(html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
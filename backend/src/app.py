@@ -1,15 +1,34 @@
 """
 API for scraping movie details and reviews from Letterboxd
 """
+import asyncio
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 from dotenv import load_dotenv
-import requests
-from flask import Flask, request, jsonify
+import httpx
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from src.helpers.scrapers import movie_details_scraper,scrape_reviews
-from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+from src.helpers import http_client
+from src.helpers.hedging import HEDGE_REQUESTS, HEDGERS
+from src.helpers.key_pool import KeyPool
+from src.helpers.output_limits import LENGTH_STATS, trim_to_sentence
+from src.helpers.rate_limiter import current_owner
+from src.helpers.scrapers import (
+    movie_details_scraper_async, scrape_reviews_async, SCRAPER_CACHE
+)
+from src.helpers.letterboxd_analyzers import (
+    LetterboxdReviewAnalyzer, MIN_REVIEW_WORDS, RESULT_CACHE
+)
+from src.helpers.review_selection import select_reviews
 from src.helpers.roast_generator import LetterboxdRoastAnalyzer
-from src.helpers.scrapers_roast import scrape_user_reviews,scrape_user_stats
+from src.helpers.streaming import CUT_OFF, RESTART
+from src.helpers.scrapers_roast import (
+    scrape_user_reviews_async, scrape_user_stats_async, PROFILE_CACHE, USER_CACHE
+)
 
 load_dotenv()
 # Set up Google Gemini API key
@@ -20,100 +39,429 @@ GEMINI_API_KEY_SAI1 = os.getenv("GEMINI_API_KEY_SAI1")
 GEMINI_API_KEY_SAI2 = os.getenv("GEMINI_API_KEY_SAI2")
 GEMINI_API_KEY_SAI3 = os.getenv("GEMINI_API_KEY_SAI3")
 
-GEMINI_API_KEY_RIO = [GEMINI_API_KEY_RIO1, GEMINI_API_KEY_RIO2, GEMINI_API_KEY_RIO3]
-GEMINI_API_KEY_SAI = [GEMINI_API_KEY_SAI1, GEMINI_API_KEY_SAI2, GEMINI_API_KEY_SAI3]
+# Shared by every request so that a rate-limited key is avoided by all of them
+GEMINI_API_KEY_RIO = KeyPool([GEMINI_API_KEY_RIO1, GEMINI_API_KEY_RIO2, GEMINI_API_KEY_RIO3])
+GEMINI_API_KEY_SAI = KeyPool([GEMINI_API_KEY_SAI1, GEMINI_API_KEY_SAI2, GEMINI_API_KEY_SAI3])
+
+# Number of review pages fetched in parallel per request
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "8"))
+
+# Word budget of the review pipeline: once the reviews streamed in hold this
+# many words after select_reviews (truncation and near-duplicate collapsing),
+# the remaining page fetches are cancelled and the Gemini calls start
+# (0 fetches every available page, up to the page limit)
+REVIEW_WORD_TARGET = int(os.getenv("REVIEW_WORD_TARGET", "0")) or None
+if REVIEW_WORD_TARGET is not None:
+    REVIEW_WORD_TARGET = max(REVIEW_WORD_TARGET, MIN_REVIEW_WORDS)
+
+# Seconds a request may spend on its Letterboxd scrapes before giving up
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", "60"))
+
+# Threads shared by all requests for the blocking Gemini calls
+llm_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_POOL_SIZE", "64")))
+
+
+async def gather_scrapes(*coros, timeout=None):
+    """
+    Runs independent scrapes concurrently on the event loop.
+
+    Returns the results in argument order. Raises the error of the first failed
+    scrape, or TimeoutError if they do not all finish within timeout seconds
+    (SCRAPE_DEADLINE by default); the remaining scrapes are cancelled in both
+    cases. The scrapes' fetches share one owner in the Letterboxd rate
+    limiter's queue, so concurrent API requests get tokens in turn, and no
+    fetch is retried after a backoff that would outlast the deadline.
+    """
+    timeout = SCRAPE_DEADLINE if timeout is None else timeout
+    current_owner.set(object())
+    http_client.current_deadline.set(time.monotonic() + timeout)
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_llm(func, *args):
+    """Runs a blocking Gemini call on the LLM pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(llm_pool, partial(func, *args))
+
+
+async def stream_llm(chunks):
+    """
+    Iterates a blocking Gemini stream on the LLM pool, yielding its chunks on
+    the event loop. An error raised by the stream is raised here once its
+    chunks have been yielded. Closing the generator stops the stream after its
+    current chunk.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    end = object()
+
+    def pump():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        finally:
+            chunks.close()
+            loop.call_soon_threadsafe(queue.put_nowait, end)
+
+    pumping = loop.run_in_executor(llm_pool, pump)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is end:
+                # Raises what pump raised, if anything
+                await pumping
+                return
+            yield chunk
+    finally:
+        stop.set()
+
+
+async def stream_text(field, chunks, parts):
+    """
+    Relays a Gemini stream as SSE events, collecting the text in parts.
+
+    Each chunk is sent as a `field` event; a 'reset' event tells the client
+    to discard the chunks sent so far when a failed attempt is retried. A
+    reply cut off by max_output_tokens is trimmed to its complete sentences
+    and sent again after a 'reset', like the non-streamed replies.
+    """
+    async for chunk in stream_llm(chunks):
+        if chunk is RESTART:
+            parts.clear()
+            yield 'reset', {'field': field}
+        elif chunk is CUT_OFF:
+            text = ''.join(parts)
+            text = trim_to_sentence(text, len(text.split()))
+            parts.clear()
+            yield 'reset', {'field': field}
+            if text:
+                parts.append(text)
+                yield field, {'text': text}
+        else:
+            parts.append(chunk)
+            yield field, {'text': chunk}
+
+
+def sse_event(event, data):
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 analyze = LetterboxdReviewAnalyzer()
 roaster = LetterboxdRoastAnalyzer()
 
-app = Flask(__name__)
-
-CORS(app, resources={r"/*": {"origins": "*"}})
 
-@app.route('/movie_details', methods=['POST'])
-def scraping_movie_details():
-    """Scrapes movie details from a Letterboxd movie page"""
+async def movie_details_handler(data):
+    """Scrapes movie details and reviews and analyzes them. Returns (body, status)."""
     try:
-        data = request.get_json()
         film_url = data.get('film_url')
 
         if not film_url:
-            return jsonify({'error': 'film_url is required'}), 400
+            return {'error': 'film_url is required'}, 400
 
-        movie_details = movie_details_scraper(film_url)
-        reviews = scrape_reviews(film_url)
-        reviews_text = analyze.read_reviews(reviews)
-        summary, aspects = analyze.get_results(reviews_text,GEMINI_API_KEY_RIO,GEMINI_API_KEY_SAI)
+        movie_details, reviews = await gather_scrapes(
+            movie_details_scraper_async(film_url),
+            scrape_reviews_async(film_url,
+                                 max_workers=SCRAPE_WORKERS, min_words=REVIEW_WORD_TARGET),
+        )
+        reviews_text = analyze.read_reviews(select_reviews(reviews))
+        summary, aspects = await run_llm(
+            analyze.get_results, reviews_text, GEMINI_API_KEY_RIO, GEMINI_API_KEY_SAI)
 
-        return jsonify({
+        return {
             'movie_details': movie_details,
             'summary': summary,
             'aspects': aspects
-        })
+        }, 200
 
     except KeyError:
-        return jsonify({'error': 'Invalid JSON format or missing key'}), 400
+        return {'error': 'Invalid JSON format or missing key'}, 400
     except ValueError as ve:
-        return jsonify({'error': f'Value error: {str(ve)}'}), 400
-    except requests.exceptions.RequestException as re:
-        return jsonify({'error': f'Request failed: {str(re)}'}), 500
+        return {'error': f'Value error: {str(ve)}'}, 400
+    except httpx.HTTPError as re:
+        return {'error': f'Request failed: {str(re)}'}, 500
+    except asyncio.TimeoutError:
+        return {'error': 'Timed out scraping Letterboxd'}, 504
 
-@app.route('/roast', methods=['POST'])
-def username_roast():
-    """Roasts the user based on their Letterboxd profile"""
+
+async def roast_handler(data):
+    """Scrapes a user's reviews and stats and roasts them. Returns (body, status)."""
     try:
-        data = request.get_json()
         username = data.get('username')
 
         if not username:
-            return jsonify({'error': 'username is required'}), 400
+            return {'error': 'username is required'}, 400
 
-        user_reviews = scrape_user_reviews(username, n_pages=10)
-        user_stats = scrape_user_stats(username)
-        roast = roaster.get_results(user_reviews,user_stats,GEMINI_API_KEY_SAI)
+        user_reviews, user_stats = await gather_scrapes(
+            scrape_user_reviews_async(username, n_pages=10),
+            scrape_user_stats_async(username),
+        )
+        roast = await run_llm(roaster.get_results, user_reviews, user_stats, GEMINI_API_KEY_SAI)
 
-        return jsonify({
+        return {
             'roast': roast
-        })
+        }, 200
 
     except KeyError:
-        return jsonify({'error': 'Invalid JSON format or missing key'}), 400
+        return {'error': 'Invalid JSON format or missing key'}, 400
     except ValueError as ve:
-        return jsonify({'error': f'Value error: {str(ve)}'}), 400
-    except requests.exceptions.RequestException as re:
-        return jsonify({'error': f'Request failed: {str(re)}'}), 500
+        return {'error': f'Value error: {str(ve)}'}, 400
+    except httpx.HTTPError as re:
+        return {'error': f'Request failed: {str(re)}'}, 500
+    except asyncio.TimeoutError:
+        return {'error': 'Timed out scraping Letterboxd'}, 504
 
-@app.route('/taste', methods=['POST'])
-def taste_match():
-    """Returns whether the movie is of the user's taste"""
+
+async def movie_details_stream_handler(data):
+    """
+    Streams /movie_details as (event, data) pairs.
+
+    Sends 'movie_details' once scraped, the summary in 'summary' chunks as it
+    is generated, 'aspects' once they are ready and finally 'done' with the
+    same body as /movie_details. Errors end the stream with an 'error' event
+    carrying the error body and its status.
+    """
     try:
-        data = request.get_json()
         film_url = data.get('film_url')
+
+        if not film_url:
+            yield 'error', {'error': 'film_url is required', 'status': 400}
+            return
+
+        movie_details, reviews = await gather_scrapes(
+            movie_details_scraper_async(film_url),
+            scrape_reviews_async(film_url,
+                                 max_workers=SCRAPE_WORKERS, min_words=REVIEW_WORD_TARGET),
+        )
+        yield 'movie_details', movie_details
+
+        reviews_text = analyze.read_reviews(select_reviews(reviews))
+        if len(reviews_text.split()) < MIN_REVIEW_WORDS:
+            raise ValueError("Not enough reviews found")
+
+        cached = analyze.cached_results(reviews_text)
+        if cached is not None:
+            summary, aspects = cached
+            yield 'summary', {'text': summary}
+        else:
+            # The aspects are not streamed; they are generated alongside the summary
+            aspects_future = asyncio.ensure_future(run_llm(
+                analyze.aspects_with_retries, reviews_text, GEMINI_API_KEY_SAI))
+            try:
+                parts = []
+                async for event in stream_text('summary', analyze.summary_stream_with_retries(
+                        reviews_text, GEMINI_API_KEY_RIO), parts):
+                    yield event
+                summary = ''.join(parts) or None
+                aspects = await aspects_future
+            finally:
+                # Not needed once the client is gone or the summary failed
+                aspects_future.cancel()
+            analyze.store_results(reviews_text, summary, aspects)
+        yield 'aspects', {'aspects': aspects}
+
+        yield 'done', {
+            'movie_details': movie_details,
+            'summary': summary,
+            'aspects': aspects
+        }
+
+    except KeyError:
+        yield 'error', {'error': 'Invalid JSON format or missing key', 'status': 400}
+    except ValueError as ve:
+        yield 'error', {'error': f'Value error: {str(ve)}', 'status': 400}
+    except httpx.HTTPError as re:
+        yield 'error', {'error': f'Request failed: {str(re)}', 'status': 500}
+    except asyncio.TimeoutError:
+        yield 'error', {'error': 'Timed out scraping Letterboxd', 'status': 504}
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        # The response has already started, so report failures as an event
+        yield 'error', {'error': f'Streaming failed: {str(error)}', 'status': 500}
+
+
+async def roast_stream_handler(data):
+    """
+    Streams /roast as (event, data) pairs.
+
+    Sends the roast in 'roast' chunks as it is generated and finally 'done'
+    with the same body as /roast. Errors end the stream with an 'error' event
+    carrying the error body and its status.
+    """
+    try:
         username = data.get('username')
 
         if not username:
-            return jsonify({'error': 'username is required'}), 400
+            yield 'error', {'error': 'username is required', 'status': 400}
+            return
+
+        user_reviews, user_stats = await gather_scrapes(
+            scrape_user_reviews_async(username, n_pages=10),
+            scrape_user_stats_async(username),
+        )
+        parts = []
+        async for event in stream_text('roast', roaster.stream_results(
+                user_reviews, user_stats, GEMINI_API_KEY_SAI), parts):
+            yield event
+
+        if not parts:
+            yield 'error', {
+                'error': 'Failed to generate roast after multiple attempts.', 'status': 500
+            }
+            return
+        yield 'done', {
+            'roast': ''.join(parts)
+        }
 
-        reviews = scrape_reviews(film_url,n=30)
-        reviews_text = analyze.read_reviews(reviews)
-        reviews_user = scrape_user_reviews(username, n_pages=10)
+    except KeyError:
+        yield 'error', {'error': 'Invalid JSON format or missing key', 'status': 400}
+    except ValueError as ve:
+        yield 'error', {'error': f'Value error: {str(ve)}', 'status': 400}
+    except httpx.HTTPError as re:
+        yield 'error', {'error': f'Request failed: {str(re)}', 'status': 500}
+    except asyncio.TimeoutError:
+        yield 'error', {'error': 'Timed out scraping Letterboxd', 'status': 504}
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        # The response has already started, so report failures as an event
+        yield 'error', {'error': f'Streaming failed: {str(error)}', 'status': 500}
+
+
+async def taste_handler(data):
+    """Matches a film against a user's reviews. Returns (body, status)."""
+    try:
+        film_url = data.get('film_url')
+        username = data.get('username')
+
+        if not username:
+            return {'error': 'username is required'}, 400
+
+        reviews, reviews_user, movie_details = await gather_scrapes(
+            scrape_reviews_async(film_url, n=30,
+                                 max_workers=SCRAPE_WORKERS, min_words=REVIEW_WORD_TARGET),
+            scrape_user_reviews_async(username, n_pages=10),
+            movie_details_scraper_async(film_url),
+        )
+        reviews_text = analyze.read_reviews(select_reviews(reviews))
         user_reviews = analyze.read_user_data(reviews_user)
-        movie_details = movie_details_scraper(film_url)
         movie_name = movie_details.get('movie_name')
-        taste = analyze.get_taste_match_result(
-            user_reviews,reviews_text, movie_name, GEMINI_API_KEY_RIO)
+        taste = await run_llm(
+            analyze.get_taste_match_result,
+            user_reviews, reviews_text, movie_name, GEMINI_API_KEY_RIO)
 
-        return jsonify({
+        return {
             'taste': taste
-        })
+        }, 200
 
     except KeyError:
-        return jsonify({'error': 'Invalid JSON format or missing key'}), 400
+        return {'error': 'Invalid JSON format or missing key'}, 400
     except ValueError as ve:
-        return jsonify({'error': f'Value error: {str(ve)}'}), 400
-    except requests.exceptions.RequestException as re:
-        return jsonify({'error': f'Request failed: {str(re)}'}), 500
+        return {'error': f'Value error: {str(ve)}'}, 400
+    except httpx.HTTPError as re:
+        return {'error': f'Request failed: {str(re)}'}, 500
+    except asyncio.TimeoutError:
+        return {'error': 'Timed out scraping Letterboxd'}, 504
+
+
+async def metrics_handler(_data=None):
+    """Returns cache, rate limiter, retry, API key, hedging and length limit counters"""
+    return {
+        'scraper_cache': SCRAPER_CACHE.info() if SCRAPER_CACHE is not None else None,
+        'result_cache': RESULT_CACHE.info() if RESULT_CACHE is not None else None,
+        'profile_cache': PROFILE_CACHE.info() if PROFILE_CACHE is not None else None,
+        'user_cache': USER_CACHE.info() if USER_CACHE is not None else None,
+        'rate_limiter': http_client.get_engine().limiter.info(),
+        'retries': http_client.RETRY_STATS.as_dict(),
+        'validator_cache': (
+            {**http_client.VALIDATOR_CACHE.info(), **http_client.REVALIDATION_STATS}
+            if http_client.VALIDATOR_CACHE is not None else None
+        ),
+        'gemini_keys': {
+            'rio': GEMINI_API_KEY_RIO.info(),
+            'sai': GEMINI_API_KEY_SAI.info(),
+        },
+        'hedging': {
+            'enabled': HEDGE_REQUESTS,
+            **{kind: hedger.info() for kind, hedger in HEDGERS.items()},
+        },
+        'length_limits': LENGTH_STATS.as_dict(),
+    }, 200
+
+
+class EngineFlask(Flask):
+    """Flask app whose async views run on the shared scraping engine loop."""
+
+    def async_to_sync(self, func):
+        """Runs an async view on the engine rather than a new event loop per request."""
+        @wraps(func)
+        def run_on_engine(*args, **kwargs):
+            return http_client.run(func(*args, **kwargs))
+        return run_on_engine
+
+
+async def next_event(events):
+    """Returns the next (event, data) pair of a stream handler, or None at its end."""
+    return await anext(events, None)
+
+
+def sse_response(events):
+    """Streams a stream handler's events to the client as Server-Sent Events."""
+    def body():
+        try:
+            while True:
+                event = http_client.run(next_event(events))
+                if event is None:
+                    return
+                yield sse_event(*event)
+        finally:
+            # Also runs when the client disconnects, stopping the Gemini stream
+            http_client.run(events.aclose())
+
+    return Response(body(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+app = EngineFlask(__name__)
+
+CORS(app, resources={r"/*": {"origins": "*"}})
+
+@app.route('/movie_details', methods=['POST'])
+async def scraping_movie_details():
+    """Scrapes movie details from a Letterboxd movie page"""
+    body, status = await movie_details_handler(request.get_json())
+    return jsonify(body), status
+
+@app.route('/roast', methods=['POST'])
+async def username_roast():
+    """Roasts the user based on their Letterboxd profile"""
+    body, status = await roast_handler(request.get_json())
+    return jsonify(body), status
+
+@app.route('/movie_details/stream', methods=['POST'])
+def scraping_movie_details_stream():
+    """Streams movie details, the summary as it is written and the aspects"""
+    return sse_response(movie_details_stream_handler(request.get_json()))
+
+@app.route('/roast/stream', methods=['POST'])
+def username_roast_stream():
+    """Streams the roast of a user as it is written"""
+    return sse_response(roast_stream_handler(request.get_json()))
+
+@app.route('/taste', methods=['POST'])
+async def taste_match():
+    """Returns whether the movie is of the user's taste"""
+    body, status = await taste_handler(request.get_json())
+    return jsonify(body), status
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Returns cache counters used to size the caches in production"""
+    body, status = await metrics_handler()
+    return jsonify(body), status
 
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=5515, debug=True)
@@ -0,0 +1,142 @@
+"""
+ASGI entry point serving the API's endpoints as async handlers.
+
+The Flask app in app.py is convenient for development, but every request
+holds a worker thread while it waits seconds on Letterboxd and Gemini. Here
+the same handlers run directly on the ASGI server's event loop, which is
+adopted as the scraping engine at startup, so a single process serves many
+concurrent analyses with only the blocking Gemini calls on threads.
+
+Run with:
+    uvicorn src.asgi:app --host 0.0.0.0 --port 5515
+"""
+
+import json
+
+from src.app import (
+    movie_details_handler,
+    movie_details_stream_handler,
+    roast_handler,
+    roast_stream_handler,
+    taste_handler,
+    metrics_handler,
+    sse_event,
+)
+from src.helpers import http_client
+
+ROUTES = {
+    "/movie_details": ("POST", movie_details_handler),
+    "/roast": ("POST", roast_handler),
+    "/taste": ("POST", taste_handler),
+    "/metrics": ("GET", metrics_handler),
+}
+
+# Endpoints answered with Server-Sent Events, handled by async generators
+STREAM_ROUTES = {
+    "/movie_details/stream": ("POST", movie_details_stream_handler),
+    "/roast/stream": ("POST", roast_stream_handler),
+}
+
+# Same policy as CORS(app, resources={r"/*": {"origins": "*"}}) in app.py
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"*"),
+]
+
+
+async def send_json(send, body, status, headers=()):
+    """Sends a JSON response."""
+    payload = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+            *CORS_HEADERS,
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def send_events(send, events):
+    """Sends a stream handler's events as Server-Sent Events."""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            *CORS_HEADERS,
+        ],
+    })
+    try:
+        async for event in events:
+            await send({
+                "type": "http.response.body",
+                "body": sse_event(*event).encode("utf-8"),
+                "more_body": True,
+            })
+    finally:
+        await events.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def read_json(receive):
+    """Reads the request body and decodes it as JSON (None when it is not)."""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(b"".join(chunks) or b"null")
+    except ValueError:
+        return None
+
+
+async def lifespan(receive, send):
+    """Adopts the server's loop as the scraping engine for the app's lifetime."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            http_client.attach_engine()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await http_client.detach_engine()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    route = ROUTES.get(scope["path"]) or STREAM_ROUTES.get(scope["path"])
+    if route is None:
+        await send_json(send, {"error": "Not found"}, 404)
+        return
+    method, handler = route
+    if scope["method"] == "OPTIONS":
+        await send_json(send, {}, 200, PREFLIGHT_HEADERS)
+        return
+    if scope["method"] != method:
+        await send_json(send, {"error": "Method not allowed"}, 405)
+        return
+
+    data = await read_json(receive) if method == "POST" else None
+    if method == "POST" and not isinstance(data, dict):
+        await send_json(send, {"error": "Invalid JSON format or missing key"}, 400)
+        return
+    if scope["path"] in STREAM_ROUTES:
+        await send_events(send, handler(data))
+    else:
+        body, status = await handler(data)
+        await send_json(send, body, status)
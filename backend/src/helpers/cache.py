@@ -0,0 +1,333 @@
+"""
+Caches for scraped Letterboxd data.
+
+Two interchangeable backends are provided: TTLCache keeps entries in process
+memory, and SQLiteCache stores them in an SQLite file so that they survive
+restarts and are shared by every worker process on the host. Both expire
+entries after a TTL, evict the least recently used entries once full, and
+count hits, misses and evictions.
+
+The scrapers cache what they extracted from a page (review lists, movie
+details), never the HTML, so a warm cache serves a request without parsing.
+SQLiteCache stores values as zlib-compressed compact JSON under keys scoped
+by a version, so bumping parsers.PARSER_VERSION retires entries written by
+older parsers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+def encode_value(value):
+    """Serializes a value as zlib-compressed compact JSON."""
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_value(stored):
+    """Deserializes a value written by encode_value (or as plain JSON text)."""
+    if isinstance(stored, str):
+        return json.loads(stored)
+    return json.loads(zlib.decompress(stored))
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for a cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def record(self, hits=0, misses=0, evictions=0, expirations=0):
+        """Adds to the counters."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+            self.expirations += expirations
+
+    def as_dict(self):
+        """
+        Returns the counters and the hit ratio.
+
+        Returns:
+            dict: hits, misses, evictions, expirations and hit_ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class TTLCache:
+    """
+    An in-process cache with a per-entry TTL and LRU eviction.
+
+    Values are stored as-is, so callers must not mutate what they get back.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept.
+            ttl (float): Seconds an entry stays valid after it is set.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key.
+
+        Args:
+            key (str): The cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.record(misses=1)
+                return default
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.stats.record(misses=1, expirations=1)
+                return default
+            self._entries.move_to_end(key)
+            self.stats.record(hits=1)
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries if full.
+
+        Args:
+            key (str): The cache key.
+            value: The value to store.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            if evicted:
+                self.stats.record(evictions=evicted)
+
+    def delete(self, key):
+        """Removes a key from the cache if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def info(self):
+        """
+        Returns the cache configuration, size and counters.
+
+        Returns:
+            dict: Backend name, size, maxsize, ttl and the stats counters.
+        """
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            **self.stats.as_dict(),
+        }
+
+
+class SQLiteCache:
+    """
+    A cache persisted in an SQLite database.
+
+    The database can be shared by several processes. Values must be JSON
+    serializable (tuples come back as lists) and are stored compressed.
+    Hit/miss/eviction counters are kept per process.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=3600, version=None):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            maxsize (int): Maximum number of entries kept.
+            ttl (float): Seconds an entry stays valid after it is set.
+            version (int, optional): Format version of the values. Entries
+                written under another version are never returned, and age
+                out like any other entry.
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version
+        self._prefix = "" if version is None else f"v{version}:"
+        self.stats = CacheStats()
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+
+    def _connect(self):
+        """Returns this thread's connection to the database."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key.
+
+        Args:
+            key (str): The cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or default.
+        """
+        now = time.time()
+        key = self._prefix + key
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.record(misses=1)
+                return default
+            value, expires_at = row
+            if expires_at <= now:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.stats.record(misses=1, expirations=1)
+                return default
+            connection.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        self.stats.record(hits=1)
+        return decode_value(value)
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries if full.
+
+        Args:
+            key (str): The cache key.
+            value: A JSON serializable value.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (self._prefix + key, encode_value(value), now + self.ttl, now),
+            )
+            expired = connection.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (now,)
+            ).rowcount
+            evicted = connection.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            ).rowcount
+        self.stats.record(evictions=evicted, expirations=expired)
+
+    def delete(self, key):
+        """Removes a key from the cache if present."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM entries WHERE key = ?", (self._prefix + key,))
+
+    def clear(self):
+        """Removes every entry."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM entries")
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def info(self):
+        """
+        Returns the cache configuration, size and counters.
+
+        Returns:
+            dict: Backend name, size, maxsize, ttl, version and the stats
+                counters.
+        """
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "version": self.version,
+            **self.stats.as_dict(),
+        }
+
+
+def cache_from_env(prefix, default_maxsize=1024, default_ttl=3600, version=None):
+    """
+    Builds a cache configured by environment variables.
+
+    Reads {prefix}_BACKEND ("memory", "sqlite" or "none"), {prefix}_SIZE,
+    {prefix}_TTL and, for the sqlite backend, {prefix}_PATH.
+
+    Args:
+        prefix (str): Environment variable prefix, e.g. "SCRAPER_CACHE".
+        default_maxsize (int): Size used when {prefix}_SIZE is unset.
+        default_ttl (float): TTL used when {prefix}_TTL is unset.
+        version (int, optional): Format version of the values, for the
+            sqlite backend (an in-memory cache never outlives its parsers).
+
+    Returns:
+        TTLCache | SQLiteCache | None: The cache, or None if disabled.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    backend = os.getenv(f"{prefix}_BACKEND", "memory").lower()
+    maxsize = int(os.getenv(f"{prefix}_SIZE", str(default_maxsize)))
+    ttl = float(os.getenv(f"{prefix}_TTL", str(default_ttl)))
+
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        path = os.getenv(f"{prefix}_PATH", f"{prefix.lower()}.sqlite3")
+        return SQLiteCache(path, maxsize=maxsize, ttl=ttl, version=version)
+    raise ValueError(f"Unknown cache backend for {prefix}: {backend}")
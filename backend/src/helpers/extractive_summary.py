@@ -0,0 +1,151 @@
+"""
+Local extractive pre-summarization of film reviews.
+
+With SUMMARY_INPUT=extractive, the summary prompt gets the most representative
+sentences of the reviews, up to EXTRACTIVE_TARGET_WORDS, instead of all of
+them. Sentences are ranked by the cosine similarity of their TF-IDF vector to
+the centroid of all sentences, so sentences about what most reviewers talk
+about come first. Off-topic sentences, and sentences too similar to one
+already picked, are skipped. Everything runs locally on the CPU with the
+standard library.
+
+The aspects prompt still gets every review, since its percentages are
+computed over the whole audience.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+# "raw" sends the reviews to the summary prompt as they are, "extractive"
+# sends the sentences picked by extractive_summary
+SUMMARY_INPUT = os.getenv("SUMMARY_INPUT", "raw")
+
+# Words of review sentences kept in extractive mode
+EXTRACTIVE_TARGET_WORDS = int(os.getenv("EXTRACTIVE_TARGET_WORDS", "1000"))
+
+# Sentences shorter than this carry too little to represent the reviews
+MIN_SENTENCE_WORDS = 4
+
+# Sentences scoring below this share of the best score are off-topic filler
+MIN_RELATIVE_SCORE = 0.5
+
+# A sentence this similar to one already picked is considered redundant
+MAX_OVERLAP = 0.7
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def split_sentences(reviews):
+    """
+    Splits the output of read_reviews into sentences.
+
+    Returns:
+        list: (review index, sentence) pairs in reading order.
+    """
+    sentences = []
+    for index, review in enumerate(reviews.split(">>>")):
+        for sentence in SENTENCE_END.split(review.strip()):
+            if sentence:
+                sentences.append((index, sentence))
+    return sentences
+
+
+def tfidf_vectors(sentences):
+    """
+    Returns the L2-normalized TF-IDF vector of each sentence.
+
+    Sentences are the documents; a word's IDF is log(n / df) + 1.
+
+    Returns:
+        list: One {word: weight} dict per sentence.
+    """
+    counts = [Counter(WORD.findall(sentence.lower())) for sentence in sentences]
+    document_frequency = Counter(word for count in counts for word in count)
+    idf = {word: math.log(len(sentences) / df) + 1 for word, df in document_frequency.items()}
+
+    vectors = []
+    for count in counts:
+        vector = {word: tf * idf[word] for word, tf in count.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({word: weight / norm for word, weight in vector.items()})
+    return vectors
+
+
+def cosine(first, second):
+    """Returns the cosine similarity of two normalized sparse vectors."""
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(weight * second.get(word, 0.0) for word, weight in first.items())
+
+
+def centroid(vectors):
+    """Returns the normalized mean of sparse vectors."""
+    total = Counter()
+    for vector in vectors:
+        total.update(vector)
+    norm = math.sqrt(sum(weight * weight for weight in total.values())) or 1.0
+    return {word: weight / norm for word, weight in total.items()}
+
+
+def extractive_summary(reviews, target_words=None):
+    """
+    Picks the most representative review sentences within a word target.
+
+    Args:
+        reviews (str): The output of read_reviews.
+        target_words (int, optional): Word target; EXTRACTIVE_TARGET_WORDS by
+            default.
+
+    Returns:
+        str: The picked sentences in reading order, with sentences from
+            different reviews separated by " >>>". The reviews are returned
+            unchanged when they already fit the target, or when no sentence
+            qualifies.
+    """
+    target_words = EXTRACTIVE_TARGET_WORDS if target_words is None else target_words
+    if len(reviews.split()) <= target_words:
+        return reviews
+
+    sentences = split_sentences(reviews)
+    vectors = tfidf_vectors([sentence for _, sentence in sentences])
+    center = centroid(vectors)
+    scores = [cosine(vector, center) for vector in vectors]
+    ranked = sorted(range(len(sentences)), key=scores.__getitem__, reverse=True)
+
+    picked = []
+    words = 0
+    for i in ranked:
+        if scores[i] < MIN_RELATIVE_SCORE * scores[ranked[0]]:
+            break
+        length = len(sentences[i][1].split())
+        if length < MIN_SENTENCE_WORDS or words + length > target_words:
+            continue
+        if any(cosine(vectors[i], vectors[j]) > MAX_OVERLAP for j in picked):
+            continue
+        picked.append(i)
+        words += length
+    if not picked:
+        return reviews
+
+    parts = []
+    previous = None
+    for i in sorted(picked):
+        review, sentence = sentences[i]
+        parts.append(sentence if review == previous else f">>>{sentence}")
+        previous = review
+    return " ".join(parts).removeprefix(">>>")
+
+
+@lru_cache(maxsize=16)
+def cached_extractive_summary(reviews, target_words=None):
+    """
+    extractive_summary, remembered for the last few review sets.
+
+    A summary is retried and hedged on other keys with the same reviews, and
+    each attempt builds its prompt again.
+    """
+    return extractive_summary(reviews, target_words)
@@ -0,0 +1,61 @@
+"""
+Shared Gemini model objects, one per API key and model name.
+
+genai.configure sets the API key for the whole process, so two requests
+configuring different keys at the same time could each call Gemini with the
+other's key, and building a GenerativeModel on every attempt repeated the
+client setup. get_model instead keeps one GenerativeModel per (API key, model
+name), talking to Gemini through its own client created with that key, and
+hands the same object to every thread; the underlying gRPC client is
+thread-safe.
+"""
+
+import os
+import threading
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+
+MODELS = {}
+MODELS_LOCK = threading.Lock()
+
+
+def new_model(api_key, model_name):
+    """
+    Builds a GenerativeModel bound to an API key.
+
+    Like genai.configure, falls back to the GEMINI_API_KEY and GOOGLE_API_KEY
+    environment variables when no key is given.
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    model = genai.GenerativeModel(model_name)
+    # GenerativeModel has no public way to be given a client; without one it
+    # uses the process-wide client that genai.configure sets up
+    model._client = glm.GenerativeServiceClient(  # pylint: disable=protected-access
+        client_options={"api_key": api_key}
+    )
+    return model
+
+
+def get_model(api_key, model_name):
+    """
+    Returns the shared model for an API key and model name.
+
+    Args:
+        api_key (str): The Gemini API key.
+        model_name (str): The Gemini model, e.g. "gemini-2.0-flash".
+
+    Returns:
+        GenerativeModel: The model, created on first use.
+    """
+    with MODELS_LOCK:
+        model = MODELS.get((api_key, model_name))
+        if model is None:
+            model = MODELS[(api_key, model_name)] = new_model(api_key, model_name)
+        return model
+
+
+def clear_models():
+    """Drops every shared model, so the next calls build new ones."""
+    with MODELS_LOCK:
+        MODELS.clear()
@@ -0,0 +1,182 @@
+"""
+Hedged Gemini calls across API keys.
+
+Now and then a Gemini call stalls far beyond its usual latency, and the retry
+loops have no deadline to move on. With HEDGE_REQUESTS on, a call that has not
+returned within the HEDGE_PERCENTILE latency of recent calls is duplicated on
+a second key, and whichever call succeeds first is used. The other call
+cannot be interrupted once running (generate_content blocks its thread), so
+it is cancelled if it has not started and otherwise left to finish with its
+result discarded; its key stays counted as in flight until then.
+
+Each kind of call (summary, aspects, taste match) keeps its own latency
+window, and counts how often hedges fire and win, to tune the percentile
+against the p99 latency.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Duplicate slow Gemini calls on a second API key
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"
+
+# Latency percentile of recent calls after which a call is hedged
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+
+# Seconds to wait before hedging until enough latencies have been seen
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "10"))
+
+# Recent latencies kept per kind of call, and the number needed before the
+# percentile replaces HEDGE_DELAY
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+# Threads running hedged calls; a call waits in the queue if all are busy, so
+# this is sized well above the expected concurrent Gemini calls
+hedge_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="hedge")
+
+
+def percentile(values, pct):
+    """Returns the pct-th percentile of values by the nearest-rank method."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class Hedger:
+    """Latency window and hedge counters for one kind of Gemini call."""
+
+    def __init__(self, pct=None, default_delay=None):
+        """
+        Args:
+            pct (float, optional): Hedge percentile; HEDGE_PERCENTILE by default.
+            default_delay (float, optional): Delay used until MIN_SAMPLES
+                latencies are known; HEDGE_DELAY by default.
+        """
+        self.pct = HEDGE_PERCENTILE if pct is None else pct
+        self.default_delay = HEDGE_DELAY if default_delay is None else default_delay
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def delay(self):
+        """Returns the seconds to wait for a call before hedging it."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.default_delay
+            return percentile(self._latencies, self.pct)
+
+    def record(self, latency=None, **counts):
+        """Adds a successful call's latency and/or to the counters."""
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            for name, count in counts.items():
+                self.counters[name] += count
+
+    def call(self, pool, func, tried, neutral=()):
+        """
+        Calls func(key) with a key from pool, hedging on a second key if slow.
+
+        Args:
+            pool (KeyPool): The keys to use.
+            func (callable): Makes the Gemini call with the given key.
+            tried (list): Indexes of keys already used by this request; the
+                keys used here are appended.
+            neutral (tuple, optional): See KeyPool.lease.
+
+        Returns:
+            The result of the first call to succeed.
+
+        Raises:
+            Exception: The primary call's error when every call failed.
+        """
+        self.record(calls=1)
+        primary = self._submit(pool, func, tried, neutral)
+        if wait([primary], timeout=self.delay()).done:
+            return primary.result()
+
+        self.record(hedged=1)
+        hedge = self._submit(pool, func, tried, neutral)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self.record(hedge_wins=1)
+                    return future.result()
+        return primary.result()
+
+    def info(self):
+        """
+        Returns the hedge counters and latency percentiles.
+
+        Returns:
+            dict: calls, hedged, hedge_wins, delay, samples, p50, p95 and p99.
+        """
+        delay = self.delay()
+        with self._lock:
+            latencies = list(self._latencies)
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "delay": round(delay, 3),
+            "samples": len(latencies),
+            **{
+                f"p{pct}": round(percentile(latencies, pct), 3) if latencies else None
+                for pct in (50, 95, 99)
+            },
+        }
+
+    def _submit(self, pool, func, tried, neutral):
+        """Leases a key and starts func on it in the hedge pool."""
+        index = pool.acquire(tried)
+        tried.append(index)
+
+        def run():
+            started = time.perf_counter()
+            with pool.track(index, neutral):
+                result = func(pool.keys[index])
+            self.record(time.perf_counter() - started)
+            return result
+
+        future = hedge_pool.submit(run)
+        # A call cancelled before it started never reaches track()
+        future.add_done_callback(
+            lambda f: pool.abandon(index) if f.cancelled() else None
+        )
+        return future
+
+
+HEDGERS = {name: Hedger() for name in ("summary", "aspects", "taste_match")}
+
+
+def call_with_key(pool, func, tried, neutral=(), kind=None):
+    """
+    Calls func(key) with a key leased from pool.
+
+    With HEDGE_REQUESTS on and more than one key, the call is hedged using
+    the Hedger for its kind.
+
+    Args:
+        pool (KeyPool): The keys to use.
+        func (callable): Makes the Gemini call with the given key.
+        tried (list): Indexes of keys already used by this request; the keys
+            used here are appended.
+        neutral (tuple, optional): See KeyPool.lease.
+        kind (str, optional): A key of HEDGERS.
+
+    Returns:
+        The result of func.
+    """
+    if HEDGE_REQUESTS and kind in HEDGERS and len(pool) > 1:
+        return HEDGERS[kind].call(pool, func, tried, neutral)
+    with pool.lease(tried, neutral) as (index, key):
+        tried.append(index)
+        return func(key)
@@ -0,0 +1,407 @@
+"""
+Shared HTTP client for every request the scrapers make to Letterboxd.
+
+The scrapers are coroutines that run on a single background event loop, the
+scraping engine, and share one pooled httpx.AsyncClient. The ~40 pages
+fetched per API request therefore reuse a handful of keep-alive connections,
+and many analyses can be in flight without a thread per page. A global
+semaphore caps the number of requests in flight across the whole process,
+and a token-bucket rate limiter (rate_limiter.py) caps how fast they start.
+Throttled and failed requests are retried with jittered exponential backoff
+within the deadline of the API request they belong to. Pages whose parse
+result is kept can be revalidated with a conditional GET (get_revalidated).
+
+Synchronous code (the Flask views and the sync scraper functions) hands its
+coroutines to the engine with run(). Under an ASGI server the server's own
+event loop is adopted as the engine with attach_engine(), so request
+handlers, scrapers and LLM calls all share one loop.
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from src.helpers.cache import cache_from_env
+from src.helpers.parsers import PARSER_VERSION
+from src.helpers.rate_limiter import RateLimiter, current_owner
+
+# Maximum number of simultaneous connections kept open to Letterboxd
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("LETTERBOXD_MAX_CONNECTIONS", "16"))
+
+# Maximum number of requests in flight across every scrape in the process.
+# Requests beyond this wait for a slot before their timeout starts.
+MAX_CONCURRENT_REQUESTS = int(
+    os.getenv("LETTERBOXD_MAX_CONCURRENT_REQUESTS", str(MAX_CONNECTIONS_PER_HOST))
+)
+
+# Sustained requests per second sent to Letterboxd (0 disables the limit),
+# and how many may start at once after an idle period. The default keeps a
+# burst of concurrent requests from tripping Letterboxd's 429s; at up to 30
+# review pages per /movie_details it sustains about 0.65 of them per second,
+# so raise it for deployments that need more.
+RATE_LIMIT = float(os.getenv("LETTERBOXD_RATE_LIMIT", "20"))
+RATE_LIMIT_BURST = int(os.getenv("LETTERBOXD_RATE_LIMIT_BURST", "40"))
+
+# Responses that mean Letterboxd wants us to slow down
+THROTTLED_STATUSES = (429, 503)
+
+# Retries after a throttled, 5xx or failed request, and the backoff before
+# the first retry (doubled for each further retry, with full jitter, up to
+# RETRY_MAX_BACKOFF). A Retry-After longer than RETRY_MAX_BACKOFF is not
+# waited for: the request gives up instead.
+RETRY_ATTEMPTS = int(os.getenv("LETTERBOXD_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("LETTERBOXD_RETRY_BACKOFF", "0.5"))
+RETRY_MAX_BACKOFF = 10.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# time.monotonic() by which the current API request's scrapes must finish.
+# No retry is started that would sleep past it.
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+DEFAULT_TIMEOUT = 10
+
+# httpx advertises every compression it can decode (brotli when installed)
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive",
+}
+
+# ETag/Last-Modified validators and parse results of fetched pages, kept much
+# longer than the scraper caches so that stale pages can be revalidated with
+# a conditional GET instead of being downloaded and parsed again
+VALIDATOR_CACHE = cache_from_env(
+    "VALIDATOR_CACHE", default_maxsize=4096, default_ttl=7 * 24 * 3600, version=PARSER_VERSION
+)
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+class RetryStats:
+    """Thread-safe counters for retried requests and the pages lost anyway."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.recovered = 0
+        self.exhausted = 0
+        self.pages_dropped = 0
+
+    def record(self, retries=0, recovered=0, exhausted=0, pages_dropped=0):
+        """Adds to the counters."""
+        with self._lock:
+            self.retries += retries
+            self.recovered += recovered
+            self.exhausted += exhausted
+            self.pages_dropped += pages_dropped
+
+    def as_dict(self):
+        """
+        Returns the counters.
+
+        Returns:
+            dict: retries, recovered (requests that succeeded after a retry),
+                exhausted (requests given up on while still failing) and
+                pages_dropped (pages the scrapers skipped because of it).
+        """
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "recovered": self.recovered,
+                "exhausted": self.exhausted,
+                "pages_dropped": self.pages_dropped,
+            }
+
+
+RETRY_STATS = RetryStats()
+
+# Conditional requests sent, how many came back 304 Not Modified, and the
+# body bytes those 304s saved. Only touched from the engine loop.
+REVALIDATION_STATS = {"conditional": 0, "not_modified": 0, "bytes_saved": 0}
+
+
+class Engine:
+    """The event loop, client, semaphore and rate limiter shared by all scrapers."""
+
+    def __init__(self, loop=None):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop, optional): A running loop to adopt.
+                By default a new loop is started on a background thread.
+        """
+        self.client = create_client()
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.limiter = RateLimiter(RATE_LIMIT, RATE_LIMIT_BURST)
+        self.thread = None
+        if loop is not None:
+            self.loop = loop
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="scraping-engine", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, coro):
+        """
+        Schedules a coroutine on the engine loop.
+
+        Returns:
+            concurrent.futures.Future: The coroutine's eventual result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        """Closes the client's connections and stops the loop thread."""
+        self.submit(self.client.aclose()).result()
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+
+def create_client(**options):
+    """
+    Creates an async client with keep-alive pooling and the default headers.
+
+    Args:
+        **options: Extra httpx.AsyncClient arguments (e.g. verify).
+
+    Returns:
+        httpx.AsyncClient: A new client. Redirects are followed like requests
+            did, and the pool holds at most MAX_CONNECTIONS_PER_HOST connections.
+    """
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=MAX_CONNECTIONS_PER_HOST,
+        ),
+        timeout=DEFAULT_TIMEOUT,
+        follow_redirects=True,
+        **options,
+    )
+
+
+def get_engine():
+    """
+    Returns the process-wide scraping engine, starting it on first use.
+
+    Returns:
+        Engine: The shared engine.
+    """
+    global _ENGINE  # pylint: disable=global-statement
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = Engine()
+    return _ENGINE
+
+
+def close_engine():
+    """Closes the shared client and stops the engine loop."""
+    global _ENGINE  # pylint: disable=global-statement
+    with _ENGINE_LOCK:
+        if _ENGINE is not None:
+            _ENGINE.close()
+            _ENGINE = None
+
+
+def attach_engine():
+    """
+    Makes the running event loop the scraping engine. Called by an ASGI
+    server at startup, from its loop; a background engine is closed first.
+    """
+    global _ENGINE  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    with _ENGINE_LOCK:
+        if _ENGINE is not None and _ENGINE.thread is not None:
+            _ENGINE.close()
+        _ENGINE = Engine(loop)
+
+
+async def detach_engine():
+    """Closes the client of an engine attached with attach_engine."""
+    global _ENGINE  # pylint: disable=global-statement
+    with _ENGINE_LOCK:
+        engine, _ENGINE = _ENGINE, None
+    if engine is not None:
+        await engine.client.aclose()
+
+
+def run(coro):
+    """
+    Runs a coroutine on the scraping engine and waits for its result.
+
+    Args:
+        coro (coroutine): The coroutine to run.
+
+    Returns:
+        The coroutine's result; its exception is raised here.
+
+    Raises:
+        RuntimeError: If called from the engine loop itself, which would
+            deadlock. Code already on the engine should await instead.
+    """
+    engine = get_engine()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is engine.loop:
+        coro.close()
+        raise RuntimeError("run() cannot be called from the scraping engine loop")
+    return engine.submit(coro).result()
+
+
+def retry_delay(attempt, retry_after=None):
+    """
+    Returns how long to wait before a retry.
+
+    Args:
+        attempt (int): The number of retries already made.
+        retry_after (str, optional): The response's Retry-After header, in
+            seconds or as an HTTP date. It is honoured when present.
+
+    Returns:
+        float: Seconds to sleep.
+    """
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(RETRY_MAX_BACKOFF, RETRY_BACKOFF * 2 ** attempt))
+
+
+def within_deadline(delay):
+    """Checks whether sleeping delay seconds still leaves time before the deadline."""
+    deadline = current_deadline.get()
+    return deadline is None or time.monotonic() + delay < deadline
+
+
+async def get(url, headers=None, timeout=DEFAULT_TIMEOUT, method="GET"):
+    """
+    Sends a GET (or HEAD) request through the shared client.
+
+    The request first waits for a rate limiter token, queued fairly against
+    the other API requests' fetches (see rate_limiter.current_owner), then
+    for a slot under the global semaphore. Awaited from another event loop,
+    the request is handed to the engine loop so that the client's connections,
+    the semaphore and the limiter stay on one loop.
+
+    Throttled (429/503) and 5xx responses and transport errors are retried
+    up to RETRY_ATTEMPTS times, honouring Retry-After, as long as the wait
+    is at most RETRY_MAX_BACKOFF and ends before current_deadline, which
+    sync callers outside gather_scrapes do not have. Each retry takes a new
+    token.
+
+    Args:
+        url (str): The URL to fetch.
+        headers (dict, optional): Extra headers merged over the default set.
+        timeout (float, optional): Timeout in seconds, counted from when the
+            request gets one of the MAX_CONCURRENT_REQUESTS slots.
+        method (str, optional): "GET", or "HEAD" to fetch only the headers.
+
+    Returns:
+        httpx.Response: The response; the last one if every retry failed.
+
+    Raises:
+        httpx.TransportError: If the last attempt failed without a response.
+    """
+    engine = get_engine()
+    if asyncio.get_running_loop() is not engine.loop:
+        return await asyncio.wrap_future(engine.submit(get(url, headers, timeout, method)))
+
+    attempt = 0
+    while True:
+        response, error = None, None
+        try:
+            response = await send(engine, url, headers, timeout, method)
+        except httpx.TransportError as e:
+            error = e
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            RETRY_STATS.record(recovered=1 if attempt else 0)
+            return response
+
+        delay = retry_delay(
+            attempt, response.headers.get("Retry-After") if response is not None else None
+        )
+        if attempt == RETRY_ATTEMPTS or delay > RETRY_MAX_BACKOFF or not within_deadline(delay):
+            RETRY_STATS.record(exhausted=1)
+            if error is not None:
+                raise error
+            return response
+        RETRY_STATS.record(retries=1)
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def get_revalidated(url, key, parse, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetches and parses a page, revalidating the result of an earlier fetch.
+
+    When VALIDATOR_CACHE holds validators for key, the request carries
+    If-None-Match / If-Modified-Since, and a 304 Not Modified returns the
+    stored result without downloading or parsing the page again. A 200 with
+    an ETag or Last-Modified header stores the new result and validators.
+
+    Args:
+        url (str): The URL to fetch.
+        key (str): Cache key of the page's parse result.
+        parse (callable): Turns the response into the result. It may raise
+            for unusable responses; its result must be JSON serializable.
+        headers (dict, optional): Extra headers merged over the default set.
+        timeout (float, optional): Timeout in seconds (see get).
+
+    Returns:
+        The parse result.
+    """
+    stored = VALIDATOR_CACHE.get(key) if VALIDATOR_CACHE is not None else None
+    headers = dict(headers or {})
+    if stored is not None:
+        REVALIDATION_STATS["conditional"] += 1
+        if stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    response = await get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and stored is not None:
+        REVALIDATION_STATS["not_modified"] += 1
+        REVALIDATION_STATS["bytes_saved"] += stored["size"]
+        return stored["result"]
+
+    result = parse(response)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if VALIDATOR_CACHE is not None and response.status_code == 200 and (etag or last_modified):
+        VALIDATOR_CACHE.set(key, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(response.content),
+            "result": result,
+        })
+    return result
+
+
+async def send(engine, url, headers, timeout, method="GET"):
+    """Sends one attempt of a request once it has a token and a slot."""
+    request = engine.client.head if method == "HEAD" else engine.client.get
+    await engine.limiter.acquire(current_owner.get())
+    async with engine.semaphore:
+        response = await request(url, headers=headers, timeout=timeout)
+    if response.status_code in THROTTLED_STATUSES:
+        engine.limiter.record_throttled()
+    return response
@@ -0,0 +1,229 @@
+"""
+Health-aware pool of Gemini API keys.
+
+The analyzers used to walk their key lists in a fixed order, so every request
+started on the first key even while that key was rate limited. A KeyPool hands
+out the healthiest key instead: keys cooling down after a quota error (429)
+are skipped, keys with recent errors come after clean ones, then keys with
+more calls in flight, then keys much slower than the rest. Ties go round-robin
+so that concurrent requests spread over all the keys.
+
+Pools are shared by every request, from the LLM worker threads, so all state
+is guarded by a lock.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds a key is left alone after Gemini reports its quota exhausted
+KEY_COOLDOWN = float(os.getenv("GEMINI_KEY_COOLDOWN", "60"))
+
+# Errors older than this many seconds no longer count against a key
+ERROR_WINDOW = 300.0
+
+# Weight of the latest call in a key's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+# A key this many times, and at least SLOW_KEY_MARGIN seconds, slower than the
+# median key is picked after the others
+SLOW_KEY_FACTOR = 2.0
+SLOW_KEY_MARGIN = 1.0
+
+
+def error_chain(error):
+    """Yields an exception and the exceptions it was raised from."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_quota_error(error):
+    """Tells whether an error, or one it was raised from, is an HTTP 429."""
+    return any(getattr(e, "code", None) == 429 for e in error_chain(error))
+
+
+class KeyPool:
+    """A set of API keys handed out by health, with per-key counters."""
+
+    def __init__(self, keys, cooldown=None):
+        """
+        Args:
+            keys (list): The API keys.
+            cooldown (float, optional): Seconds to skip a key after a quota
+                error; KEY_COOLDOWN by default.
+        """
+        self.keys = list(keys)
+        self.cooldown = KEY_COOLDOWN if cooldown is None else cooldown
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._state = [
+            {
+                "in_flight": 0, "calls": 0, "errors": 0, "quota_errors": 0,
+                "latency": None, "recent_errors": deque(), "cooldown_until": 0.0,
+            }
+            for _ in self.keys
+        ]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def acquire(self, exclude=()):
+        """
+        Picks the healthiest key and counts a call in flight on it.
+
+        Args:
+            exclude (iterable, optional): Indexes of keys not to pick, such as
+                those a request already tried. Ignored once every key is
+                excluded.
+
+        Returns:
+            int: The index of the key in keys.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [i for i in range(len(self.keys)) if i not in exclude]
+            candidates = candidates or list(range(len(self.keys)))
+            # Starting from the cursor makes min() break ties round-robin
+            candidates.sort(key=lambda i: (i - self._cursor) % len(self.keys))
+            latencies = sorted(
+                state["latency"] for state in self._state if state["latency"] is not None
+            )
+            median = latencies[len(latencies) // 2] if latencies else None
+            index = min(candidates, key=lambda i: self._health(i, now, median))
+            self._cursor = (index + 1) % len(self.keys)
+            state = self._state[index]
+            state["in_flight"] += 1
+            state["calls"] += 1
+            return index
+
+    def release(self, index, elapsed, error=None):
+        """
+        Records the outcome of a call made with a key.
+
+        Args:
+            index (int): The index returned by acquire.
+            elapsed (float): Seconds the call took.
+            error (Exception, optional): The error the call failed with. A
+                quota error puts the key in cool-down.
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state[index]
+            state["in_flight"] -= 1
+            if error is None:
+                previous = state["latency"]
+                state["latency"] = elapsed if previous is None else (
+                    LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * previous
+                )
+                return
+            state["errors"] += 1
+            state["recent_errors"].append(now)
+            if is_quota_error(error):
+                state["quota_errors"] += 1
+                state["cooldown_until"] = now + self.cooldown
+
+    def abandon(self, index):
+        """
+        Releases a key acquired for a call that never started, such as a
+        cancelled hedge, without recording a latency or an error for it.
+
+        Args:
+            index (int): The index returned by acquire.
+        """
+        with self._lock:
+            state = self._state[index]
+            state["in_flight"] -= 1
+            state["calls"] -= 1
+
+    @contextmanager
+    def lease(self, exclude=(), neutral=()):
+        """
+        Acquires a key for the duration of a call and records how it went.
+
+        Args:
+            exclude (iterable, optional): Indexes of keys not to pick.
+            neutral (tuple, optional): Exception types that say nothing about
+                the key, such as a reply in the wrong format; calls failing
+                with them, directly or as a cause, count as successes.
+
+        Yields:
+            tuple: The key's index and the key.
+        """
+        index = self.acquire(exclude)
+        with self.track(index, neutral):
+            yield index, self.keys[index]
+
+    @contextmanager
+    def track(self, index, neutral=()):
+        """
+        Times a call on an acquired key and releases the key afterwards.
+
+        Args:
+            index (int): The index returned by acquire.
+            neutral (tuple, optional): See lease.
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as caught:
+            if not any(isinstance(e, neutral) for e in error_chain(caught)):
+                error = caught
+            raise
+        finally:
+            self.release(index, time.perf_counter() - started, error)
+
+    def info(self):
+        """
+        Returns the counters of every key. Keys are listed by position, never
+        by value.
+
+        Returns:
+            list: One dict per key with in_flight, calls, errors, quota_errors,
+                recent_errors, cooldown (seconds left) and avg_latency.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": index,
+                    "in_flight": state["in_flight"],
+                    "calls": state["calls"],
+                    "errors": state["errors"],
+                    "quota_errors": state["quota_errors"],
+                    "recent_errors": self._recent_errors(index, now),
+                    "cooldown": round(max(0.0, state["cooldown_until"] - now), 2),
+                    "avg_latency": (
+                        round(state["latency"], 4) if state["latency"] is not None else None
+                    ),
+                }
+                for index, state in enumerate(self._state)
+            ]
+
+    def _health(self, index, now, median_latency):
+        """Returns a sort key for a key's health, lowest being healthiest."""
+        state = self._state[index]
+        cooling = max(0.0, state["cooldown_until"] - now)
+        slow = (
+            median_latency is not None and state["latency"] is not None
+            and state["latency"] > SLOW_KEY_FACTOR * median_latency
+            and state["latency"] > median_latency + SLOW_KEY_MARGIN
+        )
+        return cooling, self._recent_errors(index, now), state["in_flight"], slow
+
+    def _recent_errors(self, index, now):
+        """Drops errors older than ERROR_WINDOW and counts the rest."""
+        recent = self._state[index]["recent_errors"]
+        while recent and now - recent[0] > ERROR_WINDOW:
+            recent.popleft()
+        return len(recent)
+
+
+def as_pool(keys):
+    """Returns keys as a KeyPool, wrapping a plain list in a new pool."""
+    return keys if isinstance(keys, KeyPool) else KeyPool(keys)
@@ -3,7 +3,33 @@
 import json
 import re
 import ast
-import google.generativeai as genai
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.helpers.cache import cache_from_env
+from src.helpers.gemini_clients import get_model
+from src.helpers.hedging import call_with_key
+from src.helpers.key_pool import as_pool
+from src.helpers.output_limits import enforce_length, length_config
+from src.helpers.streaming import limit_words, stream_with_retries
+from src.helpers.extractive_summary import (
+    EXTRACTIVE_TARGET_WORDS,
+    SUMMARY_INPUT,
+    cached_extractive_summary,
+)
+
+# Minimum number of words of movie reviews needed to generate results
+MIN_REVIEW_WORDS = 400
+
+# Words a summary or taste match may have; the prompts ask for 200
+MAX_SUMMARY_WORDS = 210
+
+# Gemini calls made for one result before giving up, each on a different key
+# while untried keys remain
+LLM_ATTEMPTS = 3
+
+# Generated (summary, aspect_list) pairs keyed by review-set fingerprint
+RESULT_CACHE = cache_from_env("RESULT_CACHE", default_maxsize=512, default_ttl=86400)
 
 
 class AspectFormatError(Exception):
@@ -24,6 +50,103 @@ class LetterboxdReviewAnalyzer:
         {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
     ]
 
+    SUMMARY_MODEL = "gemini-2.0-flash"
+    ASPECTS_MODEL = "gemini-2.0-flash"
+    TASTE_MATCH_MODEL = "gemini-1.5-pro"
+
+    # Bump to invalidate cached results after a change that the prompt
+    # templates and model names do not capture (e.g. post-processing).
+    PROMPT_VERSION = 1
+
+    # Prompt templates, filled in with str.format. Editing a template changes
+    # the result cache fingerprint, so cached results are invalidated.
+    SUMMARY_PROMPT = """
+                        You are summarizing Letterboxd reviews.  Given a collection of reviews, create a short, 
+                        witty, and humorous paragraph that captures the overall sentiment and tone of the reviewers. 
+                        Focus on the reviewers' reactions to the film itself, not just the plot.  
+                        Write in a style that mimics the reviewers' own tone, but avoid overly conversational or informal language.
+                        The goal is to give a potential viewer a sense of what it's like to experience the film based on the reviews - 
+                        it should read like an actual Letterboxd reviewer is writing the review.
+                        Avoid cheesy, overused language (avoid phrases like prepare to, rollercoaster etc.)- 
+                        write in a manner similar to the reviews provided. Keep the summary *stricttly* under 200 words.
+                        - Use only the reviews provided
+                        - you cannot access real time information about the movies
+                        - STRICTLY avoid formatting like bold, italics. No * or _.
+                        - avoid too many pop cultural references, not everyone will understand them
+
+                        Reviews:
+                        {reviews}
+                    """
+
+    ASPECTS_PROMPT = """
+                        The following is a collection of movie reviews from Letterboxd. 
+                        Each new review starts with ">>>".
+
+                        Please analyze these reviews and identify the top 5 most mentioned cinematic aspects of the movie. 
+                        For each aspect, provide the following:
+
+                        1. The percentage of reviews that mention the aspect positively (as an integer).
+                        2. The percentage of reviews that mention the aspect negatively (as an integer).
+
+                        Please return the results as a Python dictionary string that can be directly evaluated using `ast.literal_eval()`. 
+                        The dictionary should have:
+                        - The cinematic aspect names (e.g., "Acting", "Direction", "Dialogue", "Color Scheme" etc.) as keys (strings).
+                        - The values should be lists containing *exactly two integers*:
+                            - The first integer represents the percentage of reviews mentioning the aspect positively.
+                            - The second integer represents the percentage of reviews mentioning the aspect negatively.
+
+                        While calculating the percentages, take into account ALL the reviews, not just the ones that mention that aspect.
+
+                        Example output format:
+                            {{
+                                "Dialogue": [30, 10],
+                                "Direction": [20, 15],
+                                "Cinematography": [2, 10],
+                                "Music": [5, 8],
+                                "Plot": [3, 3],
+                                "Actor Name": [2, 1],
+                                "Director Name": [1, 2]
+                            }}
+                        Do not output the exact same dictionary as the
+                        example output please. Aspects can include, but
+                        are not limited to: acting, direction, cinematography,
+                        sound/music, themes, pacing, performances, visuals, plot,
+                        character development, etc. Do not shy away from
+                        emphasising on negative aspects if that is the case.
+                        The sum of positive and the negative review percentage will
+                        likely be much less than 100, which is expected and okay.
+                        Reviews:
+                        {reviews}
+                    """
+
+    TASTE_MATCH_PROMPT = """
+                        The moview_reviews is a collection of movie reviews from Letterboxd. 
+                        Each new review starts with ">>>".
+
+                        The user_reviews is a collection of a Letterboxd user's movie reviews from Letterboxd. 
+                        Each new review starts with ">>>", with this format "movie_name, rating: review_text".
+
+                        Please analyze both these data and generate a paragraph about the taste match
+                        of the user and the movie. 
+                        
+                        Check if the {movie_name} is present in the user reviews. If it is,
+                        then DO NOT generate a taste match paragraph for this movie.
+                        simply return the user's own review like this - 
+                        'You've already reviewed this movie! You said - (user's own review text, without the movie name and rating)'
+                        
+                        Otherwise, depending on the aspects the user has liked/disliked 
+                        the most in their own reviews, what might they like/dislike about this particular movie? 
+                        Keep your response brief and *STRCITLY* under 200 words and don't give spoilers.
+                        Address it to the user themself in 2nd person.
+
+                        - STRICTLY avoid formatting like bold, italics. No * or _.
+
+                        movie_reviews:
+                        {movie_reviews}
+                        user_reviews:
+                        {user_reviews}
+                    """
+
     def __init__(self):
         """Initialize the analyzer."""
 
@@ -34,6 +157,7 @@ class LetterboxdReviewAnalyzer:
         Args:
             reviews_list (list):
                 A list of dictionaries where each dictionary contains a 'review_text' key.
+                Reviews collapsed by select_reviews also carry a 'duplicates' count.
 
         Returns:
             str: A string containing all reviews, separated by " >>>".
@@ -44,6 +168,8 @@ class LetterboxdReviewAnalyzer:
         try:
             reviews = [
                 element["review_text"]
+                if element.get("duplicates", 1) <= 1
+                else f"{element['review_text']} (posted {element['duplicates']} times)"
                 for element in reviews_list
                 if "review_text" in element.keys()
             ]
@@ -84,6 +210,29 @@ class LetterboxdReviewAnalyzer:
 
         return reviews_text
 
+    def summary_prompt(self, reviews, safety="off"):
+        """
+        Builds the summary prompt for a set of reviews.
+
+        With SUMMARY_INPUT set to "extractive", only the most representative
+        sentences of the reviews are included (see extractive_summary).
+
+        Args:
+            reviews (str): The reviews to summarize.
+            safety (str, optional): Safety mode for content generation. Defaults to 'off'.
+
+        Returns:
+            str: The prompt.
+        """
+        if SUMMARY_INPUT == "extractive":
+            reviews = cached_extractive_summary(reviews, EXTRACTIVE_TARGET_WORDS)
+
+        prompt = self.SUMMARY_PROMPT.format(reviews=reviews)
+
+        if safety == "off":
+            prompt += "\n- Do not generate publicly offensive language."
+        return prompt
+
     def generate_summary(self, reviews, api_key1, safety="off"):
         """
         Generate a summary of reviews using an AI model.
@@ -97,40 +246,46 @@ class LetterboxdReviewAnalyzer:
             str: The generated summary.
         """
         try:
-            genai.configure(api_key=api_key1)
-            model1 = genai.GenerativeModel("gemini-2.0-flash")
-
-            prompt = f"""
-                        You are summarizing Letterboxd reviews.  Given a collection of reviews, create a short, 
-                        witty, and humorous paragraph that captures the overall sentiment and tone of the reviewers. 
-                        Focus on the reviewers' reactions to the film itself, not just the plot.  
-                        Write in a style that mimics the reviewers' own tone, but avoid overly conversational or informal language.
-                        The goal is to give a potential viewer a sense of what it's like to experience the film based on the reviews - 
-                        it should read like an actual Letterboxd reviewer is writing the review.
-                        Avoid cheesy, overused language (avoid phrases like prepare to, rollercoaster etc.)- 
-                        write in a manner similar to the reviews provided. Keep the summary *stricttly* under 200 words.
-                        - Use only the reviews provided
-                        - you cannot access real time information about the movies
-                        - STRICTLY avoid formatting like bold, italics. No * or _.
-                        - avoid too many pop cultural references, not everyone will understand them
-
-                        Reviews:
-                        {reviews}
-                    """
-
-            if safety == "off":
-                prompt += "\n- Do not generate publicly offensive language."
+            model1 = get_model(api_key1, self.SUMMARY_MODEL)
 
             response = model1.generate_content(
-                prompt, safety_settings=self.SAFETY_SETTINGS
+                self.summary_prompt(reviews, safety),
+                safety_settings=self.SAFETY_SETTINGS,
+                generation_config=length_config(MAX_SUMMARY_WORDS),
+            )
+            return enforce_length(
+                response, MAX_SUMMARY_WORDS, SummaryError("Summary over 200 words"), "summary"
             )
-            if len(response.text.split()) > 210:
-                raise SummaryError("Summary over 200 words")
-            return response.text
 
         except Exception as error:
             raise ValueError(f"Error generating summary: {error}") from error
 
+    def stream_summary(self, reviews, api_key1, safety="off"):
+        """
+        Streams a summary of reviews as it is generated.
+
+        Args:
+            reviews (str): The reviews to summarize.
+            api_key1 (str): The API key for the AI model.
+            safety (str, optional): Safety mode for content generation. Defaults to 'off'.
+
+        Returns:
+            iterator: The chunks of the summary.
+
+        Raises:
+            SummaryError: While iterating, once the summary goes over MAX_SUMMARY_WORDS.
+        """
+        model1 = get_model(api_key1, self.SUMMARY_MODEL)
+        response = model1.generate_content(
+            self.summary_prompt(reviews, safety),
+            safety_settings=self.SAFETY_SETTINGS,
+            generation_config=length_config(MAX_SUMMARY_WORDS),
+            stream=True,
+        )
+        return limit_words(
+            response, MAX_SUMMARY_WORDS, SummaryError("Summary over 200 words"), "summary"
+        )
+
     def generate_aspects(self, reviews, api_key2, safety="off"):
         """
         Generate aspect-based sentiment analysis of reviews using an AI model.
@@ -144,49 +299,9 @@ class LetterboxdReviewAnalyzer:
             str: The generated aspect analysis.
         """
         try:
-            genai.configure(api_key=api_key2)
-            model2 = genai.GenerativeModel("gemini-2.0-flash")
-
-            prompt = f"""
-                        The following is a collection of movie reviews from Letterboxd. 
-                        Each new review starts with ">>>".
-
-                        Please analyze these reviews and identify the top 5 most mentioned cinematic aspects of the movie. 
-                        For each aspect, provide the following:
-
-                        1. The percentage of reviews that mention the aspect positively (as an integer).
-                        2. The percentage of reviews that mention the aspect negatively (as an integer).
-
-                        Please return the results as a Python dictionary string that can be directly evaluated using `ast.literal_eval()`. 
-                        The dictionary should have:
-                        - The cinematic aspect names (e.g., "Acting", "Direction", "Dialogue", "Color Scheme" etc.) as keys (strings).
-                        - The values should be lists containing *exactly two integers*:
-                            - The first integer represents the percentage of reviews mentioning the aspect positively.
-                            - The second integer represents the percentage of reviews mentioning the aspect negatively.
+            model2 = get_model(api_key2, self.ASPECTS_MODEL)
 
-                        While calculating the percentages, take into account ALL the reviews, not just the ones that mention that aspect.
-
-                        Example output format:
-                            {{
-                                "Dialogue": [30, 10],
-                                "Direction": [20, 15],
-                                "Cinematography": [2, 10],
-                                "Music": [5, 8],
-                                "Plot": [3, 3],
-                                "Actor Name": [2, 1],
-                                "Director Name": [1, 2]
-                            }}
-                        Do not output the exact same dictionary as the
-                        example output please. Aspects can include, but
-                        are not limited to: acting, direction, cinematography,
-                        sound/music, themes, pacing, performances, visuals, plot,
-                        character development, etc. Do not shy away from
-                        emphasising on negative aspects if that is the case.
-                        The sum of positive and the negative review percentage will
-                        likely be much less than 100, which is expected and okay.
-                        Reviews:
-                        {reviews}
-                    """
+            prompt = self.ASPECTS_PROMPT.format(reviews=reviews)
 
             if safety == "off":
                 prompt += "\n- Do not generate publicly offensive language."
@@ -276,70 +391,100 @@ class LetterboxdReviewAnalyzer:
             str: The generated taste match analysis.
         """
         try:
-            genai.configure(api_key=api_key3)
-            model3 = genai.GenerativeModel("gemini-1.5-pro")
-
-            prompt = f"""
-                        The moview_reviews is a collection of movie reviews from Letterboxd. 
-                        Each new review starts with ">>>".
-
-                        The user_reviews is a collection of a Letterboxd user's movie reviews from Letterboxd. 
-                        Each new review starts with ">>>", with this format "movie_name, rating: review_text".
-
-                        Please analyze both these data and generate a paragraph about the taste match
-                        of the user and the movie. 
-                        
-                        Check if the {movie_name} is present in the user reviews. If it is,
-                        then DO NOT generate a taste match paragraph for this movie.
-                        simply return the user's own review like this - 
-                        'You've already reviewed this movie! You said - (user's own review text, without the movie name and rating)'
-                        
-                        Otherwise, depending on the aspects the user has liked/disliked 
-                        the most in their own reviews, what might they like/dislike about this particular movie? 
-                        Keep your response brief and *STRCITLY* under 200 words and don't give spoilers.
-                        Address it to the user themself in 2nd person.
+            model3 = get_model(api_key3, self.TASTE_MATCH_MODEL)
 
-                        - STRICTLY avoid formatting like bold, italics. No * or _.
-
-                        movie_reviews:
-                        {movie_reviews}
-                        user_reviews:
-                        {user_reviews}
-                    """
+            prompt = self.TASTE_MATCH_PROMPT.format(
+                movie_name=movie_name,
+                movie_reviews=movie_reviews,
+                user_reviews=user_reviews,
+            )
 
             prompt += "\n- Do not generate publicly offensive language."
 
             response = model3.generate_content(
-                prompt, safety_settings=self.SAFETY_SETTINGS
+                prompt,
+                safety_settings=self.SAFETY_SETTINGS,
+                generation_config=length_config(MAX_SUMMARY_WORDS),
+            )
+            return enforce_length(
+                response, MAX_SUMMARY_WORDS, SummaryError("Summary over 200 words"), "taste_match"
             )
-            if len(response.text.split()) > 210:
-                raise SummaryError("Summary over 200 words")
-
-            return response.text
 
         except Exception as error:
             raise ValueError(f"Error generating taste match: {error}") from error
 
-    def get_results(self, reviews, api_key1, api_key2, safety="off"):
+    def results_fingerprint(self, reviews, safety="off"):
         """
-        Generates a summary and aspect analysis for the given movie reviews.
+        Computes the result cache key for a set of reviews.
+
+        The key covers the review text, the prompt templates, the prompt
+        version, the model names, the summary input mode and the safety mode,
+        so any change to how results are generated produces a new key.
 
         Args:
-            reviews (str): The movie reviews to analyze.
-            api_key1 (list): A list of API keys for generating the summary.
-            api_key2 (list): A list of API keys for generating aspect analysis.
+            reviews (str): The output of read_reviews.
+            safety (str, optional): Safety mode for content generation.
+
+        Returns:
+            str: A hex SHA-256 digest.
+        """
+        fingerprint = hashlib.sha256()
+        for part in (
+            str(self.PROMPT_VERSION),
+            self.SUMMARY_MODEL,
+            self.ASPECTS_MODEL,
+            self.SUMMARY_PROMPT,
+            self.ASPECTS_PROMPT,
+            f"{SUMMARY_INPUT}:{EXTRACTIVE_TARGET_WORDS}",
+            safety,
+            reviews,
+        ):
+            fingerprint.update(part.encode("utf-8"))
+            fingerprint.update(b"\0")
+        return f"results:{fingerprint.hexdigest()}"
+
+    def timed(self, branch, func, *args):
+        """
+        Calls func(*args) and logs how long the named branch took.
+
+        Args:
+            branch (str): Name of the branch, used in the log line.
+            func (callable): The function to time.
+
+        Returns:
+            The return value of func.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            print(f"{branch} branch finished in {time.perf_counter() - start:.2f}s")
+
+    def summary_with_retries(self, reviews, api_keys, safety="off"):
+        """
+        Generates a summary, moving on to another API key after each failure.
+
+        Args:
+            reviews (str): The movie reviews to summarize.
+            api_keys (KeyPool | list): The API keys to pick from.
             safety (str, optional): Safety mode for content generation. Defaults to 'off'.
 
         Returns:
-            tuple: A tuple containing the generated summary (str) and the aspect list (list).
+            str: The generated summary, or None if every attempt failed.
         """
-        if len(reviews.split()) < 400:
-            raise ValueError("Not enough reviews found")
+        pool = as_pool(api_keys)
+        tried = []
         summary = None
-        for i in range(3):
+        for _ in range(LLM_ATTEMPTS):
             try:
-                summary = self.generate_summary(reviews, api_key1[i], safety=safety)
-                if len(summary.split()) > 210:
+                summary = call_with_key(
+                    pool,
+                    lambda key: self.generate_summary(reviews, key, safety=safety),
+                    tried,
+                    neutral=(SummaryError,),
+                    kind="summary",
+                )
+                if len(summary.split()) > MAX_SUMMARY_WORDS:
                     raise SummaryError("Summary too long")
                 break
             except (SummaryError, ValueError, TypeError, KeyError) as error:
@@ -347,10 +492,31 @@ class LetterboxdReviewAnalyzer:
                 continue
         else:
             print("Failed to generate summary after 3 tries")
+        return summary
+
+    def aspects_with_retries(self, reviews, api_keys, safety="off"):
+        """
+        Generates the aspect list, moving on to another API key after each failure.
+
+        Args:
+            reviews (str): The movie reviews to analyze.
+            api_keys (KeyPool | list): The API keys to pick from.
+            safety (str, optional): Safety mode for content generation. Defaults to 'off'.
+
+        Returns:
+            list: The processed aspect list, or None if every attempt failed.
+        """
+        pool = as_pool(api_keys)
+        tried = []
         aspect_list = None
-        for i in range(3):
+        for _ in range(LLM_ATTEMPTS):
             try:
-                aspects = self.generate_aspects(reviews, api_key2[i], safety=safety)
+                aspects = call_with_key(
+                    pool,
+                    lambda key: self.generate_aspects(reviews, key, safety=safety),
+                    tried,
+                    kind="aspects",
+                )
                 aspect_list = self.aspect_processor(aspects)
                 break
             except (AspectFormatError, ValueError, TypeError, KeyError) as e:
@@ -359,9 +525,97 @@ class LetterboxdReviewAnalyzer:
         else:
             print("Failed to generate aspects after 3 tries")
             aspect_list = None
+        return aspect_list
+
+    def get_results(self, reviews, api_key1, api_key2, safety="off"):
+        """
+        Generates a summary and aspect analysis for the given movie reviews.
 
+        Args:
+            reviews (str): The movie reviews to analyze.
+            api_key1 (KeyPool | list): The API keys for generating the summary.
+            api_key2 (KeyPool | list): The API keys for generating aspect analysis.
+            safety (str, optional): Safety mode for content generation. Defaults to 'off'.
+
+        Returns:
+            tuple: A tuple containing the generated summary (str) and the aspect list (list).
+                Results for a previously seen set of reviews are served from RESULT_CACHE.
+        """
+        if len(reviews.split()) < MIN_REVIEW_WORDS:
+            raise ValueError("Not enough reviews found")
+
+        cached = self.cached_results(reviews, safety)
+        if cached is not None:
+            return cached
+
+        # The two generations are independent, so run them side by side and
+        # wait for the slower one rather than the sum of both.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            summary_future = executor.submit(
+                self.timed, "summary", self.summary_with_retries, reviews, api_key1, safety
+            )
+            aspects_future = executor.submit(
+                self.timed, "aspects", self.aspects_with_retries, reviews, api_key2, safety
+            )
+            summary = summary_future.result()
+            aspect_list = aspects_future.result()
+
+        self.store_results(reviews, summary, aspect_list, safety)
         return summary, aspect_list
 
+    def cached_results(self, reviews, safety="off"):
+        """
+        Looks up previously generated results for a set of reviews.
+
+        Args:
+            reviews (str): The output of read_reviews.
+            safety (str, optional): Safety mode for content generation.
+
+        Returns:
+            tuple: The cached (summary, aspect_list), or None.
+        """
+        if RESULT_CACHE is None:
+            return None
+        cached = RESULT_CACHE.get(self.results_fingerprint(reviews, safety))
+        return tuple(cached) if cached is not None else None
+
+    def store_results(self, reviews, summary, aspect_list, safety="off"):
+        """
+        Caches generated results for a set of reviews.
+
+        Only complete results are cached so that failures are retried.
+
+        Args:
+            reviews (str): The output of read_reviews.
+            summary (str): The generated summary, or None.
+            aspect_list (list): The processed aspect list, or None.
+            safety (str, optional): Safety mode for content generation.
+        """
+        if RESULT_CACHE is not None and summary is not None and aspect_list is not None:
+            RESULT_CACHE.set(self.results_fingerprint(reviews, safety), (summary, aspect_list))
+
+    def summary_stream_with_retries(self, reviews, api_keys, safety="off"):
+        """
+        Streams a summary, moving on to another API key after each failure.
+
+        Args:
+            reviews (str): The movie reviews to summarize.
+            api_keys (KeyPool | list): The API keys to pick from.
+            safety (str, optional): Safety mode for content generation. Defaults to 'off'.
+
+        Returns:
+            iterator: The summary chunks, with RESTART before each retry that
+                follows sent chunks and CUT_OFF after a reply cut off by
+                max_output_tokens (see stream_with_retries).
+        """
+        return stream_with_retries(
+            as_pool(api_keys),
+            lambda key: self.stream_summary(reviews, key, safety=safety),
+            LLM_ATTEMPTS,
+            neutral=(SummaryError,),
+            label="summary",
+        )
+
     def get_taste_match_result(
         self, user_reviews, movie_reviews, movie_name, api_key3
     ):
@@ -371,7 +625,7 @@ class LetterboxdReviewAnalyzer:
         Args:
             movie_reviews (str): The movie reviews to analyze.
             user_reviews (str): The user reviews to analyze.
-            api_key3 (list): A list of API keys for generating aspect analysis.
+            api_key3 (KeyPool | list): The API keys for generating the taste match.
             safety (str, optional): Safety mode for content generation. Defaults to 'off'.
 
         Returns:
@@ -379,16 +633,24 @@ class LetterboxdReviewAnalyzer:
         """
         if len(user_reviews.split()) < 100:
             raise ValueError("Not enough user reviews found")
-        if len(movie_reviews.split()) < 400:
+        if len(movie_reviews.split()) < MIN_REVIEW_WORDS:
             raise ValueError("Not enough movie reviews found")
 
+        pool = as_pool(api_key3)
+        tried = []
         taste_match = None
-        for i in range(3):
+        for _ in range(LLM_ATTEMPTS):
             try:
-                taste_match = self.generate_taste_match(
-                    user_reviews, movie_reviews, movie_name, api_key3[i]
+                taste_match = call_with_key(
+                    pool,
+                    lambda key: self.generate_taste_match(
+                        user_reviews, movie_reviews, movie_name, key
+                    ),
+                    tried,
+                    neutral=(SummaryError,),
+                    kind="taste_match",
                 )
-                if len(taste_match.split()) > 210:
+                if len(taste_match.split()) > MAX_SUMMARY_WORDS:
                     raise SummaryError("Taste match too long")
                 break
             except (SummaryError, ValueError, TypeError, KeyError) as error:
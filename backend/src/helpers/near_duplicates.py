@@ -0,0 +1,130 @@
+"""
+Near-duplicate detection for film reviews.
+
+Review pages are full of copy-pasted and meme reviews ("peak", "PEAK.",
+"😭😭😭"), and sending each copy to Gemini only makes the prompt longer.
+collapse_near_duplicates groups reviews whose word shingles overlap by at
+least NEAR_DUPLICATE_SIMILARITY (Jaccard) and keeps the first review of each
+group, with the size of the group, so the prompt can say how often it was
+posted.
+
+Candidate pairs are found with MinHash and locality-sensitive hashing instead
+of comparing every pair. The signatures use one-permutation hashing: every
+shingle is hashed once and the hash space is split into SIGNATURE_BINS bins,
+each keeping its smallest hash, which approximates SIGNATURE_BINS independent
+MinHash permutations at the cost of one. Signatures are cut into bands of
+BAND_SIZE bins, and reviews sharing a band are compared on their shingles.
+"""
+
+import os
+import re
+import string
+
+# Minimum Jaccard similarity of two reviews' shingles to count as duplicates
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.6"))
+
+# MinHash signature length; the top bits of a shingle's hash pick its bin
+SIGNATURE_BINS = 64
+BIN_SHIFT = 64 - SIGNATURE_BINS.bit_length() + 1
+
+# Bins per LSH band: smaller bands find more candidate pairs
+BAND_SIZE = 4
+BANDS = [
+    tuple(range(start, start + BAND_SIZE))
+    for start in range(-SIGNATURE_BINS // 2, SIGNATURE_BINS // 2, BAND_SIZE)
+]
+
+# Distinct reviews an LSH bucket may hold before it is ignored
+MAX_BUCKET_SIZE = 32
+
+PUNCTUATION = str.maketrans("", "", string.punctuation + "“”‘’…–—")
+TOKEN = re.compile(r"\w+|\S")
+
+
+def shingles(text):
+    """
+    Returns the word bigrams of a review, ignoring case and punctuation.
+
+    Symbols such as emoji count as words, and a one-word review is its own
+    shingle.
+    """
+    tokens = TOKEN.findall(text.lower().translate(PUNCTUATION))
+    if len(tokens) < 2:
+        return set(tokens)
+    return set(map(" ".join, zip(tokens, tokens[1:])))
+
+
+def signature(shingle_set):
+    """
+    Returns the one-permutation MinHash signature of a set of shingles.
+
+    Returns:
+        dict: The smallest hash in each non-empty bin, keyed by bin.
+    """
+    # hash() is salted per process, which is fine as signatures are never stored
+    hashes = sorted(map(hash, shingle_set), reverse=True)
+    # Hashes are visited largest first, so each bin ends up with its smallest
+    return dict(zip(map(BIN_SHIFT.__rrshift__, hashes), hashes))
+
+
+def band_keys(sig):
+    """Returns the LSH bucket keys of a signature, skipping empty bands."""
+    return [(bins[0], *map(sig.get, bins)) for bins in BANDS if not sig.keys().isdisjoint(bins)]
+
+
+def jaccard(first, second):
+    """Returns the Jaccard similarity of two sets."""
+    if not first and not second:
+        return 1.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def collapse_near_duplicates(reviews_list, threshold=None):
+    """
+    Collapses groups of near-duplicate reviews into their first review.
+
+    Args:
+        reviews_list (list): Reviews with a 'review_text' key.
+        threshold (float, optional): Minimum Jaccard similarity;
+            NEAR_DUPLICATE_SIMILARITY by default.
+
+    Returns:
+        list: One review per group, in the original order, with a 'duplicates'
+            key holding the group size.
+    """
+    threshold = NEAR_DUPLICATE_SIMILARITY if threshold is None else threshold
+    kept = []
+    kept_shingles = []
+    buckets = {}
+    for review in reviews_list:
+        review_shingles = shingles(review.get("review_text") or "")
+        keys = band_keys(signature(review_shingles))
+
+        match = None
+        size = len(review_shingles)
+        for candidate in dict.fromkeys(i for key in keys for i in buckets.get(key) or ()):
+            other = kept_shingles[candidate]
+            # The similarity can be no higher than the ratio of the set sizes
+            if min(size, len(other)) < threshold * max(size, len(other)):
+                continue
+            if jaccard(review_shingles, other) >= threshold:
+                match = candidate
+                break
+        if match is not None:
+            kept[match]["duplicates"] += 1
+            continue
+
+        for key in keys:
+            bucket = buckets.setdefault(key, [])
+            if bucket is None:
+                continue
+            if len(bucket) >= MAX_BUCKET_SIZE:
+                # Shared by too many distinct reviews to mean anything, like
+                # a bucket holding only a common shingle such as "of the"
+                buckets[key] = None
+            else:
+                bucket.append(len(kept))
+        kept.append({**review, "duplicates": 1})
+        kept_shingles.append(review_shingles)
+    return kept
@@ -0,0 +1,124 @@
+"""
+Length limits of the Gemini replies.
+
+The summary and taste match must stay within 210 words and the roast within
+710. A reply over its limit used to be rejected only after it had been
+generated in full, and the retry paid for the whole generation again. Each
+call now sets max_output_tokens from its word limit, so Gemini stops well
+past it instead of running on, and a reply cut off there is trimmed back to its complete sentences
+within the limit instead of being retried. Streamed replies are abandoned as soon as
+they go over (see streaming.limit_words).
+
+LENGTH_STATS counts how often each limit is hit, to check that rejections
+stay rare and to tune TOKENS_PER_WORD.
+"""
+
+import math
+import re
+import threading
+
+from google.ai import generativelanguage as glm
+
+# max_output_tokens per word of the limit. English averages about 1.3 Gemini
+# tokens per word, so twice that leaves a reply within its word limit room to
+# finish; the word count itself is checked by enforce_length and limit_words
+TOKENS_PER_WORD = 2
+
+MAX_TOKENS = glm.Candidate.FinishReason.MAX_TOKENS
+
+# End of a sentence, including closing quotes or brackets
+SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*(?=\s|$)")
+
+
+class LengthStats:
+    """Thread-safe counters of the length limits, per kind of reply."""
+
+    FIELDS = ("replies", "token_limit", "rejected", "aborted")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record(self, kind, **counts):
+        """Adds to the counters of a kind of reply."""
+        with self._lock:
+            counters = self._counters.setdefault(kind, dict.fromkeys(self.FIELDS, 0))
+            for name, count in counts.items():
+                counters[name] += count
+
+    def as_dict(self):
+        """
+        Returns the counters.
+
+        Returns:
+            dict: Per kind of reply, replies (checked against the limit),
+                token_limit (cut off by max_output_tokens), rejected (over the
+                word limit once generated) and aborted (streams abandoned
+                when they went over).
+        """
+        with self._lock:
+            return {kind: dict(counters) for kind, counters in self._counters.items()}
+
+
+LENGTH_STATS = LengthStats()
+
+
+def length_config(max_words):
+    """
+    Returns the generation config capping a reply near a word limit.
+
+    Args:
+        max_words (int): The word limit of the reply.
+
+    Returns:
+        dict: A generation_config for generate_content.
+    """
+    return {"max_output_tokens": math.ceil(max_words * TOKENS_PER_WORD)}
+
+
+def hit_token_limit(response):
+    """Returns whether Gemini stopped a reply at max_output_tokens."""
+    # Streamed chunks before the last one, and blocked replies, have no
+    # candidate with a finish reason
+    try:
+        return response.candidates[0].finish_reason == MAX_TOKENS
+    except (AttributeError, IndexError, TypeError):
+        return False
+
+
+def trim_to_sentence(text, max_words):
+    """Cuts a reply after its last complete sentence within max_words."""
+    end = 0
+    for match in SENTENCE_END.finditer(text):
+        if len(text[:match.end()].split()) > max_words:
+            break
+        end = match.end()
+    return text[:end]
+
+
+def enforce_length(response, max_words, error, kind):
+    """
+    Returns the text of a Gemini reply within its word limit.
+
+    A reply cut off by max_output_tokens is trimmed to its complete
+    sentences within the limit.
+
+    Args:
+        response (GenerateContentResponse): The reply.
+        max_words (int): The word limit.
+        error (Exception): Raised when the reply is still over the limit, or
+            nothing is left of it once trimmed.
+        kind (str): The kind of reply, for LENGTH_STATS.
+
+    Returns:
+        str: The text of the reply.
+    """
+    text = response.text
+    cut_off = hit_token_limit(response)
+    if cut_off:
+        text = trim_to_sentence(text, max_words)
+    rejected = len(text.split()) > max_words or (cut_off and not text)
+    LENGTH_STATS.record(kind, replies=1, token_limit=int(cut_off), rejected=int(rejected))
+    if rejected:
+        raise error
+    return text
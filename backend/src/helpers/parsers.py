@@ -0,0 +1,115 @@
+"""
+HTML parser backends for the Letterboxd scrapers.
+
+Every page is parsed with BeautifulSoup, but the tree builder underneath is
+pluggable. lxml builds the tree several times faster than Python's built-in
+html.parser, so it is used whenever it is installed unless the HTML_PARSER
+environment variable asks for a specific backend.
+
+Review pages are mostly site chrome (navigation, sidebars, footer, scripts)
+around the handful of elements the scrapers read. Callers can pass a
+SoupStrainer so that only the matching subtrees are built, which cuts both
+parse time and memory per page. PARTIAL_PARSE=false turns this off and always
+builds the whole tree.
+"""
+
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Supported tree builders, fastest first, with the module each one needs
+PARSER_BACKENDS = {
+    "lxml": "lxml",
+    "html.parser": None,
+}
+
+
+def available_backends():
+    """
+    Lists the parser backends that can be used in this environment.
+
+    Returns:
+        list: Backend names, fastest first.
+    """
+    return [
+        name for name, module in PARSER_BACKENDS.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+
+def resolve_backend(name):
+    """
+    Resolves a configured backend name to one that is installed.
+
+    Args:
+        name (str): A backend name, or "auto" for the fastest installed one.
+
+    Returns:
+        str: The backend to pass to BeautifulSoup.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    available = available_backends()
+    if name == "auto":
+        return available[0]
+    if name not in PARSER_BACKENDS:
+        raise ValueError(
+            f"Unknown HTML parser backend: {name}. Choose from {list(PARSER_BACKENDS)}"
+        )
+    if name not in available:
+        raise ValueError(f"HTML parser backend {name} is not installed")
+    return name
+
+
+HTML_PARSER = resolve_backend(os.getenv("HTML_PARSER", "auto"))
+
+# Whether make_soup honours parse_only strainers
+PARTIAL_PARSE = os.getenv("PARTIAL_PARSE", "true").lower() == "true"
+
+# Version of what the scrapers extract from a page. Bump it whenever a parse
+# function's output changes so that persistent caches drop the old results.
+PARSER_VERSION = 1
+
+
+def class_strainer(names, *classes):
+    """
+    Builds a strainer that keeps elements carrying any of the given classes.
+
+    While a page is being parsed the strainer sees the raw class attribute
+    (e.g. "paginate-page paginate-current"), so it is split here rather than
+    relying on BeautifulSoup's usual per-class matching.
+
+    Args:
+        names (str | list): Tag name(s) to keep.
+        *classes (str): CSS classes; an element needs at least one of them.
+
+    Returns:
+        bs4.SoupStrainer: The strainer, to pass to make_soup as parse_only.
+    """
+    wanted = frozenset(classes)
+
+    def has_wanted_class(value):
+        return value is not None and not wanted.isdisjoint(value.split())
+
+    return SoupStrainer(names, class_=has_wanted_class)
+
+
+def make_soup(html_content, backend=None, parse_only=None):
+    """
+    Parses an HTML page with the configured backend.
+
+    Args:
+        html_content (str): The page to parse.
+        backend (str, optional): Overrides the configured HTML_PARSER backend.
+        parse_only (bs4.SoupStrainer, optional): Only builds the elements the
+            strainer matches (and their descendants), unless PARTIAL_PARSE
+            is off.
+
+    Returns:
+        bs4.BeautifulSoup: The parsed document.
+    """
+    if parse_only is None or not PARTIAL_PARSE:
+        return BeautifulSoup(html_content, backend or HTML_PARSER)
+    return BeautifulSoup(html_content, backend or HTML_PARSER, parse_only=parse_only)
@@ -0,0 +1,151 @@
+"""
+Token-bucket rate limiter shared by every fetch from Letterboxd.
+
+Without it each API request fires its dozens of page fetches as fast as the
+connection pool allows, and under load the combined rate gets the process
+throttled. The limiter hands out tokens at a fixed rate with a bounded burst.
+Fetches that find the bucket empty wait in a queue per owner (one owner per
+API request), and tokens are handed to the owners in turn, so a request for
+forty review pages cannot starve a profile lookup queued behind it.
+"""
+
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+
+# The API request a fetch is made for. Fetches without an owner share a queue.
+current_owner = contextvars.ContextVar("current_owner", default=None)
+
+
+class RateLimiter:
+    """
+    A token bucket with round-robin queuing across owners.
+
+    The limiter is not thread-safe: it must only be used from one event loop,
+    the scraping engine's.
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): Tokens added per second. 0 disables the limit.
+            burst (int): Bucket size, the number of fetches that may start at
+                once after an idle period.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.counters = {
+            "acquired": 0, "delayed": 0, "throttled": 0, "total_wait": 0.0, "max_wait": 0.0
+        }
+        self._tokens = float(self.burst)
+        self._updated = None
+        self._queues = OrderedDict()
+        self._timer = None
+
+    async def acquire(self, owner=None):
+        """
+        Waits for a token.
+
+        Args:
+            owner (object, optional): The API request the fetch belongs to.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        if self.rate <= 0:
+            self.counters["acquired"] += 1
+            return 0.0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._refill(started)
+        if not self._queues and self._tokens >= 1:
+            self._tokens -= 1
+            self._record(0.0)
+            return 0.0
+
+        future = loop.create_future()
+        self._queues.setdefault(owner, deque()).append(future)
+        self._schedule(loop)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._discard(owner, future)
+            raise
+        waited = loop.time() - started
+        self._record(waited)
+        return waited
+
+    def record_throttled(self):
+        """Counts a response telling us to slow down (429 or 503)."""
+        self.counters["throttled"] += 1
+
+    def queue_depth(self):
+        """Returns the number of fetches waiting for a token."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def info(self):
+        """
+        Returns the limiter configuration, queue and counters.
+
+        Returns:
+            dict: rate, burst, queue_depth, waiting_owners, acquired, delayed,
+                avg_wait, max_wait and throttled.
+        """
+        acquired = self.counters["acquired"]
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "queue_depth": self.queue_depth(),
+            "waiting_owners": len(self._queues),
+            "acquired": acquired,
+            "delayed": self.counters["delayed"],
+            "avg_wait": round(self.counters["total_wait"] / acquired, 4) if acquired else None,
+            "max_wait": round(self.counters["max_wait"], 4),
+            "throttled": self.counters["throttled"],
+        }
+
+    def _refill(self, now):
+        """Adds the tokens earned since the last refill."""
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _schedule(self, loop):
+        """Wakes the dispatcher when the next token is due."""
+        if self._timer is None:
+            delay = max(0.0, (1 - self._tokens) / self.rate)
+            self._timer = loop.call_later(delay, self._dispatch, loop)
+
+    def _dispatch(self, loop):
+        """Hands the available tokens to the waiting owners in turn."""
+        self._timer = None
+        self._refill(loop.time())
+        while self._tokens >= 1 and self._queues:
+            owner, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            if future.done():
+                continue
+            future.set_result(None)
+            self._tokens -= 1
+        if self._queues:
+            self._schedule(loop)
+
+    def _discard(self, owner, future):
+        """Removes a cancelled fetch from its owner's queue."""
+        queue = self._queues.get(owner)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._queues[owner]
+
+    def _record(self, waited):
+        """Updates the wait counters for a granted token."""
+        self.counters["acquired"] += 1
+        self.counters["total_wait"] += waited
+        self.counters["max_wait"] = max(self.counters["max_wait"], waited)
+        if waited > 0:
+            self.counters["delayed"] += 1
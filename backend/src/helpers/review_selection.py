@@ -0,0 +1,130 @@
+"""
+Selection of the film reviews sent to Gemini.
+
+A popular film yields hundreds of reviews, and joining all of them makes for
+slow, expensive prompts that can overflow the model's context. select_reviews
+trims the scraped reviews to a token budget while keeping them representative:
+empty reviews are dropped, near-duplicates are collapsed into one review with
+a count (see near_duplicates), very long reviews are truncated, and the budget
+is shared across rating buckets in proportion to how many reviews each bucket
+has, so the aspect percentages still reflect the whole audience.
+Rated reviews are preferred over unrated ones.
+"""
+
+import math
+import os
+
+from src.helpers.near_duplicates import collapse_near_duplicates
+
+# Approximate tokens of review text per prompt (0 disables the budget)
+REVIEW_TOKEN_BUDGET = int(os.getenv("REVIEW_TOKEN_BUDGET", "8000"))
+
+# Reviews longer than this many tokens are truncated
+MAX_REVIEW_TOKENS = int(os.getenv("MAX_REVIEW_TOKENS", "300"))
+
+# Gemini averages about four characters of English text per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Estimates the number of tokens Gemini counts for a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def rating_bucket(rating):
+    """
+    Returns the whole-star bucket of a Letterboxd rating such as "★★★½".
+
+    Returns:
+        int | None: 0 to 5, or None for an unrated review.
+    """
+    if not rating or ("★" not in rating and "½" not in rating):
+        return None
+    return rating.count("★")
+
+
+def truncate_review(text, max_tokens):
+    """Cuts a review to at most max_tokens at a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def stratified_order(reviews):
+    """
+    Orders reviews so that every prefix keeps the rating mix of the whole set.
+
+    Rated reviews are interleaved across buckets in proportion to the bucket
+    sizes, each bucket keeping its original order; unrated reviews follow.
+
+    Args:
+        reviews (list): (index, bucket) pairs.
+
+    Returns:
+        list: The same pairs, reordered.
+    """
+    buckets = {}
+    for review in reviews:
+        buckets.setdefault(review[1], []).append(review)
+    unrated = buckets.pop(None, [])
+    taken = dict.fromkeys(buckets, 0)
+
+    ordered = []
+    while len(ordered) < len(reviews) - len(unrated):
+        # The bucket furthest behind its share goes next
+        bucket, members = min(
+            ((b, members) for b, members in buckets.items() if taken[b] < len(members)),
+            key=lambda item: ((taken[item[0]] + 1) / len(item[1]), item[0]),
+        )
+        ordered.append(members[taken[bucket]])
+        taken[bucket] += 1
+    return ordered + unrated
+
+
+def select_reviews(reviews_list, token_budget=None, max_review_tokens=None):
+    """
+    Selects the reviews to send to Gemini within a token budget.
+
+    Args:
+        reviews_list (list): Scraped reviews with 'review_text' and 'rating'.
+        token_budget (int, optional): Token budget for the review texts;
+            REVIEW_TOKEN_BUDGET by default. 0 keeps every usable review.
+        max_review_tokens (int, optional): Per-review cap; MAX_REVIEW_TOKENS
+            by default.
+
+    Returns:
+        list: The selected reviews, in their original order, with long review
+            texts truncated and a 'duplicates' count.
+    """
+    token_budget = REVIEW_TOKEN_BUDGET if token_budget is None else token_budget
+    max_review_tokens = MAX_REVIEW_TOKENS if max_review_tokens is None else max_review_tokens
+
+    candidates = []
+    for review in reviews_list:
+        text = (review.get("review_text") or "").strip()
+        if not text:
+            continue
+        if max_review_tokens:
+            text = truncate_review(text, max_review_tokens)
+        candidates.append({**review, "review_text": text})
+    candidates = collapse_near_duplicates(candidates)
+
+    if not token_budget:
+        return candidates
+
+    selected = []
+    remaining = token_budget
+    order = [(index, rating_bucket(review.get("rating")))
+             for index, review in enumerate(candidates)]
+    for index, _ in stratified_order(order):
+        # The " >>>" separator costs about one token per review, and the
+        # "(posted N times)" note of a collapsed review about four more
+        review = candidates[index]
+        cost = estimate_tokens(review["review_text"]) + 1
+        if review["duplicates"] > 1:
+            cost += 4
+        if cost <= remaining:
+            selected.append(index)
+            remaining -= cost
+    return [candidates[index] for index in sorted(selected)]
@@ -3,7 +3,13 @@ Module containing functions for generating a savage roast based on Letterboxd
 user reviews and statistics.
 """
 
-import google.generativeai as genai
+from src.helpers.gemini_clients import get_model
+from src.helpers.key_pool import as_pool
+from src.helpers.output_limits import enforce_length, length_config
+from src.helpers.streaming import limit_words, stream_with_retries
+
+# Words a roast may have
+MAX_ROAST_WORDS = 710
 
 
 class RoastGenerationError(Exception):
@@ -57,24 +63,17 @@ class LetterboxdRoastAnalyzer:
         )
         return combined_text
 
-    def generate_roast(self, user_data, api_key):
+    def roast_prompt(self, user_data):
         """
-        Generates a savage roast using the provided user data.
+        Builds the roast prompt.
 
         Args:
             user_data (str): The combined reviews and stats text.
-            api_key (str): The API key for the AI model.
 
         Returns:
-            str: The generated roast.
-
-        Raises:
-            RoastGenerationError: If the roast is too long or an error occurs.
+            str: The prompt.
         """
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        prompt = f""" You're a ruthless, wildly funny film critic, and your job is to
+        return f""" You're a ruthless, wildly funny film critic, and your job is to
                       obliterate this user's Letterboxd taste in a way that's fast, savage,
                       and impossible to ignore. No lists, no formatting—just a single,
                       flowing paragraph that roasts them so brutally they’ll question
@@ -100,23 +99,63 @@ class LetterboxdRoastAnalyzer:
                       must be plain text only.
                   """
 
-        response = model.generate_content(prompt)
-        roast = response.text
+    def generate_roast(self, user_data, api_key):
+        """
+        Generates a savage roast using the provided user data.
+
+        Args:
+            user_data (str): The combined reviews and stats text.
+            api_key (str): The API key for the AI model.
 
-        if len(roast.split()) > 710:
-            raise RoastGenerationError("Roast generated is too long.")
+        Returns:
+            str: The generated roast.
 
-        return roast
+        Raises:
+            RoastGenerationError: If the roast is too long or an error occurs.
+        """
+        model = get_model(api_key, "gemini-2.0-flash")
+
+        response = model.generate_content(
+            self.roast_prompt(user_data), generation_config=length_config(MAX_ROAST_WORDS)
+        )
+        return enforce_length(
+            response, MAX_ROAST_WORDS, RoastGenerationError("Roast generated is too long."), "roast"
+        )
+
+    def stream_roast(self, user_data, api_key):
+        """
+        Streams a savage roast as it is generated.
+
+        Args:
+            user_data (str): The combined reviews and stats text.
+            api_key (str): The API key for the AI model.
+
+        Returns:
+            iterator: The chunks of the roast.
+
+        Raises:
+            RoastGenerationError: While iterating, once the roast goes over MAX_ROAST_WORDS.
+        """
+        model = get_model(api_key, "gemini-2.0-flash")
+        response = model.generate_content(
+            self.roast_prompt(user_data),
+            generation_config=length_config(MAX_ROAST_WORDS),
+            stream=True,
+        )
+        return limit_words(
+            response, MAX_ROAST_WORDS, RoastGenerationError("Roast generated is too long."), "roast"
+        )
 
     def get_results(self, reviews_list, stats_dict, api_keys):
         """
         Generates the final roast by combining reviews and stats, and calling the AI
-        model using multiple API keys if needed.
+        model using multiple API keys if needed. Each key is tried at most once,
+        healthiest first.
 
         Args:
             reviews_list (list): A list of review dictionaries.
             stats_dict (dict): A dictionary containing user statistics.
-            api_keys (list): A list of API keys for generating the roast.
+            api_keys (KeyPool | list): The API keys for generating the roast.
 
         Returns:
             str: The generated roast.
@@ -125,10 +164,14 @@ class LetterboxdRoastAnalyzer:
             RoastGenerationError: If roast generation fails after multiple attempts.
         """
         user_data = self.read_user_data(reviews_list, stats_dict)
+        pool = as_pool(api_keys)
+        tried = []
         roast = None
-        for i, key in enumerate(api_keys):
+        for _ in range(len(pool)):
             try:
-                roast = self.generate_roast(user_data, key)
+                with pool.lease(tried, neutral=(RoastGenerationError,)) as (i, key):
+                    tried.append(i)
+                    roast = self.generate_roast(user_data, key)
                 if roast and roast.strip():
                     break
             except Exception as error:  # pylint: disable=broad-exception-caught
@@ -140,3 +183,30 @@ class LetterboxdRoastAnalyzer:
             )
 
         return roast
+
+    def stream_results(self, reviews_list, stats_dict, api_keys):
+        """
+        Streams the roast, trying each key at most once, healthiest first.
+
+        Args:
+            reviews_list (list): A list of review dictionaries.
+            stats_dict (dict): A dictionary containing user statistics.
+            api_keys (KeyPool | list): The API keys for generating the roast.
+
+        Returns:
+            iterator: The roast chunks, with RESTART before each retry that
+                follows sent chunks and CUT_OFF after a reply cut off by
+                max_output_tokens (see stream_with_retries).
+
+        Raises:
+            ValueError: If reviews_list is empty.
+        """
+        user_data = self.read_user_data(reviews_list, stats_dict)
+        pool = as_pool(api_keys)
+        return stream_with_retries(
+            pool,
+            lambda key: self.stream_roast(user_data, key),
+            len(pool),
+            neutral=(RoastGenerationError,),
+            label="roast",
+        )
@@ -1,10 +1,26 @@
 """
 Scraper functions for extracting movie details and reviews from Letterboxd.
+
+The scrapers are coroutines that run on the shared scraping engine (see
+http_client). Film reviews are a pipeline: iter_reviews streams them page by
+page and collect_reviews stops it once enough text has arrived.
+scrape_reviews and movie_details_scraper are synchronous wrappers around
+scrape_reviews_async and movie_details_scraper_async.
 """
 
+import asyncio
 import re
-import requests
-from bs4 import BeautifulSoup
+from contextlib import aclosing
+from src.helpers import http_client
+from src.helpers.parsers import make_soup, class_strainer, PARSER_VERSION
+from src.helpers.cache import cache_from_env
+from src.helpers.review_selection import select_reviews
+
+# Parsed film pages keyed by film slug and page (see cache_from_env for settings)
+SCRAPER_CACHE = cache_from_env("SCRAPER_CACHE", default_maxsize=2048, version=PARSER_VERSION)
+
+# The only parts of a review page that parse_review_page reads
+REVIEW_PAGE_STRAINER = class_strainer("li", "film-detail", "paginate-page")
 
 
 class ScraperError(Exception):
@@ -17,9 +33,13 @@ def validate_letterboxd_film_url(film_url):
     return bool(re.match(pattern, film_url))
 
 
-def fetch_html_content(url, headers):
-    """Fetches HTML content from a given URL."""
-    response = requests.get(url, headers=headers, timeout=10)
+def film_slug(film_url):
+    """Returns the film slug of a Letterboxd film URL."""
+    return film_url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def response_text(url, response):
+    """Returns the HTML of a successful response, raising ScraperError otherwise."""
     if response.status_code == 200:
         return response.text
     raise ScraperError(
@@ -27,49 +47,205 @@ def fetch_html_content(url, headers):
     )
 
 
-def scrape_reviews(film_url, n=30):
-    """Scrapes reviews from a Letterboxd movie page."""
-    if not validate_letterboxd_film_url(film_url):
-        raise ValueError(f"Invalid URL: {film_url}")
+async def fetch_html_content(url, headers):
+    """Fetches HTML content from a given URL."""
+    return response_text(url, await http_client.get(url, headers=headers, timeout=10))
+
+
+def parse_last_page(soup):
+    """Returns the last page number shown in the paginator, or None if there is none."""
+    pages = [
+        int(link.get_text(strip=True))
+        for link in soup.select("li.paginate-page")
+        if link.get_text(strip=True).isdigit()
+    ]
+    return max(pages) if pages else None
 
-    headers = {"User-Agent": "Mozilla/5.0"}
+
+def parse_review_page(html_content):
+    """
+    Parses a single Letterboxd review page.
+
+    Returns a tuple of the reviews on the page and the last page number from
+    the paginator (None when the page has no paginator). Only the review and
+    paginator elements are built.
+    """
+    soup = make_soup(html_content, parse_only=REVIEW_PAGE_STRAINER)
 
     reviews_data = []
+    for review in soup.select("li.film-detail"):
+        review_text = review.select_one(".js-review-body p")
+        rating = review.select_one(".rating")
+        reviews_data.append({
+            "rating": rating.get_text(strip=True) if rating else None,
+            "review_text": review_text.get_text(strip=True) if review_text else "",
+        })
+
+    return reviews_data, parse_last_page(soup)
+
 
-    for page in range(1, n + 1):
+async def scrape_review_page(film_url, page, headers):
+    """
+    Fetches and parses one review page, returning None if the fetch fails
+    (after the retries of http_client.get), which counts as a dropped page.
+    """
+    cache_key = f"film:{film_slug(film_url)}:reviews:{page}"
+    if SCRAPER_CACHE is not None:
+        cached = SCRAPER_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        html_content = await fetch_html_content(
+            f"{film_url}reviews/by/activity/page/{page}/", headers
+        )
+    except ScraperError:
+        http_client.RETRY_STATS.record(pages_dropped=1)
+        return None
+
+    result = parse_review_page(html_content)
+    if SCRAPER_CACHE is not None:
+        SCRAPER_CACHE.set(cache_key, result)
+    return result
+
+
+def count_words(reviews_data):
+    """Counts the words across the review texts of scraped reviews."""
+    return sum(len(review["review_text"].split()) for review in reviews_data)
+
+
+def target_reached(reviews_data, min_reviews=None, min_words=None):
+    """
+    Checks whether enough reviews have been collected to stop fetching pages.
+
+    min_words counts the words left once select_reviews has truncated long
+    reviews and collapsed near-duplicates, which is what reaches Gemini. The
+    raw count is checked first as it is an upper bound and much cheaper.
+    """
+    if min_reviews is None and min_words is None:
+        return False
+    if min_reviews is not None and len(reviews_data) < min_reviews:
+        return False
+    return min_words is None or (
+        count_words(reviews_data) >= min_words
+        and count_words(select_reviews(reviews_data)) >= min_words
+    )
+
+
+async def iter_review_pages(film_url, pages, headers, max_workers=1, batch_size=None):
+    """
+    Yields the parsed result of each review page in page order.
+
+    At most max_workers pages are fetched at once. Pages are scheduled a
+    batch at a time (all at once when batch_size is None), so a caller that
+    stops iterating early wastes at most one batch of requests; the rest of
+    that batch is cancelled when the generator is closed.
+    """
+    limit = asyncio.Semaphore(max(1, max_workers))
+    batch_size = batch_size or max(1, len(pages))
+
+    async def fetch(page):
+        async with limit:
+            return await scrape_review_page(film_url, page, headers)
+
+    for start in range(0, len(pages), batch_size):
+        tasks = [asyncio.ensure_future(fetch(page)) for page in pages[start:start + batch_size]]
         try:
-            html_content = fetch_html_content(
-                f"{film_url}reviews/by/activity/page/{page}/", headers
-            )
-        except ScraperError:
-            continue
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def iter_reviews(film_url, n=30, max_workers=1, batched=False):
+    """
+    Yields the reviews of a Letterboxd movie page, one page's list at a time.
+
+    The first page is fetched on its own so its paginator can cap the number of
+    pages requested; without a paginator, the stream ends at the first empty
+    page. Up to max_workers pages are fetched and parsed concurrently, and each
+    page is yielded as soon as it and the pages before it have arrived. Pages
+    that fail to fetch are skipped.
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        reviews = soup.select("li.film-detail")
+    Consumers that may stop early should pass batched=True (implied when there
+    is no paginator): pages are then requested max_workers at a time instead of
+    all at once. Closing the generator cancels its outstanding fetches.
+    """
+    if not validate_letterboxd_film_url(film_url):
+        raise ValueError(f"Invalid URL: {film_url}")
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    last_page = None
 
+    first_page = await scrape_review_page(film_url, 1, headers) if n >= 1 else None
+    if first_page is not None:
+        reviews, last_page = first_page
         if not reviews:
-            pass
+            return
+        yield reviews
 
-        for review in reviews:
-            review_text = review.select_one(".js-review-body p")
-            rating = review.select_one(".rating")
-            reviews_data.append({
-                "rating": rating.get_text(strip=True) if rating else None,
-                "review_text": review_text.get_text(strip=True) if review_text else "",
-            })
+    pages = list(range(2, min(n, last_page or n) + 1))
+    async with aclosing(iter_review_pages(
+        film_url, pages, headers, max_workers,
+        batch_size=max_workers if batched or last_page is None else None,
+    )) as results:
+        async for result in results:
+            if result is None:
+                continue
+            reviews, _ = result
+            if not reviews:
+                return
+            yield reviews
 
+
+async def collect_reviews(review_pages, min_reviews=None, min_words=None):
+    """
+    Accumulates a stream of review pages (see iter_reviews).
+
+    Once min_reviews and/or min_words is reached the stream is closed, which
+    cancels the fetches of pages that would not be used.
+
+    Returns:
+        list: The collected reviews, in page order.
+    """
+    reviews_data = []
+    async with aclosing(review_pages) as stream:
+        async for reviews in stream:
+            reviews_data.extend(reviews)
+            if target_reached(reviews_data, min_reviews, min_words):
+                break
     return reviews_data
 
 
-def movie_details_scraper(url):
-    """Scrapes movie details and backdrop image from Letterboxd."""
-    if not validate_letterboxd_film_url(url):
-        raise ValueError(f"Invalid URL: {url}")
+async def scrape_reviews_async(film_url, n=30, max_workers=1, min_reviews=None,
+                               min_words=None):
+    """
+    Scrapes reviews from a Letterboxd movie page.
+
+    Reviews are streamed from iter_reviews into collect_reviews: when
+    min_reviews and/or min_words is given, pages are only fetched until those
+    targets are met, and the LLM stage can start on what has been collected.
+    Up to max_workers pages are fetched and parsed concurrently; the returned
+    reviews keep the page order either way.
+    """
+    may_stop_early = min_reviews is not None or min_words is not None
+    return await collect_reviews(
+        iter_reviews(film_url, n, max_workers, batched=may_stop_early),
+        min_reviews, min_words,
+    )
+
+
+def scrape_reviews(film_url, n=30, max_workers=1, min_reviews=None, min_words=None):
+    """Scrapes reviews from a Letterboxd movie page (see scrape_reviews_async)."""
+    return http_client.run(
+        scrape_reviews_async(film_url, n, max_workers, min_reviews, min_words)
+    )
 
-    headers = {"User-Agent": "Mozilla/5.0"}
-    html_content = fetch_html_content(url, headers=headers)
 
-    soup = BeautifulSoup(html_content, "html.parser")
+def parse_movie_details(html_content):
+    """Parses movie details and the backdrop image URL from a film page."""
+    soup = make_soup(html_content)
 
     def extract_text(selector):
         element = soup.select_one(selector)
@@ -102,3 +278,35 @@ def movie_details_scraper(url):
     movie_details["backdrop_image_url"] = backdrop_image_url
 
     return movie_details
+
+
+async def movie_details_scraper_async(url):
+    """
+    Scrapes movie details and backdrop image from Letterboxd.
+
+    Once the cached details expire, the film page is revalidated with a
+    conditional GET and the previous details are reused if it is unchanged.
+    """
+    if not validate_letterboxd_film_url(url):
+        raise ValueError(f"Invalid URL: {url}")
+
+    cache_key = f"film:{film_slug(url)}:details"
+    if SCRAPER_CACHE is not None:
+        cached = SCRAPER_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    movie_details = await http_client.get_revalidated(
+        url, cache_key,
+        lambda response: parse_movie_details(response_text(url, response)),
+        headers={"User-Agent": "Mozilla/5.0"}, timeout=10,
+    )
+
+    if SCRAPER_CACHE is not None:
+        SCRAPER_CACHE.set(cache_key, movie_details)
+    return movie_details
+
+
+def movie_details_scraper(url):
+    """Scrapes movie details and backdrop image from Letterboxd."""
+    return http_client.run(movie_details_scraper_async(url))
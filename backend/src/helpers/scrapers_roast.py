@@ -1,44 +1,140 @@
-"""Scraper module for Letterboxd user profiles."""
+"""
+Scraper module for Letterboxd user profiles.
 
-import requests
-from bs4 import BeautifulSoup
+Like scrapers.py, the scrapers are coroutines that run on the shared scraping
+engine, with synchronous wrappers for callers outside it.
+"""
+
+import asyncio
+import httpx
+from src.helpers import http_client
+from src.helpers.parsers import make_soup, class_strainer, PARSER_VERSION
+from src.helpers.cache import cache_from_env
+
+# Recent profile validation results (see cache_from_env for settings)
+PROFILE_CACHE = cache_from_env("PROFILE_CACHE", default_maxsize=1024, default_ttl=300)
+
+# Parsed review pages and stats of members, keyed by username
+USER_CACHE = cache_from_env(
+    "USER_CACHE", default_maxsize=2048, default_ttl=900, version=PARSER_VERSION
+)
+
+# The only parts of a member's review page that parse_user_reviews_page reads
+USER_REVIEWS_STRAINER = class_strainer(["div", "li"], "film-detail-content", "paginate-page")
+
+# Strings that together identify Letterboxd's "page not found" page
+NOT_FOUND_MARKERS = (
+    'class="error message-dark"',
+    "Sorry, we can’t find the page you’ve requested.",
+)
+
+# Statuses of a HEAD request that say nothing about the profile, after which
+# the page is fetched instead
+HEAD_REFUSED = (403, 405, 501)
+
+# In-flight profile probes by cache key, so concurrent validations share one
+# fetch. Only touched from the engine loop.
+_VALIDATIONS = {}
 
 
 class ScraperError(Exception):
     """Custom exception for scraper errors."""
 
 
-def validate_letterboxd_user(username):
+async def probe_letterboxd_user(username):
     """
-    Validates the Letterboxd user profile by checking if it exists.
+    Checks that a Letterboxd profile belongs to a real user.
+
+    Letterboxd answers an unknown member's URL with a 404, so a HEAD request
+    is enough and no profile page is downloaded. Only if the HEAD request is
+    refused is the page fetched, revalidated with a conditional GET when it
+    was seen before, and checked for the "page not found" markers.
 
     Args:
         username (str): The Letterboxd username.
 
     Returns:
         bool: True if the user exists, False otherwise.
+
+    Raises:
+        ScraperError: If the profile cannot be checked.
     """
     profile_url = f"https://letterboxd.com/{username}/"
+    headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(profile_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+        response = await http_client.get(profile_url, headers=headers, timeout=10, method="HEAD")
+        if response.status_code not in HEAD_REFUSED:
+            return profile_exists(response)
+        return await http_client.get_revalidated(
+            profile_url, f"user:{username.lower()}", profile_exists,
+            headers=headers, timeout=10,
+        )
     except Exception as e:
         raise ScraperError(f"Error fetching {profile_url}: {e}") from e
-    if response.status_code != 200:
+
+
+def profile_exists(response):
+    """
+    Checks whether a profile response, page or HEAD, belongs to a real user.
+
+    Only a 404 or the "page not found" page mean that the user does not
+    exist. Any other status, such as a 429 or a 5xx left after the retries,
+    says nothing about the profile and raises, so it is never cached.
+
+    Raises:
+        ScraperError: If the response is neither a 200 nor a 404.
+    """
+    if response.status_code == 404:
         return False
-    soup = BeautifulSoup(response.text, "html.parser")
-    error_h1 = soup.find("h1")
-    error_strong = soup.find("strong")
-    error_body = soup.find("body", class_="error message-dark")
-    if error_h1 and error_strong and error_body:
-        if (
-            "Letterboxd" in error_h1.get_text()
-            and "Sorry, we can’t find the page you’ve requested." in error_strong.get_text()
-        ):
-            return False
-    return True
+    if response.status_code != 200:
+        raise ScraperError(f"Profile check failed. Status code: {response.status_code}")
+    return not all(marker in response.text for marker in NOT_FOUND_MARKERS)
 
 
-def fetch_html_content(url, headers):
+async def validate_letterboxd_user_async(username):
+    """
+    Validates the Letterboxd user profile by checking if it exists.
+
+    Results are kept in PROFILE_CACHE, and concurrent validations of the same
+    username wait for a single profile fetch, so the scrapers of one request
+    (and requests arriving within the cache TTL) share one probe.
+
+    Args:
+        username (str): The Letterboxd username.
+
+    Returns:
+        bool: True if the user exists, False otherwise.
+    """
+    if PROFILE_CACHE is None:
+        return await probe_letterboxd_user(username)
+
+    key = f"user:{username.lower()}"
+    exists = PROFILE_CACHE.get(key)
+    if exists is not None:
+        return exists
+
+    probe = _VALIDATIONS.get(key)
+    if probe is None:
+        probe = asyncio.ensure_future(probe_letterboxd_user(username))
+        probe.add_done_callback(lambda done: _cache_probe(key, done))
+        _VALIDATIONS[key] = probe
+    # Shielded so that one cancelled caller does not cancel the shared probe
+    return await asyncio.shield(probe)
+
+
+def _cache_probe(key, probe):
+    """Stores a finished probe's result and forgets the in-flight probe."""
+    _VALIDATIONS.pop(key, None)
+    if not probe.cancelled() and probe.exception() is None:
+        PROFILE_CACHE.set(key, probe.result())
+
+
+def validate_letterboxd_user(username):
+    """Validates the Letterboxd user profile (see validate_letterboxd_user_async)."""
+    return http_client.run(validate_letterboxd_user_async(username))
+
+
+async def fetch_html_content(url, headers):
     """
     Fetches HTML content from a given URL.
 
@@ -52,7 +148,7 @@ def fetch_html_content(url, headers):
     Raises:
         ScraperError: If fetching the URL fails.
     """
-    response = requests.get(url, headers=headers, timeout=10)
+    response = await http_client.get(url, headers=headers, timeout=10)
     if response.status_code == 200:
         return response.text
     raise ScraperError(f"Failed to fetch {url}. Status code: {response.status_code}")
@@ -99,10 +195,70 @@ def parse_review_element(element):
     }
 
 
-def scrape_user_reviews(username, n_pages=10):
+def parse_user_reviews_page(html_content):
+    """
+    Parses one page of a member's reviews.
+
+    Only the review and paginator elements are built.
+
+    Args:
+        html_content (str): HTML of the review page.
+
+    Returns:
+        tuple: The parsed reviews and the last page number from the paginator
+            (1 when the page has no paginator).
+    """
+    soup = make_soup(html_content, parse_only=USER_REVIEWS_STRAINER)
+    reviews = [
+        parse_review_element(element)
+        for element in soup.find_all("div", class_="film-detail-content")
+    ]
+    pages = [
+        int(link.get_text()) for link in soup.find_all("li", class_="paginate-page")
+        if link.get_text().isdigit()
+    ]
+    return reviews, max(pages) if pages else 1
+
+
+async def scrape_user_review_page(username, page):
+    """
+    Fetches and parses one page of a member's reviews, from USER_CACHE if cached.
+
+    Args:
+        username (str): The Letterboxd username.
+        page (int): The page number, starting at 1.
+
+    Returns:
+        tuple: The parsed reviews and the last page number (see
+            parse_user_reviews_page).
+
+    Raises:
+        ScraperError: If the page cannot be fetched.
+    """
+    cache_key = f"user:{username.lower()}:reviews:{page}"
+    if USER_CACHE is not None:
+        cached = USER_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    url = f"https://letterboxd.com/{username}/films/reviews/"
+    if page > 1:
+        url = f"{url}page/{page}/"
+    result = parse_user_reviews_page(
+        await fetch_html_content(url, {"User-Agent": "Mozilla/5.0"})
+    )
+    if USER_CACHE is not None:
+        USER_CACHE.set(cache_key, result)
+    return result
+
+
+async def scrape_user_reviews_async(username, n_pages=10):
     """
     Scrapes user reviews from a Letterboxd profile.
 
+    The first page is fetched on its own for its paginator, and the pages
+    after it concurrently.
+
     Args:
         username (str): The Letterboxd username.
         n_pages (int): Maximum number of review pages to scrape.
@@ -113,54 +269,49 @@ def scrape_user_reviews(username, n_pages=10):
     Raises:
         ValueError: If the user profile is invalid.
     """
-    if not validate_letterboxd_user(username):
+    if not await validate_letterboxd_user_async(username):
         raise ValueError(f"Invalid or non-existent user profile: {username}")
 
-    base_url = f"https://letterboxd.com/{username}/films/reviews/"
-    soup = BeautifulSoup(fetch_html_content(base_url, {"User-Agent": "Mozilla/5.0"}), "html.parser")
-    try:
-        last_page = max(
-            int(link.get_text()) for link in soup.find_all("li", class_="paginate-page")
-            if link.get_text().isdigit()
-        ) if soup.find_all("li", class_="paginate-page") else 1
-    except ValueError:
-        last_page = 1
-
-    reviews = []
-    for page in range(1, min(n_pages, last_page) + 1):
-        page_url = f"{base_url}page/{page}/"
+    first_reviews, last_page = await scrape_user_review_page(username, 1)
+
+    async def fetch_page(page):
+        # Any error escaping here would fail the whole TaskGroup
         try:
-            page_soup = BeautifulSoup(
-                fetch_html_content(page_url, {"User-Agent": "Mozilla/5.0"}), "html.parser"
-            )
-        except ScraperError:
-            continue
-        for element in page_soup.find_all("div", class_="film-detail-content"):
-            reviews.append(parse_review_element(element))
+            return await scrape_user_review_page(username, page)
+        except (ScraperError, httpx.HTTPError):
+            http_client.RETRY_STATS.record(pages_dropped=1)
+            return None
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [
+            group.create_task(fetch_page(page))
+            for page in range(2, min(n_pages, last_page) + 1)
+        ]
+
+    reviews = list(first_reviews) if n_pages >= 1 else []
+    for task in tasks:
+        if task.result() is not None:
+            page_reviews, _ = task.result()
+            reviews.extend(page_reviews)
     return reviews
 
 
-def scrape_user_stats(username):
+def scrape_user_reviews(username, n_pages=10):
+    """Scrapes user reviews from a Letterboxd profile (see scrape_user_reviews_async)."""
+    return http_client.run(scrape_user_reviews_async(username, n_pages))
+
+
+def parse_user_stats(html_content):
     """
-    Scrapes user statistics from a Letterboxd profile.
+    Parses a member's stats page.
 
     Args:
-        username (str): The Letterboxd username.
+        html_content (str): HTML of the stats page.
 
     Returns:
-        dict: A dictionary containing user statistics, or an empty dict if the stats
-              page is not available.
+        dict: The user statistics, or an empty dict for an error page.
     """
-    if not validate_letterboxd_user(username):
-        raise ValueError(f"Invalid or non-existent user profile: {username}")
-
-    stats_url = f"https://letterboxd.com/{username}/stats"
-    try:
-        html_content = fetch_html_content(stats_url, {"User-Agent": "Mozilla/5.0"})
-    except ScraperError:
-        return {}
-
-    soup = BeautifulSoup(html_content, "html.parser")
+    soup = make_soup(html_content)
     error_h1 = soup.find("h1")
     error_strong = soup.find("strong")
     error_body = soup.find("body", class_="error message-dark")
@@ -183,3 +334,40 @@ def scrape_user_stats(username):
         else:
             stats_dict[key] = None
     return stats_dict
+
+
+async def scrape_user_stats_async(username):
+    """
+    Scrapes user statistics from a Letterboxd profile.
+
+    Args:
+        username (str): The Letterboxd username.
+
+    Returns:
+        dict: A dictionary containing user statistics, or an empty dict if the stats
+              page is not available.
+    """
+    if not await validate_letterboxd_user_async(username):
+        raise ValueError(f"Invalid or non-existent user profile: {username}")
+
+    cache_key = f"user:{username.lower()}:stats"
+    if USER_CACHE is not None:
+        cached = USER_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    stats_url = f"https://letterboxd.com/{username}/stats"
+    try:
+        html_content = await fetch_html_content(stats_url, {"User-Agent": "Mozilla/5.0"})
+    except ScraperError:
+        return {}
+
+    stats_dict = parse_user_stats(html_content)
+    if USER_CACHE is not None:
+        USER_CACHE.set(cache_key, stats_dict)
+    return stats_dict
+
+
+def scrape_user_stats(username):
+    """Scrapes user statistics from a Letterboxd profile (see scrape_user_stats_async)."""
+    return http_client.run(scrape_user_stats_async(username))
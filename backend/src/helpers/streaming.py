@@ -0,0 +1,93 @@
+"""
+Streamed Gemini generations for the Server-Sent Events endpoints.
+
+Gemini's streaming mode returns the text in chunks as it is generated, so
+the first words reach the user after the time to first token rather than
+after the whole reply. The word limits the analyzers apply to a finished
+reply are checked as the chunks arrive instead, and a reply is abandoned as
+soon as it goes over, without paying for the rest of it.
+
+A failed attempt is retried on another key like the non-streamed calls.
+Chunks already sent to the client cannot be taken back, so the stream then
+yields RESTART to tell the client to discard them. A reply cut off by
+max_output_tokens is followed by CUT_OFF, telling the consumer to trim it to
+its complete sentences (see output_limits.trim_to_sentence).
+"""
+
+from src.helpers.output_limits import LENGTH_STATS, hit_token_limit
+
+# Yielded by stream_with_retries before a retry when chunks were already sent
+RESTART = object()
+
+# Yielded by limit_words after the chunks of a reply cut off by max_output_tokens
+CUT_OFF = object()
+
+
+def limit_words(response, max_words, error, kind):
+    """
+    Yields the text of a streamed Gemini response, enforcing a word limit.
+
+    Args:
+        response (iterable): The chunks of generate_content(..., stream=True).
+        max_words (int): Words after which the reply is abandoned.
+        error (Exception): Raised once the reply goes over max_words.
+        kind (str): The kind of reply, for LENGTH_STATS.
+
+    Yields:
+        str: The text of each chunk, then CUT_OFF if max_output_tokens cut
+            the reply off.
+    """
+    text = ""
+    cut_off = False
+    for chunk in response:
+        # Only the last chunk says whether max_output_tokens cut the reply off
+        cut_off = hit_token_limit(chunk)
+        # The last chunk may only carry the finish reason
+        if not chunk.parts:
+            continue
+        text += chunk.text
+        # Counting on the text so far also handles words split across chunks
+        if len(text.split()) > max_words:
+            LENGTH_STATS.record(kind, replies=1, aborted=1)
+            raise error
+        yield chunk.text
+    LENGTH_STATS.record(kind, replies=1, token_limit=int(cut_off))
+    # Chunks already sent cannot be trimmed here, so the consumer does it
+    if cut_off:
+        yield CUT_OFF
+
+
+def stream_with_retries(pool, stream, attempts, neutral=(), label="text"):
+    """
+    Streams a generation, moving on to another API key after each failure.
+
+    Args:
+        pool (KeyPool): The API keys to pick from.
+        stream (callable): Returns the chunk iterator of a generation made
+            with the given key.
+        attempts (int): Generations started before giving up.
+        neutral (tuple, optional): See KeyPool.lease.
+        label (str, optional): What is generated, for the log lines.
+
+    Yields:
+        str: The chunks of the generation, with RESTART before each retry
+            that follows sent chunks, and CUT_OFF as passed on from
+            limit_words. Nothing more is yielded after the last
+            attempt fails, leaving the client with no text.
+    """
+    tried = []
+    for _ in range(attempts):
+        sent = False
+        try:
+            # A client going away closes the stream; that is not the key's fault
+            with pool.lease(tried, neutral=(*neutral, GeneratorExit)) as (index, key):
+                tried.append(index)
+                for chunk in stream(key):
+                    sent = True
+                    yield chunk
+            return
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Error streaming {label}: {error}")
+            if sent:
+                yield RESTART
+    print(f"Failed to stream {label} after {attempts} tries")
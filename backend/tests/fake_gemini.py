@@ -0,0 +1,84 @@
+"""
+Local fake of the Gemini API for tests.
+
+Replaces the models built by gemini_clients with fakes. Each generate_content
+call is recorded with the API key of its model, and keys listed as exhausted
+fail with the 429 error Gemini raises when a key is over its quota.
+Every word counts as one token against max_output_tokens, and streamed calls
+reply one word per chunk.
+"""
+
+import threading
+import time
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from google.api_core.exceptions import ResourceExhausted
+
+from src.helpers.gemini_clients import clear_models
+from src.helpers.output_limits import MAX_TOKENS
+
+STOP = 1
+
+
+class FakeGemini:  # pylint: disable=too-many-instance-attributes
+    """Context manager routing Gemini calls to canned replies."""
+
+    def __init__(self, reply="A short summary.", exhausted=(), failing=(), latency=None,
+                 replies=None):
+        """
+        Args:
+            reply (str): Text of every successful reply.
+            replies (dict, optional): Reply text of particular keys instead of reply.
+            exhausted (iterable): Keys whose calls fail with a quota error.
+            failing (iterable): Keys whose calls fail with another error.
+            latency (dict, optional): Seconds each key's calls take to answer.
+        """
+        self.reply = reply
+        self.exhausted = set(exhausted)
+        self.failing = set(failing)
+        self.latency = latency or {}
+        self.replies = replies or {}
+        self.chunks = 0
+        self.calls = []
+        self._lock = threading.Lock()
+        self._stack = ExitStack()
+
+    def new_model(self, api_key, _model_name):
+        """Stands in for gemini_clients.new_model."""
+        def generate_content(_prompt, stream=False, generation_config=None, **_kwargs):
+            with self._lock:
+                self.calls.append(api_key)
+            time.sleep(self.latency.get(api_key, 0))
+            if api_key in self.exhausted:
+                raise ResourceExhausted("Resource has been exhausted (e.g. check quota).")
+            if api_key in self.failing:
+                raise RuntimeError("Internal error")
+            words = self.replies.get(api_key, self.reply).split(" ")
+            max_tokens = (generation_config or {}).get("max_output_tokens", len(words))
+            candidates = [SimpleNamespace(
+                finish_reason=MAX_TOKENS if len(words) > max_tokens else STOP
+            )]
+            if stream:
+                return self.stream(words[:max_tokens], candidates)
+            return SimpleNamespace(text=" ".join(words[:max_tokens]), candidates=candidates)
+        return SimpleNamespace(generate_content=generate_content)
+
+    def stream(self, words, candidates):
+        """Yields reply words as streamed chunks, ending with the finish reason."""
+        for position, word in enumerate(words):
+            self.chunks += 1
+            text = f" {word}" if position else word
+            yield SimpleNamespace(parts=[text], text=text, candidates=[])
+        yield SimpleNamespace(parts=[], text=None, candidates=candidates)
+
+    def __enter__(self):
+        clear_models()
+        self._stack.callback(clear_models)
+        self._stack.enter_context(patch("src.helpers.gemini_clients.new_model", self.new_model))
+        self._stack.enter_context(patch("src.helpers.letterboxd_analyzers.RESULT_CACHE", None))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
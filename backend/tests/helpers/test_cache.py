@@ -0,0 +1,158 @@
+"""Test suite for the scraper cache backends"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.helpers.cache import TTLCache, SQLiteCache, cache_from_env, decode_value
+
+
+class CacheBackendTests:
+    """Behaviour shared by every cache backend."""
+
+    # pylint: disable=no-member
+
+    def make_cache(self, maxsize=3, ttl=60):
+        """Returns a fresh cache of the backend under test."""
+        raise NotImplementedError
+
+    def test_set_and_get(self):
+        """Test that a stored value is returned and counted as a hit."""
+        cache = self.make_cache()
+        cache.set("film:a:details", {"movie_name": "A"})
+        self.assertEqual(cache.get("film:a:details"), {"movie_name": "A"})
+        self.assertEqual(cache.info()["hits"], 1)
+
+    def test_missing_key(self):
+        """Test that a missing key returns the default and counts a miss."""
+        cache = self.make_cache()
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.get("missing", "fallback"), "fallback")
+        self.assertEqual(cache.info()["misses"], 2)
+
+    def test_expired_entry(self):
+        """Test that entries are dropped after the TTL."""
+        cache = self.make_cache(ttl=10)
+        with patch("src.helpers.cache.time.time", return_value=1000.0):
+            cache.set("key", [1, 2])
+        with patch("src.helpers.cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("key"))
+        info = cache.info()
+        self.assertEqual(info["expirations"], 1)
+        self.assertEqual(info["size"], 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = self.make_cache(maxsize=2)
+        with patch("src.helpers.cache.time.time", return_value=1000.0):
+            cache.set("a", 1)
+        with patch("src.helpers.cache.time.time", return_value=1001.0):
+            cache.set("b", 2)
+        with patch("src.helpers.cache.time.time", return_value=1002.0):
+            cache.get("a")
+        with patch("src.helpers.cache.time.time", return_value=1003.0):
+            cache.set("c", 3)
+        with patch("src.helpers.cache.time.time", return_value=1004.0):
+            self.assertEqual(cache.get("a"), 1)
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.info()["evictions"], 1)
+
+    def test_delete_and_clear(self):
+        """Test removing one entry and all entries."""
+        cache = self.make_cache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TestTTLCache(CacheBackendTests, unittest.TestCase):
+    """Unit tests for the in-process cache."""
+
+    def make_cache(self, maxsize=3, ttl=60):
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+class TestSQLiteCache(CacheBackendTests, unittest.TestCase):
+    """Unit tests for the SQLite cache."""
+
+    def setUp(self):
+        """Create a scratch directory for the database files."""
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmpdir.cleanup()
+
+    def make_cache(self, maxsize=3, ttl=60, version=None):
+        return SQLiteCache(
+            os.path.join(self.tmpdir.name, "cache.sqlite3"),
+            maxsize=maxsize, ttl=ttl, version=version,
+        )
+
+    def test_shared_between_instances(self):
+        """Test that entries survive a new cache object on the same file."""
+        self.make_cache().set("film:a:reviews:1", [[{"rating": None}], 3])
+        self.assertEqual(
+            self.make_cache().get("film:a:reviews:1"), [[{"rating": None}], 3]
+        )
+
+    def test_values_stored_compressed(self):
+        """Test that values are written as compressed compact JSON."""
+        reviews = [{"rating": "★★★★", "review_text": "Great film. " * 50}] * 10
+        cache = self.make_cache()
+        cache.set("film:a:reviews:1", reviews)
+        with sqlite3.connect(cache.path) as connection:
+            (stored,) = connection.execute("SELECT value FROM entries").fetchone()
+        self.assertLess(len(stored), len(json.dumps(reviews)) / 10)
+        self.assertEqual(decode_value(stored), reviews)
+
+    def test_entries_scoped_by_version(self):
+        """Test that entries written under another parser version are not served."""
+        self.make_cache(version=1).set("film:a:details", {"movie_name": "Old"})
+        self.assertIsNone(self.make_cache(version=2).get("film:a:details"))
+        self.assertEqual(
+            self.make_cache(version=1).get("film:a:details"), {"movie_name": "Old"}
+        )
+
+
+class TestCacheFromEnv(unittest.TestCase):
+    """Unit tests for building caches from environment variables."""
+
+    def test_default_backend(self):
+        """Test that the in-process cache is the default."""
+        with patch.dict(os.environ, {}, clear=True):
+            cache = cache_from_env("TEST_CACHE", default_maxsize=5, default_ttl=7)
+        self.assertIsInstance(cache, TTLCache)
+        self.assertEqual((cache.maxsize, cache.ttl), (5, 7))
+
+    def test_disabled_backend(self):
+        """Test that the cache can be turned off."""
+        with patch.dict(os.environ, {"TEST_CACHE_BACKEND": "none"}):
+            self.assertIsNone(cache_from_env("TEST_CACHE"))
+
+    def test_sqlite_backend(self):
+        """Test that the sqlite backend uses the configured path."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "scraper.sqlite3")
+            env = {"TEST_CACHE_BACKEND": "sqlite", "TEST_CACHE_PATH": path}
+            with patch.dict(os.environ, env):
+                cache = cache_from_env("TEST_CACHE")
+            self.assertIsInstance(cache, SQLiteCache)
+            self.assertEqual(cache.path, path)
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend is rejected."""
+        with patch.dict(os.environ, {"TEST_CACHE_BACKEND": "redis"}):
+            with self.assertRaises(ValueError):
+                cache_from_env("TEST_CACHE")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Test suite for the local extractive pre-summarization"""
+
+import unittest
+
+from src.helpers.extractive_summary import (
+    centroid,
+    cosine,
+    extractive_summary,
+    split_sentences,
+    tfidf_vectors,
+)
+
+REVIEWS = " >>>".join([
+    "The score is the best part of the film. The ending felt rushed to me.",
+    "What a score, it carries every scene of the film. Popcorn was stale.",
+    "The lead performance is stunning. The score is the best part of the film!",
+    "The ending felt rushed and the second act drags. My cat sat on me.",
+    "A stunning lead performance and a haunting score carry the film.",
+])
+
+
+class TestExtractiveSummary(unittest.TestCase):
+    """Unit tests for the TF-IDF centroid sentence extraction."""
+
+    def test_split_sentences(self):
+        """Test that reviews are split into sentences tagged with their review."""
+        sentences = split_sentences("Great film. Loved it! >>>Too long?")
+        self.assertEqual(
+            sentences, [(0, "Great film."), (0, "Loved it!"), (1, "Too long?")]
+        )
+
+    def test_vectors_are_normalized(self):
+        """Test that TF-IDF vectors and the centroid have unit length."""
+        vectors = tfidf_vectors(["the score", "the score and the ending", "popcorn"])
+        for vector in vectors + [centroid(vectors)]:
+            self.assertAlmostEqual(cosine(vector, vector), 1.0)
+        self.assertEqual(cosine(vectors[0], vectors[2]), 0.0)
+
+    def test_representative_sentences_picked(self):
+        """Test that sentences on shared topics are kept and off-topic ones dropped."""
+        summary = extractive_summary(REVIEWS, target_words=30)
+        self.assertLessEqual(len(summary.replace(">>>", " ").split()), 30)
+        self.assertIn("score", summary)
+        self.assertNotIn("Popcorn", summary)
+        self.assertNotIn("cat", summary)
+
+    def test_redundant_sentences_skipped(self):
+        """Test that a repeated sentence is only picked once."""
+        summary = extractive_summary(REVIEWS, target_words=40)
+        self.assertEqual(summary.count("The score is the best part of the film"), 1)
+
+    def test_reading_order_and_separators_kept(self):
+        """Test that picked sentences keep their order and review separators."""
+        summary = extractive_summary(REVIEWS, target_words=40)
+        positions = [REVIEWS.index(part.strip()) for part in summary.split(">>>")]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_short_reviews_returned_unchanged(self):
+        """Test that reviews already within the target are not touched."""
+        self.assertEqual(extractive_summary(REVIEWS, target_words=1000), REVIEWS)
+
+    def test_reviews_without_long_sentences_returned_unchanged(self):
+        """Test that the reviews are kept when every sentence is too short to pick."""
+        reviews = " >>>".join(["Peak. Loved it!", "So good. Wow.", "Peak cinema. Ten stars."])
+        self.assertEqual(extractive_summary(reviews, target_words=4), reviews)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Test suite for the shared Gemini model registry"""
+
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+from src.helpers import gemini_clients
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+
+
+@patch("src.helpers.gemini_clients.glm.GenerativeServiceClient")
+class TestGeminiClients(unittest.TestCase):
+    """Unit tests for reusing one model per API key and model name."""
+
+    def setUp(self):
+        """Start each test without shared models."""
+        gemini_clients.clear_models()
+        self.addCleanup(gemini_clients.clear_models)
+
+    def test_model_reused_per_key_and_name(self, _mock_client):
+        """Test that a key and model name always get the same model object."""
+        model = gemini_clients.get_model("key1", "gemini-2.0-flash")
+        self.assertIs(model, gemini_clients.get_model("key1", "gemini-2.0-flash"))
+        self.assertIsNot(model, gemini_clients.get_model("key2", "gemini-2.0-flash"))
+        self.assertIsNot(model, gemini_clients.get_model("key1", "gemini-1.5-flash"))
+
+    def test_model_uses_its_own_key(self, mock_client):
+        """Test that each model gets a client created with its key."""
+        model = gemini_clients.get_model("key1", "gemini-2.0-flash")
+        mock_client.assert_called_once_with(client_options={"api_key": "key1"})
+        self.assertIs(model._client, mock_client.return_value)  # pylint: disable=protected-access
+
+    def test_missing_key_falls_back_to_environment(self, mock_client):
+        """Test that a missing key is read from GEMINI_API_KEY like genai.configure does."""
+        with patch.dict(os.environ, {"GEMINI_API_KEY": "env-key"}):
+            gemini_clients.get_model(None, "gemini-2.0-flash")
+        mock_client.assert_called_once_with(client_options={"api_key": "env-key"})
+
+    def test_concurrent_first_use_builds_one_model(self, mock_client):
+        """Test that threads asking for a new model at once share a single one."""
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            models = list(executor.map(
+                lambda _: gemini_clients.get_model("key1", "gemini-2.0-flash"), range(64)
+            ))
+        self.assertEqual(len({id(model) for model in models}), 1)
+        mock_client.assert_called_once()
+
+    @patch("src.helpers.gemini_clients.genai.configure")
+    def test_global_configuration_untouched(self, mock_configure, _mock_client):
+        """Test that generating a summary does not set the process-wide key."""
+        with patch("src.helpers.gemini_clients.genai.GenerativeModel.generate_content",
+                   return_value=MagicMock(text="A short summary.")):
+            summary = LetterboxdReviewAnalyzer().generate_summary("some reviews", "key1")
+        self.assertEqual(summary, "A short summary.")
+        mock_configure.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
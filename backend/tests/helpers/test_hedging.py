@@ -0,0 +1,105 @@
+"""Test suite for hedged Gemini calls"""
+
+import unittest
+from unittest.mock import patch
+
+from src.helpers import hedging
+from src.helpers.hedging import Hedger, percentile
+from src.helpers.key_pool import KeyPool
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+from tests.fake_gemini import FakeGemini
+
+
+class TestHedger(unittest.TestCase):
+    """Unit tests for hedging slow calls on a second key."""
+
+    def call(self, hedger, gemini, pool):
+        """Makes one hedged call through the fake Gemini."""
+        model = gemini.new_model
+
+        def func(key):
+            return model(key, "gemini-2.0-flash").generate_content("prompt").text
+
+        return hedger.call(pool, func, [])
+
+    def test_fast_call_not_hedged(self):
+        """Test that a call answering before the delay uses a single key."""
+        hedger = Hedger(default_delay=0.5)
+        pool = KeyPool(["a", "b"])
+        with FakeGemini() as gemini:
+            self.assertEqual(self.call(hedger, gemini, pool), "A short summary.")
+        self.assertEqual(gemini.calls, ["a"])
+        self.assertEqual(hedger.info()["hedged"], 0)
+        self.assertEqual(hedger.info()["samples"], 1)
+
+    def test_slow_call_hedged_on_second_key(self):
+        """Test that a slow call is repeated on another key which wins."""
+        hedger = Hedger(default_delay=0.02)
+        pool = KeyPool(["a", "b"])
+        with FakeGemini(latency={"a": 0.5}) as gemini:
+            self.assertEqual(self.call(hedger, gemini, pool), "A short summary.")
+        self.assertEqual(gemini.calls, ["a", "b"])
+        info = hedger.info()
+        self.assertEqual((info["calls"], info["hedged"], info["hedge_wins"]), (1, 1, 1))
+
+    def test_hedge_covers_failing_primary(self):
+        """Test that a slow call ending in an error falls back to the hedge."""
+        hedger = Hedger(default_delay=0.02)
+        pool = KeyPool(["a", "b"])
+        with FakeGemini(failing={"a"}, latency={"a": 0.05, "b": 0.1}) as gemini:
+            self.assertEqual(self.call(hedger, gemini, pool), "A short summary.")
+        self.assertEqual(hedger.info()["hedge_wins"], 1)
+
+    def test_both_calls_failing_raises(self):
+        """Test that the error is raised when neither call succeeds."""
+        hedger = Hedger(default_delay=0.01)
+        pool = KeyPool(["a", "b"])
+        with FakeGemini(failing={"a", "b"}, latency={"a": 0.05}) as gemini:
+            with self.assertRaises(RuntimeError):
+                self.call(hedger, gemini, pool)
+        self.assertEqual(hedger.info()["hedge_wins"], 0)
+        self.assertEqual([key["in_flight"] for key in pool.info()], [0, 0])
+
+    def test_delay_follows_percentile(self):
+        """Test that the default delay is used until enough latencies are known."""
+        hedger = Hedger(pct=90, default_delay=7)
+        for latency in range(1, hedging.MIN_SAMPLES):
+            hedger.record(latency / 10)
+        self.assertEqual(hedger.delay(), 7)
+        hedger.record(2.0)
+        self.assertEqual(hedger.delay(), 1.8)
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+
+
+class TestHedgingWithGemini(unittest.TestCase):
+    """Tests of the analyzers hedging their Gemini calls."""
+
+    def setUp(self):
+        """Start each test with fresh hedge counters."""
+        hedgers = {kind: Hedger(default_delay=0.02) for kind in hedging.HEDGERS}
+        patcher = patch.dict(hedging.HEDGERS, hedgers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_summary_hedged_when_enabled(self):
+        """Test that a stalled summary call is answered by a second key."""
+        pool = KeyPool(["a", "b"])
+        with patch("src.helpers.hedging.HEDGE_REQUESTS", True), \
+                FakeGemini(latency={"a": 0.5}) as gemini:
+            summary = LetterboxdReviewAnalyzer().summary_with_retries("some reviews", pool)
+        self.assertEqual(summary, "A short summary.")
+        self.assertEqual(gemini.calls, ["a", "b"])
+        self.assertEqual(hedging.HEDGERS["summary"].info()["hedge_wins"], 1)
+
+    def test_disabled_by_default(self):
+        """Test that calls wait for their only key when hedging is off."""
+        pool = KeyPool(["a", "b"])
+        with patch("src.helpers.hedging.HEDGE_REQUESTS", False), \
+                FakeGemini(latency={"a": 0.05}) as gemini:
+            LetterboxdReviewAnalyzer().summary_with_retries("some reviews", pool)
+        self.assertEqual(gemini.calls, ["a"])
+        self.assertEqual(hedging.HEDGERS["summary"].info()["calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+"""Test suite for the shared Letterboxd HTTP client"""
+
+import asyncio
+import time
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch, AsyncMock
+
+import httpx
+
+from src.helpers import http_client
+
+
+class TestHttpClient(unittest.TestCase):
+    """Unit tests for the scraping engine and its pooled async client."""
+
+    def tearDown(self):
+        """Stop the shared engine so each test starts fresh."""
+        http_client.close_engine()
+
+    def test_get_engine_is_shared(self):
+        """Test that every caller receives the same engine and client."""
+        self.assertIs(http_client.get_engine(), http_client.get_engine())
+
+    def test_close_engine_resets_shared_engine(self):
+        """Test that a new engine is started after close_engine."""
+        engine = http_client.get_engine()
+        http_client.close_engine()
+        self.assertFalse(engine.thread.is_alive())
+        self.assertTrue(engine.client.is_closed)
+        self.assertIsNot(http_client.get_engine(), engine)
+
+    def test_client_default_headers(self):
+        """Test that the client negotiates compression and sends a user agent."""
+        headers = http_client.get_engine().client.headers
+        self.assertEqual(headers["User-Agent"], "Mozilla/5.0")
+        self.assertIn("gzip", headers["Accept-Encoding"])
+        self.assertEqual(headers["Connection"], "keep-alive")
+
+    def test_run_returns_result_and_raises(self):
+        """Test that run waits for the coroutine and propagates its exception."""
+        async def answer():
+            await asyncio.sleep(0)
+            return 42
+
+        async def fail():
+            raise ValueError("boom")
+
+        self.assertEqual(http_client.run(answer()), 42)
+        with self.assertRaises(ValueError):
+            http_client.run(fail())
+
+    def test_run_from_engine_loop_is_rejected(self):
+        """Test that run refuses to block the engine loop on itself."""
+        async def nested():
+            return http_client.run(asyncio.sleep(0))
+
+        with self.assertRaises(RuntimeError):
+            http_client.run(nested())
+
+    def test_get_uses_shared_client(self):
+        """Test that get forwards the request to the shared client."""
+        engine = http_client.get_engine()
+        with patch.object(engine.client, "get", new_callable=AsyncMock) as mock_get:
+            http_client.run(
+                http_client.get("https://letterboxd.com/", headers={"X-Test": "1"}, timeout=5)
+            )
+        mock_get.assert_called_once_with(
+            "https://letterboxd.com/", headers={"X-Test": "1"}, timeout=5
+        )
+
+    def test_get_caps_requests_in_flight(self):
+        """Test that the global semaphore limits concurrent requests."""
+        requests = {"in_flight": 0, "peak": 0}
+
+        async def slow_get(*_args, **_kwargs):
+            requests["in_flight"] += 1
+            requests["peak"] = max(requests["peak"], requests["in_flight"])
+            await asyncio.sleep(0.01)
+            requests["in_flight"] -= 1
+            return httpx.Response(200)
+
+        async def many_gets():
+            await asyncio.gather(
+                *(http_client.get(f"https://letterboxd.com/{i}/") for i in range(10))
+            )
+
+        with patch("src.helpers.http_client.MAX_CONCURRENT_REQUESTS", 2):
+            engine = http_client.get_engine()
+        with patch.object(engine.client, "get", side_effect=slow_get):
+            http_client.run(many_gets())
+        self.assertEqual(requests["peak"], 2)
+
+    def test_get_counts_throttled_responses(self):
+        """Test that requests take a rate limiter token and 429s are counted."""
+        engine = http_client.get_engine()
+        with patch.object(engine.client, "get", new_callable=AsyncMock,
+                          return_value=httpx.Response(429)), \
+                patch("src.helpers.http_client.RETRY_ATTEMPTS", 0):
+            http_client.run(http_client.get("https://letterboxd.com/"))
+        info = engine.limiter.info()
+        self.assertEqual(info["acquired"], 1)
+        self.assertEqual(info["throttled"], 1)
+
+
+@patch("src.helpers.http_client.RETRY_BACKOFF", 0.001)
+class TestRetries(unittest.TestCase):
+    """Unit tests for the retries of throttled and failed requests."""
+
+    def setUp(self):
+        """Count retries from zero in each test."""
+        self.calls = 0
+        stats = patch("src.helpers.http_client.RETRY_STATS", http_client.RetryStats())
+        self.stats = stats.start()
+        self.addCleanup(stats.stop)
+
+    def tearDown(self):
+        """Stop the shared engine so each test starts fresh."""
+        http_client.close_engine()
+
+    def get(self, responses, deadline=None):
+        """Sends a request whose attempts get the given responses or errors in turn."""
+        async def get_before_deadline():
+            if deadline is not None:
+                http_client.current_deadline.set(time.monotonic() + deadline)
+            return await http_client.get("https://letterboxd.com/")
+
+        engine = http_client.get_engine()
+        with patch.object(engine.client, "get", new_callable=AsyncMock,
+                          side_effect=responses) as mock_get:
+            try:
+                return http_client.run(get_before_deadline())
+            finally:
+                self.calls = mock_get.call_count
+
+    def test_throttled_request_is_retried(self):
+        """Test that a 429 is retried and the later success returned."""
+        response = self.get([
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(503),
+            httpx.Response(200, text="ok"),
+        ])
+        self.assertEqual(response.text, "ok")
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.stats.as_dict()["retries"], 2)
+        self.assertEqual(self.stats.as_dict()["recovered"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 404 is returned without a retry."""
+        response = self.get([httpx.Response(404), httpx.Response(200)])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.calls, 1)
+
+    def test_last_response_returned_after_retries(self):
+        """Test that the last failure is returned once the retries run out."""
+        with patch("src.helpers.http_client.RETRY_ATTEMPTS", 2):
+            response = self.get([httpx.Response(503)] * 3)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.stats.as_dict()["exhausted"], 1)
+
+    def test_transport_error_is_retried_then_raised(self):
+        """Test that connection errors are retried and the last one raised."""
+        error = httpx.ConnectError("refused")
+        self.assertEqual(self.get([error, httpx.Response(200)]).status_code, 200)
+        with patch("src.helpers.http_client.RETRY_ATTEMPTS", 1):
+            with self.assertRaises(httpx.ConnectError):
+                self.get([error, error])
+
+    def test_retry_past_deadline_is_skipped(self):
+        """Test that no retry is made when Retry-After outlasts the deadline."""
+        started = time.perf_counter()
+        response = self.get(
+            [httpx.Response(429, headers={"Retry-After": "30"}), httpx.Response(200)],
+            deadline=5,
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.calls, 1)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_long_retry_after_is_not_waited_for(self):
+        """Test that a Retry-After past RETRY_MAX_BACKOFF ends the retries without a deadline."""
+        started = time.perf_counter()
+        response = self.get([httpx.Response(503, headers={"Retry-After": "3600"}),
+                             httpx.Response(200)])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.calls, 1)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(self.stats.as_dict()["exhausted"], 1)
+
+    def test_retry_delay(self):
+        """Test that Retry-After is honoured and the backoff is jittered."""
+        self.assertEqual(http_client.retry_delay(0, "7"), 7.0)
+        in_a_minute = formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(http_client.retry_delay(0, in_a_minute), 60, delta=2)
+        with patch("src.helpers.http_client.RETRY_BACKOFF", 1.0):
+            delays = [http_client.retry_delay(3) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= 8 for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+            self.assertLessEqual(http_client.retry_delay(20), http_client.RETRY_MAX_BACKOFF)
+
+
+if __name__ == "__main__":
+    unittest.main()
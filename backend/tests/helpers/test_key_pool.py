@@ -0,0 +1,158 @@
+"""Test suite for the Gemini API key pool"""
+
+import time
+import unittest
+
+from google.api_core.exceptions import ResourceExhausted
+
+from src.helpers.key_pool import KeyPool, is_quota_error
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer
+from src.helpers.roast_generator import LetterboxdRoastAnalyzer
+from tests.fake_gemini import FakeGemini
+
+
+def fail_with(pool, error, exclude=()):
+    """Makes a call on the pool's pick that fails with error."""
+    try:
+        with pool.lease(exclude):
+            raise error
+    except type(error):
+        pass
+
+
+class TestKeyPool(unittest.TestCase):
+    """Unit tests for picking keys by health."""
+
+    def test_round_robin_across_healthy_keys(self):
+        """Test that calls rotate over the keys instead of starting at the first."""
+        pool = KeyPool(["a", "b", "c"])
+        picks = []
+        for _ in range(6):
+            with pool.lease() as (index, _key):
+                picks.append(index)
+        self.assertEqual(picks, [0, 1, 2, 0, 1, 2])
+
+    def test_concurrent_calls_spread_over_keys(self):
+        """Test that calls in flight push new calls to other keys."""
+        pool = KeyPool(["a", "b", "c"])
+        first = pool.acquire()
+        pool.release(pool.acquire(), 0.1)
+        self.assertNotEqual(pool.acquire(), first)
+
+    def test_quota_error_cools_key_down(self):
+        """Test that a key is skipped after a 429 until its cool-down ends."""
+        pool = KeyPool(["a", "b"], cooldown=0.05)
+        fail_with(pool, ResourceExhausted("quota"))
+        for _ in range(3):
+            with pool.lease() as (index, _key):
+                self.assertEqual(index, 1)
+        info = pool.info()[0]
+        self.assertEqual(info["quota_errors"], 1)
+        self.assertGreater(info["cooldown"], 0)
+
+        time.sleep(0.06)
+        self.assertEqual(pool.info()[0]["cooldown"], 0)
+
+    def test_every_key_cooling_picks_soonest_available(self):
+        """Test that a key is still handed out when all of them are cooling down."""
+        pool = KeyPool(["a", "b"], cooldown=60)
+        fail_with(pool, ResourceExhausted("quota"))
+        time.sleep(0.01)
+        fail_with(pool, ResourceExhausted("quota"))
+        self.assertEqual(pool.acquire(), 0)
+
+    def test_erroring_key_picked_last(self):
+        """Test that a key with recent errors comes after clean keys."""
+        pool = KeyPool(["a", "b", "c"])
+        fail_with(pool, RuntimeError("boom"))
+        picks = set()
+        for _ in range(4):
+            with pool.lease() as (index, _key):
+                picks.add(index)
+        self.assertEqual(picks, {1, 2})
+        self.assertEqual(pool.info()[0]["errors"], 1)
+        self.assertEqual(pool.info()[0]["cooldown"], 0)
+
+    def test_neutral_errors_do_not_count(self):
+        """Test that errors about the reply, not the key, leave the key healthy."""
+        pool = KeyPool(["a"])
+        with self.assertRaises(ValueError):
+            with pool.lease(neutral=(KeyError,)):
+                raise ValueError("bad reply") from KeyError("format")
+        info = pool.info()[0]
+        self.assertEqual(info["errors"], 0)
+        self.assertEqual(info["in_flight"], 0)
+        self.assertIsNotNone(info["avg_latency"])
+
+    def test_slow_key_picked_after_others(self):
+        """Test that a key much slower than the rest is avoided."""
+        pool = KeyPool(["a", "b", "c"])
+        for index, latency in enumerate((5.0, 0.1, 0.1)):
+            pool.release(pool.acquire(exclude=set(range(3)) - {index}), latency)
+        picks = {pool.acquire() for _ in range(2)}
+        self.assertEqual(picks, {1, 2})
+
+    def test_abandoned_call_leaves_latency(self):
+        """Test that releasing a call that never ran records nothing for the key."""
+        pool = KeyPool(["a"])
+        pool.release(pool.acquire(), 2.0)
+        pool.abandon(pool.acquire())
+        info = pool.info()[0]
+        self.assertEqual((info["in_flight"], info["calls"], info["avg_latency"]), (0, 1, 2.0))
+
+    def test_exclude(self):
+        """Test that excluded keys are skipped unless nothing else is left."""
+        pool = KeyPool(["a", "b"])
+        self.assertEqual(pool.acquire(exclude=[0]), 1)
+        self.assertIn(pool.acquire(exclude=[0, 1]), (0, 1))
+
+    def test_wrapped_quota_error_detected(self):
+        """Test that a 429 re-raised by the analyzers is still recognized."""
+        try:
+            try:
+                raise ResourceExhausted("quota")
+            except ResourceExhausted as error:
+                raise ValueError(f"Error generating summary: {error}") from error
+        except ValueError as wrapped:
+            self.assertTrue(is_quota_error(wrapped))
+        self.assertFalse(is_quota_error(ValueError("Summary over 200 words")))
+
+
+class TestKeyPoolWithGemini(unittest.TestCase):
+    """Tests of the analyzers picking keys from a shared pool."""
+
+    def test_exhausted_key_avoided_by_later_requests(self):
+        """Test that after a 429 the next requests go straight to another key."""
+        pool = KeyPool(["a", "b", "c"])
+        analyzer = LetterboxdReviewAnalyzer()
+        with FakeGemini(exhausted={"a"}) as gemini:
+            for _ in range(3):
+                summary = analyzer.summary_with_retries("some reviews", pool)
+                self.assertEqual(summary, "A short summary.")
+        self.assertEqual(gemini.calls, ["a", "b", "c", "b"])
+        self.assertEqual(pool.info()[0]["quota_errors"], 1)
+
+    def test_each_attempt_uses_a_new_key(self):
+        """Test that retries within a request do not reuse a failed key."""
+        pool = KeyPool(["a", "b", "c"])
+        with FakeGemini(failing={"a", "b"}) as gemini:
+            taste = LetterboxdReviewAnalyzer().get_taste_match_result(
+                "word " * 101, "word " * 401, "Talk to Me", pool
+            )
+        self.assertEqual(taste, "A short summary.")
+        self.assertEqual(gemini.calls, ["a", "b", "c"])
+
+    def test_roast_tries_every_key_once(self):
+        """Test that the roast moves through the keys and counts the failures."""
+        pool = KeyPool(["a", "b"])
+        with FakeGemini(reply="Roasted.", exhausted={"a"}) as gemini:
+            roast = LetterboxdRoastAnalyzer().get_results(
+                [{"review_text": "Great movie!"}], {}, pool
+            )
+        self.assertEqual(roast, "Roasted.")
+        self.assertEqual(gemini.calls, ["a", "b"])
+        self.assertEqual([key["calls"] for key in pool.info()], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
 """Testing suite for the class LetterboxdAnalyzer"""
 
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+from src.helpers.extractive_summary import cached_extractive_summary, extractive_summary
+from src.helpers.gemini_clients import clear_models
 from src.helpers.letterboxd_analyzers import (
+    RESULT_CACHE,
     LetterboxdReviewAnalyzer,
     AspectFormatError,
     SummaryError,
@@ -14,6 +18,9 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
 
     def setUp(self):
         """Set up the test environment and mock data."""
+        if RESULT_CACHE is not None:
+            RESULT_CACHE.clear()
+        clear_models()
         self.analyzer = LetterboxdReviewAnalyzer()
         self.sample_reviews = [
             {
@@ -76,6 +83,17 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         )
         self.assertEqual(self.analyzer.read_reviews(reviews_list), expected_output)
 
+    def test_read_reviews_duplicate_count(self):
+        """Test that collapsed reviews say how often they were posted"""
+        reviews_list = [
+            {"review_text": "peak", "duplicates": 12},
+            {"review_text": "Loved the visuals.", "duplicates": 1},
+        ]
+        self.assertEqual(
+            self.analyzer.read_reviews(reviews_list),
+            "peak (posted 12 times) >>>Loved the visuals.",
+        )
+
     def test_read_user_data_success(self):
         """Test read_user_data for a successful result"""
         reviews_list = [
@@ -138,7 +156,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         with self.assertRaises(AspectFormatError):
             self.analyzer.aspect_processor("invalid string")
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel.generate_content")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel.generate_content")
     def test_generate_summary_success(self, mock_generate_content):
         """Test successful summary generation"""
 
@@ -153,7 +171,49 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
 
         self.assertEqual(result, mock_response.text)
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel")
+    @patch("src.helpers.letterboxd_analyzers.SUMMARY_INPUT", "extractive")
+    @patch("src.helpers.letterboxd_analyzers.EXTRACTIVE_TARGET_WORDS", 50)
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel.generate_content")
+    def test_generate_summary_extractive(self, mock_generate_content):
+        """Test that extractive mode sends a shortened set of reviews"""
+        reviews = [
+            {"review_text": f"The score is haunting in scene {i}. I watched it on day {i}."}
+            for i in range(40)
+        ]
+        review_text = self.analyzer.read_reviews(reviews)
+        mock_generate_content.return_value = MagicMock(text="A short summary.")
+
+        self.analyzer.generate_summary(review_text, api_key1="dummy_key")
+
+        prompt = mock_generate_content.call_args.args[0]
+        self.assertIn("The score is haunting", prompt)
+        self.assertNotIn(review_text, prompt)
+        self.assertLess(len(prompt), len(self.analyzer.SUMMARY_PROMPT) + 400)
+
+    @patch("src.helpers.letterboxd_analyzers.SUMMARY_INPUT", "extractive")
+    @patch("src.helpers.letterboxd_analyzers.EXTRACTIVE_TARGET_WORDS", 50)
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel.generate_content")
+    def test_summary_extract_computed_once(self, mock_generate_content):
+        """Test that retries of an extractive summary reuse the same extract"""
+        reviews = [
+            {"review_text": f"The score is haunting in scene {i}. I watched it on day {i}."}
+            for i in range(40)
+        ]
+        review_text = self.analyzer.read_reviews(reviews)
+        mock_generate_content.side_effect = [
+            Exception("quota"), MagicMock(text="A short summary.")
+        ]
+        cached_extractive_summary.cache_clear()
+
+        with patch("src.helpers.extractive_summary.extractive_summary",
+                   wraps=extractive_summary) as mock_extract:
+            summary = self.analyzer.summary_with_retries(review_text, ["a", "b"])
+
+        self.assertEqual(summary, "A short summary.")
+        self.assertEqual(mock_generate_content.call_count, 2)
+        self.assertEqual(mock_extract.call_count, 1)
+
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
     def test_generate_summary_too_long(self, mock_model):
         """Test generate_summary when the generated summary exceeds the word limit."""
 
@@ -175,7 +235,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         # Ensure the method was actually called
         mock_model_instance.generate_content.assert_called_once()
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
     def test_generate_summary_exception(self, mock_model):
         """Test generate_summary when an exception occurs during API call."""
 
@@ -193,7 +253,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         # Ensure the method was actually called
         mock_model_instance.generate_content.assert_called_once()
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
     def test_generate_aspects_exception(self, mock_model):
         """Test generate_aspects when exception is raised"""
 
@@ -208,7 +268,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Error generating aspects: API error"):
             self.analyzer.generate_aspects(review_text, "dummy_key")
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel.generate_content")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel.generate_content")
     def test_generate_taste_match_movie(self, mock_generate_content):
         """Test successful summary generation"""
 
@@ -226,7 +286,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
 
         self.assertEqual(result, mock_response.text)
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
     def test_generate_taste_match_exception(self, mock_model):
         """Test unsuccessful summary generation"""
 
@@ -248,7 +308,7 @@ class TestLetterboxdReviewAnalyzer(unittest.TestCase):
         # Ensure the method was actually called
         mock_model_instance.generate_content.assert_called_once()
 
-    @patch("src.helpers.letterboxd_analyzers.genai.GenerativeModel")
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
     def test_generate_taste_match_too_long(self, mock_model):
         """Test generate_summary when the generated summary exceeds the word limit."""
 
@@ -277,6 +337,9 @@ class TestLetterboxdReviewAnalyzerResults(unittest.TestCase):
     """Unit tests for the LetterboxdReviewAnalyzer get_results and get_taste_match_results class."""
     def setUp(self):
         """Set up the test environment and mock data."""
+        if RESULT_CACHE is not None:
+            RESULT_CACHE.clear()
+        clear_models()
         self.analyzer = LetterboxdReviewAnalyzer()
         self.api_key1 = ["1", "2", "3"]
         self.api_key2 = ["4", "5", "6"]
@@ -386,6 +449,91 @@ class TestLetterboxdReviewAnalyzerResults(unittest.TestCase):
         self.assertEqual(mock_generate_summary.call_count, 3)
         self.assertEqual(mock_generate_aspects.call_count, 3)
 
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_aspects")
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_summary")
+    def test_get_results_cached(self, mock_generate_summary, mock_generate_aspects):
+        """Test that identical reviews are answered from the result cache."""
+        review_text = self.analyzer.read_reviews(
+            [{"review_text": f"Review {i}"} for i in range(400)]
+        )
+        mock_generate_summary.return_value = "A short summary."
+        mock_generate_aspects.return_value = '{"Acting": [70, 30]}'
+
+        first = self.analyzer.get_results(review_text, self.api_key1, self.api_key2)
+        second = self.analyzer.get_results(review_text, self.api_key1, self.api_key2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_generate_summary.call_count, 1)
+        self.assertEqual(mock_generate_aspects.call_count, 1)
+
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_aspects")
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_summary")
+    def test_get_results_failures_not_cached(
+        self, mock_generate_summary, mock_generate_aspects
+    ):
+        """Test that a partially failed result is regenerated on the next call."""
+        review_text = self.analyzer.read_reviews(
+            [{"review_text": f"Review {i}"} for i in range(400)]
+        )
+        mock_generate_summary.return_value = "A short summary."
+        mock_generate_aspects.side_effect = [
+            AspectFormatError("Invalid aspect format"),
+            AspectFormatError("Invalid aspect format"),
+            AspectFormatError("Invalid aspect format"),
+            '{"Acting": [70, 30]}',
+        ]
+
+        self.analyzer.get_results(review_text, self.api_key1, self.api_key2)
+        summary, aspects = self.analyzer.get_results(
+            review_text, self.api_key1, self.api_key2
+        )
+
+        self.assertEqual(summary, "A short summary.")
+        self.assertIsNotNone(aspects)
+        self.assertEqual(mock_generate_summary.call_count, 2)
+
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_aspects")
+    @patch("src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_summary")
+    def test_get_results_runs_branches_in_parallel(
+        self, mock_generate_summary, mock_generate_aspects
+    ):
+        """Test that summary and aspects are generated concurrently."""
+        review_text = self.analyzer.read_reviews(
+            [{"review_text": f"Review {i}"} for i in range(400)]
+        )
+
+        def slow(result):
+            def generate(*_args, **_kwargs):
+                time.sleep(0.2)
+                return result
+            return generate
+
+        mock_generate_summary.side_effect = slow("A short summary.")
+        mock_generate_aspects.side_effect = slow('{"Acting": [70, 30]}')
+
+        start = time.perf_counter()
+        summary, aspects = self.analyzer.get_results(
+            review_text, self.api_key1, self.api_key2
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(summary, "A short summary.")
+        self.assertEqual(aspects, [["Acting", 70, 30]])
+        self.assertLess(elapsed, 0.35)
+
+    def test_results_fingerprint(self):
+        """Test that the fingerprint changes with reviews, safety and prompt template."""
+        base = self.analyzer.results_fingerprint("some reviews")
+        self.assertEqual(base, self.analyzer.results_fingerprint("some reviews"))
+        self.assertNotEqual(base, self.analyzer.results_fingerprint("other reviews"))
+        self.assertNotEqual(base, self.analyzer.results_fingerprint("some reviews", "on"))
+        with patch.object(
+            LetterboxdReviewAnalyzer, "SUMMARY_PROMPT", "Summarize: {reviews}"
+        ):
+            self.assertNotEqual(base, self.analyzer.results_fingerprint("some reviews"))
+        with patch("src.helpers.letterboxd_analyzers.SUMMARY_INPUT", "extractive"):
+            self.assertNotEqual(base, self.analyzer.results_fingerprint("some reviews"))
+
     @patch(
         "src.helpers.letterboxd_analyzers.LetterboxdReviewAnalyzer.generate_taste_match"
     )
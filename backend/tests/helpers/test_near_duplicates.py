@@ -0,0 +1,82 @@
+"""Test suite for near-duplicate review detection"""
+
+import unittest
+
+from src.helpers.near_duplicates import (
+    BIN_SHIFT,
+    SIGNATURE_BINS,
+    collapse_near_duplicates,
+    jaccard,
+    shingles,
+    signature,
+)
+
+
+def review(text):
+    """Returns a scraped review."""
+    return {"rating": "★★★", "review_text": text}
+
+
+class TestNearDuplicates(unittest.TestCase):
+    """Unit tests for the MinHash/LSH duplicate collapsing."""
+
+    def test_shingles_ignore_case_and_punctuation(self):
+        """Test that reviews differing in case and punctuation share shingles."""
+        self.assertEqual(shingles("PEAK."), shingles("peak"))
+        self.assertEqual(shingles("Best. Movie. Ever!"), {"best movie", "movie ever"})
+        self.assertEqual(shingles("😭😭😭"), {"😭 😭"})
+        self.assertEqual(shingles("..."), set())
+
+    def test_signature_keeps_smallest_hash_per_bin(self):
+        """Test that each bin holds the minimum hash of the shingles in it."""
+        shingle_set = {f"word{i} word{i + 1}" for i in range(500)}
+        sig = signature(shingle_set)
+        self.assertLessEqual(len(sig), SIGNATURE_BINS)
+        for bin_, value in sig.items():
+            in_bin = [h for h in map(hash, shingle_set) if h >> BIN_SHIFT == bin_]
+            self.assertEqual(value, min(in_bin))
+
+    def test_meme_reviews_collapsed_with_count(self):
+        """Test that copies of a meme review become one review with a count."""
+        kept = collapse_near_duplicates([
+            review("peak"),
+            review("The score carries every scene."),
+            review("PEAK!!"),
+            review("peak."),
+            review("😭😭😭"),
+            review("😭😭😭😭"),
+        ])
+        self.assertEqual(
+            [(r["review_text"], r["duplicates"]) for r in kept],
+            [("peak", 3), ("The score carries every scene.", 1), ("😭😭😭", 2)],
+        )
+
+    def test_near_copies_collapsed(self):
+        """Test that a pasted review with a small edit is found."""
+        base = ("a slow burn that rewards patience with one of the most haunting "
+                "final acts of the decade and a career best lead performance")
+        kept = collapse_near_duplicates([
+            review(base),
+            review(base + " 10/10"),
+            review("a slow burn that never pays off and a lead who sleepwalks through it"),
+        ])
+        self.assertEqual([r["duplicates"] for r in kept], [2, 1])
+        self.assertGreaterEqual(jaccard(shingles(base), shingles(base + " 10/10")), 0.9)
+
+    def test_distinct_reviews_kept(self):
+        """Test that many different reviews are all kept."""
+        reviews = [review(f"review {i} about scene {i * 7} and actor {i * 13}")
+                   for i in range(1000)]
+        kept = collapse_near_duplicates(reviews)
+        self.assertEqual(len(kept), 1000)
+        self.assertTrue(all(r["duplicates"] == 1 for r in kept))
+
+    def test_threshold(self):
+        """Test that a stricter threshold keeps looser matches apart."""
+        reviews = [review("great film great cast"), review("great film great cast honestly")]
+        self.assertEqual(len(collapse_near_duplicates(reviews, threshold=0.7)), 1)
+        self.assertEqual(len(collapse_near_duplicates(reviews, threshold=0.9)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
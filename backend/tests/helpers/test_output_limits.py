@@ -0,0 +1,105 @@
+"""Test suite for the length limits of Gemini replies"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.helpers.key_pool import KeyPool
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer, SummaryError
+from src.helpers.output_limits import (
+    MAX_TOKENS,
+    LengthStats,
+    enforce_length,
+    length_config,
+    trim_to_sentence,
+)
+from src.helpers.roast_generator import LetterboxdRoastAnalyzer
+from src.helpers.streaming import RESTART
+from tests.fake_gemini import FakeGemini
+
+
+def reply(text, finish_reason=1):
+    """Builds a Gemini reply with a finish reason."""
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(finish_reason=finish_reason)])
+
+
+class TestOutputLimits(unittest.TestCase):
+    """Unit tests for enforcing word limits on finished replies."""
+
+    def setUp(self):
+        """Count into fresh counters."""
+        self.stats = LengthStats()
+        patcher = patch("src.helpers.output_limits.LENGTH_STATS", self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_limit_follows_word_limit(self):
+        """Test that the token cap leaves room for a reply at the word limit."""
+        self.assertEqual(length_config(210), {"max_output_tokens": 420})
+
+    def test_reply_within_limit(self):
+        """Test that a complete reply is returned as is."""
+        self.assertEqual(enforce_length(reply("Short enough."), 5, SummaryError(), "summary"),
+                         "Short enough.")
+        self.assertEqual(self.stats.as_dict()["summary"]["replies"], 1)
+
+    def test_cut_off_reply_trimmed(self):
+        """Test that a reply stopped at the token cap keeps its complete sentences."""
+        text = enforce_length(
+            reply('It works. "Truly!" And then it', MAX_TOKENS), 5, SummaryError(), "summary"
+        )
+        self.assertEqual(text, 'It works. "Truly!"')
+        self.assertEqual(trim_to_sentence("One two. Three four. Five", 3), "One two.")
+        self.assertEqual(self.stats.as_dict()["summary"]["token_limit"], 1)
+
+    def test_over_limit_rejected(self):
+        """Test that a reply still over the limit is rejected and counted."""
+        with self.assertRaises(SummaryError):
+            enforce_length(reply("one two three."), 2, SummaryError(), "taste_match")
+        with self.assertRaises(SummaryError):
+            enforce_length(reply("no sentence end", MAX_TOKENS), 5, SummaryError(), "taste_match")
+        self.assertEqual(self.stats.as_dict()["taste_match"]["rejected"], 2)
+
+    def test_trim_without_sentence_end(self):
+        """Test that nothing is left of a reply with no complete sentence."""
+        self.assertEqual(trim_to_sentence("half a thou", 10), "")
+
+
+class TestOutputLimitsWithGemini(unittest.TestCase):
+    """Tests of the analyzers capping their Gemini replies."""
+
+    def setUp(self):
+        """Count into fresh counters."""
+        self.stats = LengthStats()
+        for target in ("src.helpers.output_limits.LENGTH_STATS",
+                       "src.helpers.streaming.LENGTH_STATS"):
+            patcher = patch(target, self.stats)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_runaway_summary_trimmed_not_retried(self):
+        """Test that a summary running past the cap is kept instead of retried."""
+        long_reply = "This film is great. " * 150
+        with FakeGemini(reply=long_reply) as gemini:
+            summary = LetterboxdReviewAnalyzer().summary_with_retries("some reviews", ["a"])
+        self.assertEqual(len(gemini.calls), 1)
+        self.assertTrue(summary.endswith("great."))
+        self.assertLessEqual(len(summary.split()), 210)
+        self.assertEqual(self.stats.as_dict()["summary"],
+                         {"replies": 1, "token_limit": 1, "rejected": 0, "aborted": 0})
+
+    def test_streamed_roast_aborted_over_limit(self):
+        """Test that a streamed roast past its word limit is abandoned and counted."""
+        with FakeGemini(reply="word " * 800) as gemini:
+            stream = LetterboxdRoastAnalyzer().stream_results(
+                [{"review_text": "Great movie!"}], {}, KeyPool(["a"])
+            )
+            sent = list(stream)
+        self.assertEqual(len(sent), 711)
+        self.assertIs(sent[-1], RESTART)
+        self.assertEqual(gemini.chunks, 711)
+        self.assertEqual(self.stats.as_dict()["roast"]["aborted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
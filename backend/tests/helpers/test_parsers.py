@@ -0,0 +1,142 @@
+"""Test suite for the HTML parser backends"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from src.helpers.parsers import (
+    available_backends, resolve_backend, make_soup, class_strainer,
+)
+from src.helpers.scrapers import parse_review_page, REVIEW_PAGE_STRAINER
+from src.helpers.scrapers_roast import parse_user_reviews_page, USER_REVIEWS_STRAINER
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+
+# Fixture pages and the parser each one is read with
+FIXTURE_PAGES = {
+    "film_reviews_page.html": (parse_review_page, REVIEW_PAGE_STRAINER),
+    "film_reviews_last_page.html": (parse_review_page, REVIEW_PAGE_STRAINER),
+    "film_reviews_empty.html": (parse_review_page, REVIEW_PAGE_STRAINER),
+    "user_reviews_page.html": (parse_user_reviews_page, USER_REVIEWS_STRAINER),
+    "user_reviews_single_page.html": (parse_user_reviews_page, USER_REVIEWS_STRAINER),
+}
+
+
+def read_fixture(name):
+    """Returns the HTML of a fixture page."""
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fixture:
+        return fixture.read()
+
+REVIEW_PAGE = (
+    "<html><body><ul>"
+    '<li class="film-detail"><div class="js-review-body"><p>Great movie!</p></div>'
+    '<span class="rating">★★★★</span></li>'
+    "</ul></body></html>"
+)
+
+
+class TestParsers(unittest.TestCase):
+    """Unit tests for choosing and using a parser backend."""
+
+    def test_html_parser_always_available(self):
+        """Test that the built-in parser is always an option."""
+        self.assertIn("html.parser", available_backends())
+
+    def test_auto_picks_fastest_available(self):
+        """Test that auto resolves to the first available backend."""
+        self.assertEqual(resolve_backend("auto"), available_backends()[0])
+
+    def test_auto_without_lxml(self):
+        """Test that auto falls back to html.parser when lxml is missing."""
+        with patch("src.helpers.parsers.importlib.util.find_spec", return_value=None):
+            self.assertEqual(resolve_backend("auto"), "html.parser")
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend is rejected."""
+        with self.assertRaises(ValueError):
+            resolve_backend("regex")
+
+    def test_missing_backend(self):
+        """Test that asking for an uninstalled backend is rejected."""
+        with patch("src.helpers.parsers.importlib.util.find_spec", return_value=None):
+            with self.assertRaises(ValueError):
+                resolve_backend("lxml")
+
+    def test_backends_extract_the_same_reviews(self):
+        """Test that every available backend finds the same review content."""
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                soup = make_soup(REVIEW_PAGE, backend=backend)
+                review = soup.select_one("li.film-detail")
+                self.assertEqual(
+                    review.select_one(".js-review-body p").get_text(), "Great movie!"
+                )
+                self.assertEqual(review.select_one(".rating").get_text(), "★★★★")
+
+
+
+class TestPartialParsing(unittest.TestCase):
+    """Unit tests for building only the parts of a page the scrapers read."""
+
+    def test_class_strainer_matches_any_class(self):
+        """Test that elements with several classes are matched on any of them."""
+        html = (
+            '<ul><li class="paginate-page paginate-current">2</li>'
+            '<li class="paginate-pages">x</li><li class="other">y</li></ul>'
+            '<div class="paginate-page">z</div>'
+        )
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                soup = make_soup(
+                    html, backend=backend, parse_only=class_strainer("li", "paginate-page")
+                )
+                self.assertEqual([li.get_text() for li in soup.find_all("li")], ["2"])
+                self.assertIsNone(soup.find("div"))
+
+    def test_partial_parse_matches_full_parse(self):
+        """Test that every fixture page parses to the same result either way."""
+        for name, (parse, _) in FIXTURE_PAGES.items():
+            html = read_fixture(name)
+            for backend in available_backends():
+                with self.subTest(page=name, backend=backend), \
+                        patch("src.helpers.parsers.HTML_PARSER", backend):
+                    with patch("src.helpers.parsers.PARTIAL_PARSE", False):
+                        full = parse(html)
+                    with patch("src.helpers.parsers.PARTIAL_PARSE", True):
+                        partial = parse(html)
+                    self.assertEqual(partial, full)
+
+    def test_fixture_results(self):
+        """Test the reviews and paginators found in the fixture pages."""
+        reviews, last_page = parse_review_page(read_fixture("film_reviews_page.html"))
+        self.assertEqual((len(reviews), last_page), (12, 30))
+        self.assertIsNone(reviews[0]["rating"])
+        self.assertEqual(parse_review_page(read_fixture("film_reviews_empty.html")), ([], None))
+
+        reviews, last_page = parse_user_reviews_page(read_fixture("user_reviews_page.html"))
+        self.assertEqual((len(reviews), last_page), (12, 6))
+        self.assertIsNone(reviews[0]["watched_date"])
+        reviews, last_page = parse_user_reviews_page(
+            read_fixture("user_reviews_single_page.html")
+        )
+        self.assertEqual((len(reviews), last_page), (4, 1))
+
+    def test_partial_parse_builds_fewer_elements(self):
+        """Test that the strained tree is a fraction of the full tree."""
+        for name, (_, strainer) in FIXTURE_PAGES.items():
+            html = read_fixture(name)
+            with self.subTest(page=name):
+                full = len(make_soup(html).find_all(True))
+                partial = len(make_soup(html, parse_only=strainer).find_all(True))
+                self.assertLess(partial, full / 2)
+
+    def test_partial_parse_disabled(self):
+        """Test that PARTIAL_PARSE=false builds the whole page."""
+        html = read_fixture("film_reviews_page.html")
+        with patch("src.helpers.parsers.PARTIAL_PARSE", False):
+            soup = make_soup(html, parse_only=REVIEW_PAGE_STRAINER)
+        self.assertIsNotNone(soup.find("footer"))
+
+
+if __name__ == "__main__":
+    unittest.main()
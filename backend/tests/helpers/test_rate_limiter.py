@@ -0,0 +1,92 @@
+"""Test suite for the Letterboxd rate limiter"""
+
+import asyncio
+import unittest
+
+from src.helpers.rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Unit tests for the token bucket and its fair queuing."""
+
+    def test_burst_is_granted_immediately(self):
+        """Test that a full bucket lets burst fetches start without waiting."""
+        async def acquire_burst():
+            limiter = RateLimiter(rate=1, burst=5)
+            waits = [await limiter.acquire() for _ in range(5)]
+            return waits, limiter.info()
+
+        waits, info = asyncio.run(acquire_burst())
+        self.assertEqual(waits, [0.0] * 5)
+        self.assertEqual(info["acquired"], 5)
+        self.assertEqual(info["delayed"], 0)
+
+    def test_rate_is_enforced(self):
+        """Test that fetches beyond the burst start at the configured rate."""
+        async def acquire_many():
+            limiter = RateLimiter(rate=100, burst=1)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(limiter.acquire() for _ in range(11)))
+            return loop.time() - started, limiter.info()
+
+        elapsed, info = asyncio.run(acquire_many())
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertEqual(info["delayed"], 10)
+        self.assertEqual(info["queue_depth"], 0)
+
+    def test_owners_take_turns(self):
+        """Test that a queued owner is not starved by one with many fetches."""
+        async def interleave():
+            limiter = RateLimiter(rate=200, burst=1)
+            order = []
+
+            async def fetch(owner):
+                await limiter.acquire(owner)
+                order.append(owner)
+
+            await limiter.acquire()
+            tasks = [asyncio.ensure_future(fetch("film")) for _ in range(6)]
+            await asyncio.sleep(0)
+            tasks += [asyncio.ensure_future(fetch("user")) for _ in range(2)]
+            await asyncio.gather(*tasks)
+            return order
+
+        order = asyncio.run(interleave())
+        self.assertEqual(order[:4], ["film", "user", "film", "user"])
+
+    def test_cancelled_fetch_leaves_queue(self):
+        """Test that a cancelled fetch is removed and does not use a token."""
+        async def cancel_waiter():
+            limiter = RateLimiter(rate=50, burst=1)
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire("film"))
+            await asyncio.sleep(0)
+            depth = limiter.queue_depth()
+            waiter.cancel()
+            await asyncio.sleep(0)
+            return depth, limiter.info()
+
+        depth, info = asyncio.run(cancel_waiter())
+        self.assertEqual(depth, 1)
+        self.assertEqual(info["queue_depth"], 0)
+        self.assertEqual(info["waiting_owners"], 0)
+        self.assertEqual(info["acquired"], 1)
+
+    def test_zero_rate_disables_limit(self):
+        """Test that a rate of 0 never makes a fetch wait."""
+        async def acquire_many():
+            limiter = RateLimiter(rate=0)
+            return [await limiter.acquire() for _ in range(100)]
+
+        self.assertEqual(asyncio.run(acquire_many()), [0.0] * 100)
+
+    def test_throttled_responses_are_counted(self):
+        """Test that throttled responses show up in the counters."""
+        limiter = RateLimiter(rate=10)
+        limiter.record_throttled()
+        self.assertEqual(limiter.info()["throttled"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
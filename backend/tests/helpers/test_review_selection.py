@@ -0,0 +1,88 @@
+"""Test suite for selecting the reviews sent to Gemini"""
+
+import unittest
+
+from src.helpers.review_selection import (
+    estimate_tokens,
+    rating_bucket,
+    select_reviews,
+    truncate_review,
+)
+
+
+def review(text, rating="★★★"):
+    """Returns a scraped review."""
+    return {"rating": rating, "review_text": text}
+
+
+class TestReviewSelection(unittest.TestCase):
+    """Unit tests for the token-budgeted review selection."""
+
+    def test_rating_bucket(self):
+        """Test that star ratings map to whole-star buckets."""
+        self.assertEqual(rating_bucket("★★★½"), 3)
+        self.assertEqual(rating_bucket("½"), 0)
+        self.assertEqual(rating_bucket("★★★★★"), 5)
+        self.assertIsNone(rating_bucket(None))
+        self.assertIsNone(rating_bucket(""))
+
+    def test_empty_and_duplicate_reviews_dropped(self):
+        """Test that blank reviews and repeats (ignoring case and punctuation) go."""
+        selected = select_reviews([
+            review("Loved it."),
+            review("   "),
+            review(""),
+            review("loved it!"),
+            review("Too long by an hour."),
+        ], token_budget=1000)
+        self.assertEqual(
+            [(r["review_text"], r["duplicates"]) for r in selected],
+            [("Loved it.", 2), ("Too long by an hour.", 1)],
+        )
+
+    def test_long_review_truncated(self):
+        """Test that a review over the per-review cap is cut at a word boundary."""
+        text = "word " * 500
+        truncated = truncate_review(text.strip(), 50)
+        self.assertLessEqual(estimate_tokens(truncated), 51)
+        self.assertTrue(truncated.endswith("word…"))
+        self.assertEqual(truncate_review("short", 50), "short")
+
+    def test_budget_respected_and_order_kept(self):
+        """Test that the selection fits the budget and keeps the page order."""
+        reviews = [review(f"review number {i} " + "text " * 20) for i in range(100)]
+        selected = select_reviews(reviews, token_budget=500, max_review_tokens=0)
+        cost = sum(estimate_tokens(r["review_text"]) + 1 for r in selected)
+        self.assertLessEqual(cost, 500)
+        self.assertGreater(len(selected), 0)
+        positions = [int(r["review_text"].split()[2]) for r in selected]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_rating_mix_preserved(self):
+        """Test that each rating bucket keeps its share of the budget."""
+        reviews = (
+            [review(f"five {i} " + "x " * 20, "★★★★★") for i in range(60)]
+            + [review(f"one {i} " + "x " * 20, "★") for i in range(20)]
+            + [review(f"three {i} " + "x " * 20, "★★★") for i in range(20)]
+        )
+        selected = select_reviews(reviews, token_budget=400, max_review_tokens=0)
+        buckets = [rating_bucket(r["rating"]) for r in selected]
+        self.assertAlmostEqual(buckets.count(5) / len(buckets), 0.6, delta=0.1)
+        self.assertAlmostEqual(buckets.count(1) / len(buckets), 0.2, delta=0.1)
+
+    def test_rated_reviews_preferred(self):
+        """Test that unrated reviews only fill what the rated ones leave over."""
+        reviews = [review(f"unrated {i} " + "x " * 20, None) for i in range(10)]
+        reviews += [review(f"rated {i} " + "x " * 20) for i in range(10)]
+        selected = select_reviews(reviews, token_budget=100, max_review_tokens=0)
+        self.assertTrue(selected)
+        self.assertTrue(all(r["rating"] for r in selected))
+
+    def test_zero_budget_keeps_every_review(self):
+        """Test that a budget of 0 only drops unusable reviews."""
+        reviews = [review(f"review {i}") for i in range(300)]
+        self.assertEqual(len(select_reviews(reviews, token_budget=0)), 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,26 @@
 """Test suite for the Letterboxd scrapers.py helping functions"""
 
+import asyncio
 import unittest
 from unittest import mock
 from unittest.mock import patch, MagicMock
 
+import httpx
 
+from src.helpers import http_client
+from src.helpers.review_selection import select_reviews
 from src.helpers.scrapers import (
+    SCRAPER_CACHE,
     validate_letterboxd_film_url,
     fetch_html_content,
     scrape_reviews,
+    scrape_reviews_async,
+    iter_reviews,
+    collect_reviews,
     movie_details_scraper,
+    parse_movie_details,
     ScraperError,
+    count_words,
 )
 
 
@@ -18,6 +28,12 @@ from src.helpers.scrapers import (
 class TestLetterboxdScraper(unittest.TestCase):
     """Unit tests for the Letterboxd scraper functions."""
 
+    def setUp(self):
+        """Start every test with empty scraper and validator caches."""
+        for cache in (SCRAPER_CACHE, http_client.VALIDATOR_CACHE):
+            if cache is not None:
+                cache.clear()
+
     def test_valid_url(self):
         """Test valid URL."""
         self.assertEqual(
@@ -34,21 +50,21 @@ class TestLetterboxdScraper(unittest.TestCase):
             False,
         )
 
-    @patch("requests.get")
+    @patch("src.helpers.http_client.get")
     def test_failed_http_request_fetch_html_content(self, mock_get):
         """Test fetch reviews when HTTP request fails."""
         valid_url = "https://letterboxd.com/film/moonfall/"
         mock_get.return_value.status_code = 404  # Simulating failed HTTP request
         headers = {"User-Agent": "Mozilla/5.0"}
         with self.assertRaises(ScraperError) as context:
-            fetch_html_content(valid_url, headers)
+            http_client.run(fetch_html_content(valid_url, headers))
         self.assertIn("Failed to get reviews", str(context.exception))
 
-    @patch("requests.get")
+    @patch("src.helpers.http_client.get")
     def test_fetch_html_content_success(self, mock_get):
         """Test fetch_html_content for a successful HTTP request."""
 
-        # Mock the response object returned by requests.get
+        # Mock the response object returned by the HTTP client
         mock_response = mock.Mock()
         mock_response.status_code = 200
         mock_response.text = "<html><body><h1>Review Page</h1></body></html>"
@@ -57,7 +73,7 @@ class TestLetterboxdScraper(unittest.TestCase):
         url = "https://letterboxd.com/film/sample_movie/reviews/"
         headers = {"User-Agent": "Mozilla/5.0"}
 
-        result = fetch_html_content(url, headers)
+        result = http_client.run(fetch_html_content(url, headers))
 
         # Assert that the mock GET request was made
         mock_get.assert_called_once_with(url, headers=headers, timeout=10)
@@ -122,6 +138,74 @@ class TestLetterboxdScraper(unittest.TestCase):
         self.assertEqual(reviews[3]["review_text"], "Could have been more exciting.")
         self.assertEqual(reviews[3]["rating"], "2/5")
 
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_concurrent_keeps_page_order(self, mock_fetch_reviews):
+        """Test that concurrent scraping returns reviews in page order."""
+        async def fetch(url, _headers):
+            page = int(url.rstrip("/").rsplit("/", 1)[-1])
+            # Later pages answer first so completion order differs from page order
+            await asyncio.sleep((6 - page) * 0.01)
+            return f"""
+                <ul>
+                    <li class="film-detail">
+                        <div class="js-review-body"><p>Review from page {page}</p></div>
+                        <div class="rating">{page}/5</div>
+                    </li>
+                </ul>
+            """
+
+        mock_fetch_reviews.side_effect = fetch
+
+        reviews = scrape_reviews(
+            "https://letterboxd.com/film/some-movie/", n=5, max_workers=5
+        )
+
+        self.assertEqual(mock_fetch_reviews.call_count, 5)
+        self.assertEqual(
+            [review["review_text"] for review in reviews],
+            [f"Review from page {page}" for page in range(1, 6)],
+        )
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_async_caps_pages_in_flight(self, mock_fetch_reviews):
+        """Test that at most max_workers pages of one scrape are fetched at once."""
+        in_flight = []
+        peak = []
+
+        async def fetch(_url, _headers):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>'
+
+        mock_fetch_reviews.side_effect = fetch
+
+        reviews = http_client.run(scrape_reviews_async(
+            "https://letterboxd.com/film/some-movie/", n=10, max_workers=3
+        ))
+
+        self.assertEqual(len(reviews), 10)
+        self.assertEqual(max(peak), 3)
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_concurrent_skips_failed_pages(self, mock_fetch_reviews):
+        """Test that a failed page does not abort concurrent scraping."""
+        def fetch(url, _headers):
+            if url.endswith("/page/2/"):
+                raise ScraperError("Failed to get reviews")
+            return '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>'
+
+        mock_fetch_reviews.side_effect = fetch
+
+        with patch("src.helpers.http_client.RETRY_STATS", http_client.RetryStats()) as stats:
+            reviews = scrape_reviews(
+                "https://letterboxd.com/film/some-movie/", n=3, max_workers=3
+            )
+
+        self.assertEqual(len(reviews), 2)
+        self.assertEqual(stats.as_dict()["pages_dropped"], 1)
+
     @patch("src.helpers.scrapers.fetch_html_content")
     def test_scrape_reviews_no_reviews(self, mock_fetch_reviews):
         """Test if no reviews are found."""
@@ -137,6 +221,65 @@ class TestLetterboxdScraper(unittest.TestCase):
         reviews = scrape_reviews("https://letterboxd.com/film/some-movie/", n=1)
         self.assertEqual(len(reviews), 0)  # No reviews
 
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_stops_at_last_paginated_page(self, mock_fetch_reviews):
+        """Test that the first page's paginator caps the pages requested."""
+        mock_fetch_reviews.return_value = """
+            <li class="film-detail"><div class="js-review-body"><p>Fine.</p></div></li>
+            <div class="pagination">
+                <li class="paginate-page paginate-current"><a>1</a></li>
+                <li class="paginate-page"><a href="page/2/">2</a></li>
+                <li class="paginate-page"><a href="page/3/">3</a></li>
+            </div>
+        """
+
+        reviews = scrape_reviews("https://letterboxd.com/film/some-movie/", n=30)
+
+        self.assertEqual(mock_fetch_reviews.call_count, 3)
+        self.assertEqual(len(reviews), 3)
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_stops_at_first_empty_page(self, mock_fetch_reviews):
+        """Test that scraping ends at the first empty page when there is no paginator."""
+        review_page = '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>'
+        mock_fetch_reviews.side_effect = [review_page, review_page, "<ul></ul>"]
+
+        reviews = scrape_reviews("https://letterboxd.com/film/some-movie/", n=30)
+
+        self.assertEqual(mock_fetch_reviews.call_count, 3)
+        self.assertEqual(len(reviews), 2)
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_min_words_target(self, mock_fetch_reviews):
+        """Test that only enough pages to reach the word target are fetched."""
+        mock_fetch_reviews.side_effect = lambda *args, **kwargs: (
+            '<li class="film-detail"><div class="js-review-body"><p>'
+            + " ".join(f"p{mock_fetch_reviews.call_count}w{i}" for i in range(150))
+            + "</p></div></li>"
+        )
+
+        reviews = scrape_reviews(
+            "https://letterboxd.com/film/some-movie/", n=30, min_words=400
+        )
+
+        self.assertEqual(mock_fetch_reviews.call_count, 3)
+        self.assertEqual(len(reviews), 3)
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_min_reviews_target_concurrent(self, mock_fetch_reviews):
+        """Test that concurrent scraping stops once the review target is reached."""
+        mock_fetch_reviews.return_value = (
+            '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>'
+        )
+
+        reviews = scrape_reviews(
+            "https://letterboxd.com/film/some-movie/", n=30, max_workers=4, min_reviews=3
+        )
+
+        # Page 1 alone, then at most a single batch of four pages
+        self.assertLessEqual(mock_fetch_reviews.call_count, 5)
+        self.assertEqual(len(reviews), 3)
+
     def test_scrape_reviews_invalid_url(self):
         """Test for invalid url"""
         with self.assertRaises(ValueError):
@@ -151,7 +294,7 @@ class TestLetterboxdScraper(unittest.TestCase):
 
         self.assertEqual(len(reviews), 0)
 
-    @patch("requests.get")
+    @patch("src.helpers.http_client.get")
     def test_movie_details_scraper_success(self, mock_get):
         """Test scraping movie details including movie name."""
         mock_response = MagicMock()
@@ -184,7 +327,7 @@ class TestLetterboxdScraper(unittest.TestCase):
         self.assertEqual(details["synopsis"], "A thrilling action movie.")
         self.assertEqual(details["backdrop_image_url"], "http://example.com/backdrop.jpg")
 
-    @patch("requests.get")
+    @patch("src.helpers.http_client.get")
     def test_movie_details_scraper_failure(self, mock_get):
         """Test scraping movie details when data is missing."""
         mock_response = MagicMock()
@@ -213,6 +356,145 @@ class TestLetterboxdScraper(unittest.TestCase):
             movie_details_scraper("https://letterboxd.com/INVALID")
 
 
+class TestReviewPipeline(unittest.TestCase):
+    """Unit tests for streaming reviews into the collecting stage."""
+
+    def setUp(self):
+        """Start every test with an empty scraper cache."""
+        if SCRAPER_CACHE is not None:
+            SCRAPER_CACHE.clear()
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_iter_reviews_yields_each_page(self, mock_fetch_reviews):
+        """Test that reviews are streamed one page at a time."""
+        async def fetch(url, _headers):
+            page = int(url.rstrip("/").rsplit("/", 1)[-1])
+            return (
+                '<li class="paginate-page"><a>3</a></li>'
+                f'<li class="film-detail"><div class="js-review-body"><p>Page {page}</p></div></li>'
+            )
+
+        async def stream():
+            return [
+                [review["review_text"] for review in reviews]
+                async for reviews in iter_reviews(
+                    "https://letterboxd.com/film/some-movie/", n=30, max_workers=2
+                )
+            ]
+
+        mock_fetch_reviews.side_effect = fetch
+
+        self.assertEqual(http_client.run(stream()), [["Page 1"], ["Page 2"], ["Page 3"]])
+
+    def test_collect_reviews_closes_stream_at_target(self):
+        """Test that the collecting stage stops the stream once the budget is met."""
+        closed = []
+
+        async def review_pages():
+            try:
+                for page in range(1, 31):
+                    yield [{"rating": None, "review_text": " ".join(
+                        f"word{page}x{i}" for i in range(100)
+                    )}]
+            finally:
+                closed.append(True)
+
+        reviews = http_client.run(collect_reviews(review_pages(), min_words=250))
+
+        self.assertEqual(len(reviews), 3)
+        self.assertEqual(closed, [True])
+
+    def test_collect_reviews_counts_selected_words(self):
+        """Test that words lost to truncation and duplicates do not count to the target."""
+        async def review_pages():
+            # 1000 words truncated to 240 at MAX_REVIEW_TOKENS
+            yield [{"rating": None, "review_text": "long " * 1000},
+                   {"rating": None, "review_text": "peak cinema " * 50}]
+            # Copies of a review already collected
+            yield [{"rating": None, "review_text": "peak cinema " * 50}]
+            yield [{"rating": None, "review_text": "peak cinema " * 50}]
+            for page in range(4, 31):
+                yield [{"rating": None, "review_text": " ".join(
+                    f"word{page}x{i}" for i in range(100)
+                )}]
+
+        with patch("src.helpers.review_selection.MAX_REVIEW_TOKENS", 300):
+            reviews = http_client.run(collect_reviews(review_pages(), min_words=400))
+
+        self.assertEqual(len(reviews), 5)
+        self.assertGreaterEqual(count_words(select_reviews(reviews)), 400)
+
+
+class TestLetterboxdScraperCache(unittest.TestCase):
+    """Unit tests for caching of scraped film pages."""
+
+    def setUp(self):
+        """Start every test with empty scraper and validator caches."""
+        for cache in (SCRAPER_CACHE, http_client.VALIDATOR_CACHE):
+            if cache is not None:
+                cache.clear()
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_uses_cache(self, mock_fetch_reviews):
+        """Test that a repeated scrape is served from the cache."""
+        mock_fetch_reviews.return_value = (
+            '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>'
+        )
+
+        first = scrape_reviews("https://letterboxd.com/film/some-movie/", n=1)
+        second = scrape_reviews("https://letterboxd.com/film/some-movie/", n=1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_fetch_reviews.call_count, 1)
+
+    @patch("src.helpers.scrapers.fetch_html_content")
+    def test_scrape_reviews_does_not_cache_failures(self, mock_fetch_reviews):
+        """Test that failed page fetches are retried on the next scrape."""
+        mock_fetch_reviews.side_effect = [
+            ScraperError("Failed to get reviews"),
+            '<li class="film-detail"><div class="js-review-body"><p>Ok</p></div></li>',
+        ]
+
+        self.assertEqual(scrape_reviews("https://letterboxd.com/film/some-movie/", n=1), [])
+        self.assertEqual(
+            len(scrape_reviews("https://letterboxd.com/film/some-movie/", n=1)), 1
+        )
+
+    @patch("src.helpers.http_client.get")
+    def test_movie_details_scraper_uses_cache(self, mock_get):
+        """Test that movie details are scraped once per film while cached."""
+        mock_get.return_value = httpx.Response(200, text=(
+            '<h1 class="filmtitle"><span class="name js-widont prettify">Cached</span></h1>'
+        ))
+
+        movie_details_scraper("https://letterboxd.com/film/some-movie/")
+        details = movie_details_scraper("https://letterboxd.com/film/some-movie/")
+
+        self.assertEqual(details["movie_name"], "Cached")
+        self.assertEqual(mock_get.call_count, 1)
+
+    @unittest.skipIf(SCRAPER_CACHE is None or http_client.VALIDATOR_CACHE is None,
+                     "caches disabled")
+    @patch("src.helpers.scrapers.parse_movie_details", wraps=parse_movie_details)
+    @patch("src.helpers.http_client.get")
+    def test_movie_details_revalidated_after_expiry(self, mock_get, mock_parse):
+        """Test that an unchanged film page is revalidated instead of re-parsed."""
+        mock_get.side_effect = [
+            httpx.Response(200, headers={"ETag": '"v1"'}, text=(
+                '<h1 class="filmtitle"><span class="name js-widont prettify">Kept</span></h1>'
+            )),
+            httpx.Response(304),
+        ]
+
+        movie_details_scraper("https://letterboxd.com/film/some-movie/")
+        SCRAPER_CACHE.clear()
+        details = movie_details_scraper("https://letterboxd.com/film/some-movie/")
+
+        self.assertEqual(details["movie_name"], "Kept")
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(mock_parse.call_count, 1)
+
+
 # Running the tests
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,114 @@
+"""Test suite for streamed Gemini generations"""
+
+import unittest
+from types import SimpleNamespace
+
+from src.helpers.key_pool import KeyPool
+from src.helpers.letterboxd_analyzers import LetterboxdReviewAnalyzer, SummaryError
+from src.helpers.roast_generator import LetterboxdRoastAnalyzer
+from src.helpers.output_limits import MAX_TOKENS
+from src.helpers.streaming import CUT_OFF, RESTART, limit_words, stream_with_retries
+from tests.fake_gemini import FakeGemini
+
+
+def chunks(*texts):
+    """Builds streamed response chunks with the given texts."""
+    return [SimpleNamespace(parts=[text], text=text) for text in texts]
+
+
+class TestLimitWords(unittest.TestCase):
+    """Unit tests for enforcing word limits on streamed replies."""
+
+    def test_yields_text_of_each_chunk(self):
+        """Test that chunk texts are passed on and empty chunks skipped."""
+        response = chunks("A short", " summary.") + [SimpleNamespace(parts=[], text=None)]
+        self.assertEqual(list(limit_words(response, 10, SummaryError("long"), "summary")),
+                         ["A short", " summary."])
+
+    def test_aborts_once_over_limit(self):
+        """Test that the reply is abandoned at the chunk that crosses the limit."""
+        response = iter(chunks("one two", " three", " four", " five"))
+        stream = limit_words(response, 2, SummaryError("long"), "summary")
+        self.assertEqual(next(stream), "one two")
+        with self.assertRaises(SummaryError):
+            next(stream)
+        self.assertEqual(len(list(response)), 2)
+
+    def test_cut_off_reply_marked(self):
+        """Test that a reply stopped at the token cap is followed by CUT_OFF."""
+        response = chunks("It works.", " And then") + [SimpleNamespace(
+            parts=[], text=None, candidates=[SimpleNamespace(finish_reason=MAX_TOKENS)]
+        )]
+        self.assertEqual(list(limit_words(response, 10, SummaryError("long"), "summary")),
+                         ["It works.", " And then", CUT_OFF])
+
+    def test_words_split_across_chunks(self):
+        """Test that a word arriving in pieces is counted once."""
+        response = chunks("one tw", "o", " thr", "ee")
+        self.assertEqual(len(list(limit_words(response, 3, SummaryError("long"), "summary"))), 4)
+
+
+class TestStreamWithRetries(unittest.TestCase):
+    """Unit tests for retrying streamed generations on other keys."""
+
+    def test_restart_after_partial_failure(self):
+        """Test that a failure after sent chunks is followed by RESTART and a retry."""
+        def stream(key):
+            yield f"{key}1"
+            if key == "a":
+                raise RuntimeError("connection reset")
+            yield f"{key}2"
+
+        pool = KeyPool(["a", "b"])
+        self.assertEqual(list(stream_with_retries(pool, stream, 2)),
+                         ["a1", RESTART, "b1", "b2"])
+        self.assertEqual([key["errors"] for key in pool.info()], [1, 0])
+
+    def test_failure_before_first_chunk(self):
+        """Test that no RESTART is sent when nothing reached the client."""
+        def stream(key):
+            if key == "a":
+                raise RuntimeError("quota")
+            return iter(["b1"])
+
+        self.assertEqual(list(stream_with_retries(KeyPool(["a", "b"]), stream, 2)), ["b1"])
+
+    def test_closed_stream_not_counted_as_error(self):
+        """Test that a client going away leaves the key healthy and free."""
+        pool = KeyPool(["a"])
+        stream = stream_with_retries(pool, lambda key: iter(["x", "y"]), 1)
+        next(stream)
+        stream.close()
+        info = pool.info()[0]
+        self.assertEqual((info["errors"], info["in_flight"]), (0, 0))
+
+
+class TestStreamingWithGemini(unittest.TestCase):
+    """Tests of the analyzers streaming their Gemini replies."""
+
+    def test_summary_over_limit_aborted_and_retried(self):
+        """Test that an overlong summary is cut off early and retried on another key."""
+        pool = KeyPool(["a", "b"])
+        with FakeGemini(replies={"a": "word " * 400}) as gemini:
+            stream = list(LetterboxdReviewAnalyzer().summary_stream_with_retries(
+                "some reviews", pool
+            ))
+        restart = stream.index(RESTART)
+        self.assertEqual(restart, 210)
+        self.assertEqual("".join(stream[restart + 1:]), "A short summary.")
+        self.assertEqual(gemini.calls, ["a", "b"])
+        self.assertLess(gemini.chunks, 400)
+        self.assertEqual(pool.info()[0]["errors"], 0)
+
+    def test_roast_streamed(self):
+        """Test that the roast arrives in chunks that add up to the reply."""
+        with FakeGemini(reply="Your taste is a crime.") as gemini:
+            stream = LetterboxdRoastAnalyzer().stream_results(
+                [{"review_text": "Great movie!"}], {}, KeyPool(["a"])
+            )
+            self.assertEqual("".join(stream), "Your taste is a crime.")
+        self.assertEqual(gemini.chunks, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
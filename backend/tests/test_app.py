@@ -2,10 +2,27 @@
 Unit tests for the Flask application.
 """
 
+import asyncio
+import json
+import threading
+import time
 import unittest
 from unittest.mock import patch
-import requests
-from src.app import app
+import httpx
+from src.app import analyze, app, gather_scrapes, movie_details_stream_handler
+from src.helpers.cache import TTLCache
+from src.helpers import http_client
+from tests.fake_gemini import FakeGemini
+
+
+def read_events(response):
+    """Parses a Server-Sent Events response into (event, data) pairs."""
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
 
 
 class TestFlaskApp(unittest.TestCase):
@@ -85,7 +102,7 @@ class TestFlaskApp(unittest.TestCase):
         self, _mock_get_results, _mock_scrape_reviews, mock_movie_details_scraper
     ):
         """Test movie details scraping when an external request fails."""
-        mock_movie_details_scraper.side_effect = requests.exceptions.RequestException("Failed")
+        mock_movie_details_scraper.side_effect = httpx.RequestError("Failed")
         response = self.client.post(
             "/movie_details", json={"film_url": "https://letterboxd.com/film/mickey-17/"}
         )
@@ -159,5 +176,233 @@ class TestFlaskApp(unittest.TestCase):
         data = response.get_json()
         self.assertIn("error", data)
 
+    @patch("src.app.SCRAPE_DEADLINE", 0.05)
+    @patch("src.app.scrape_user_stats_async")
+    @patch("src.app.scrape_user_reviews_async")
+    def test_username_roast_scrape_deadline(
+        self, mock_scrape_user_reviews, mock_scrape_user_stats
+    ):
+        """Test that /roast gives up once its scrapes pass the deadline."""
+        async def slow_reviews(*_args, **_kwargs):
+            await asyncio.sleep(0.3)
+
+        mock_scrape_user_reviews.side_effect = slow_reviews
+        mock_scrape_user_stats.return_value = {}
+
+        response = self.client.post("/roast", json={"username": "test_user"})
+        self.assertEqual(response.status_code, 504)
+        self.assertIn("error", response.get_json())
+
+    def test_views_run_on_scraping_engine(self):
+        """Test that async views run on the engine loop shared with the scrapers."""
+        async def loop_of_handler(_data):
+            return {"same_loop": asyncio.get_running_loop() is http_client.get_engine().loop}, 200
+
+        with patch("src.app.roast_handler", loop_of_handler):
+            response = self.client.post("/roast", json={"username": "test_user"})
+        self.assertTrue(response.get_json()["same_loop"])
+
+    def test_metrics(self):
+        """Test that cache, rate limiter, retry, key and hedging counters are exposed."""
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIn("scraper_cache", data)
+        self.assertIn("hits", data["scraper_cache"])
+        self.assertIn("hits", data["result_cache"])
+        self.assertIn("queue_depth", data["rate_limiter"])
+        self.assertIn("pages_dropped", data["retries"])
+        self.assertIn("not_modified", data["validator_cache"])
+        self.assertEqual(len(data["gemini_keys"]["rio"]), 3)
+        self.assertIn("quota_errors", data["gemini_keys"]["sai"][0])
+        self.assertIn("hedge_wins", data["hedging"]["summary"])
+        self.assertIsInstance(data["length_limits"], dict)
+
+
+class TestGatherScrapes(unittest.TestCase):
+    """Tests of running the scrapes of one request side by side."""
+
+    def test_gather_scrapes_overlaps_calls(self):
+        """Test that scrapes run side by side and keep their order."""
+        async def slow(value):
+            await asyncio.sleep(0.2)
+            return value
+
+        start = time.perf_counter()
+        results = http_client.run(gather_scrapes(slow(1), slow(2), slow(3)))
+        self.assertEqual(results, [1, 2, 3])
+        self.assertLess(time.perf_counter() - start, 0.35)
+
+    def test_gather_scrapes_raises_errors_and_cancels(self):
+        """Test that an error in one scrape is raised and the others cancelled."""
+        async def fail():
+            raise ValueError("Invalid or non-existent user profile")
+
+        async def scrape_and_check():
+            slow = asyncio.ensure_future(asyncio.sleep(1))
+            with self.assertRaises(ValueError):
+                await gather_scrapes(slow, fail())
+            # Let the cancellation be delivered
+            await asyncio.sleep(0)
+            return slow.cancelled()
+
+        self.assertTrue(http_client.run(scrape_and_check()))
+
+    def test_gather_scrapes_timeout(self):
+        """Test that the deadline is applied across all scrapes."""
+        with self.assertRaises(asyncio.TimeoutError):
+            http_client.run(gather_scrapes(asyncio.sleep(0.3), timeout=0.05))
+
+
+class TestStreamEndpoints(unittest.TestCase):
+    """Tests of the Server-Sent Events endpoints."""
+
+    def setUp(self):
+        """Set up the test client."""
+        app.testing = True
+        self.client = app.test_client()
+
+    @patch("src.app.select_reviews", lambda reviews: reviews)
+    @patch("src.app.analyze.aspects_with_retries", return_value=[["Visuals", 18, 1]])
+    @patch("src.app.scrape_reviews_async")
+    @patch("src.app.movie_details_scraper_async")
+    def test_movie_details_stream(
+        self, mock_movie_details_scraper, mock_scrape_reviews, _mock_aspects
+    ):
+        """Test that details, summary chunks and aspects stream before the full result."""
+        mock_movie_details_scraper.return_value = {"movie_name": "Mickey 17"}
+        mock_scrape_reviews.return_value = [{"review_text": "great film " * 250}]
+
+        with FakeGemini():
+            response = self.client.post(
+                "/movie_details/stream", json={"film_url": "https://letterboxd.com/film/mickey-17/"}
+            )
+            self.assertEqual(response.mimetype, "text/event-stream")
+            events = read_events(response)
+
+        self.assertEqual(events[0], ("movie_details", {"movie_name": "Mickey 17"}))
+        self.assertEqual(
+            [data["text"] for event, data in events if event == "summary"],
+            ["A", " short", " summary."],
+        )
+        self.assertEqual(events[-2], ("aspects", {"aspects": [["Visuals", 18, 1]]}))
+        self.assertEqual(events[-1], ("done", {
+            "movie_details": {"movie_name": "Mickey 17"},
+            "summary": "A short summary.",
+            "aspects": [["Visuals", 18, 1]],
+        }))
+
+    @patch("src.helpers.output_limits.TOKENS_PER_WORD", 0.05)
+    @patch("src.app.select_reviews", lambda reviews: reviews)
+    @patch("src.app.analyze.aspects_with_retries", return_value=[["Visuals", 18, 1]])
+    @patch("src.app.scrape_reviews_async")
+    @patch("src.app.movie_details_scraper_async")
+    def test_movie_details_stream_cut_off(
+        self, mock_movie_details_scraper, mock_scrape_reviews, _mock_aspects
+    ):
+        """Test that a summary cut off by the token cap is trimmed before it is cached."""
+        mock_movie_details_scraper.return_value = {"movie_name": "Mickey 17"}
+        mock_scrape_reviews.return_value = [{"review_text": "cut off film " * 200}]
+        cache = TTLCache()
+
+        # 11 tokens for the summary at 0.05 tokens per word
+        with FakeGemini(reply="The film is great. The score soars and the lead is superb."), \
+                patch("src.helpers.letterboxd_analyzers.RESULT_CACHE", cache):
+            events = read_events(self.client.post(
+                "/movie_details/stream", json={"film_url": "https://letterboxd.com/film/mickey-17/"}
+            ))
+
+        self.assertEqual(events[-4:-2], [
+            ("reset", {"field": "summary"}), ("summary", {"text": "The film is great."})
+        ])
+        self.assertEqual(events[-1][1]["summary"], "The film is great.")
+        reviews_text = analyze.read_reviews(mock_scrape_reviews.return_value)
+        self.assertEqual(cache.get(analyze.results_fingerprint(reviews_text))[0],
+                         "The film is great.")
+
+    @patch("src.app.select_reviews", lambda reviews: reviews)
+    @patch("src.app.analyze.aspects_with_retries", return_value=[["Visuals", 18, 1]])
+    @patch("src.app.analyze.summary_stream_with_retries")
+    @patch("src.app.scrape_reviews_async")
+    @patch("src.app.movie_details_scraper_async")
+    def test_movie_details_stream_failure(
+        self, mock_movie_details_scraper, mock_scrape_reviews, mock_summary_stream, _mock_aspects
+    ):
+        """Test that a summary stream failing midway ends with an error event."""
+        def summary_stream(*_args):
+            yield "A short"
+            raise RuntimeError("connection lost")
+
+        mock_movie_details_scraper.return_value = {"movie_name": "Mickey 17"}
+        mock_scrape_reviews.return_value = [{"review_text": "great film " * 250}]
+        mock_summary_stream.side_effect = summary_stream
+
+        events = read_events(self.client.post(
+            "/movie_details/stream", json={"film_url": "https://letterboxd.com/film/mickey-17/"}
+        ))
+
+        self.assertEqual(events[-2], ("summary", {"text": "A short"}))
+        self.assertEqual(events[-1], ("error", {
+            "error": "Streaming failed: connection lost", "status": 500
+        }))
+
+    @patch("src.app.select_reviews", lambda reviews: reviews)
+    @patch("src.app.scrape_reviews_async")
+    @patch("src.app.movie_details_scraper_async")
+    def test_movie_details_stream_disconnect(
+        self, mock_movie_details_scraper, mock_scrape_reviews
+    ):
+        """Test that the aspects call is cancelled when the client goes away."""
+        mock_movie_details_scraper.return_value = {"movie_name": "Mickey 17"}
+        mock_scrape_reviews.return_value = [{"review_text": "great film " * 250}]
+        release = threading.Event()
+        futures = []
+        ensure_future = asyncio.ensure_future
+
+        def track(awaitable):
+            futures.append(ensure_future(awaitable))
+            return futures[-1]
+
+        async def read_until_summary():
+            events = movie_details_stream_handler(
+                {"film_url": "https://letterboxd.com/film/mickey-17/"}
+            )
+            while (await anext(events))[0] != "summary":
+                pass
+            await events.aclose()
+
+        with FakeGemini(), \
+                patch("src.app.analyze.aspects_with_retries", lambda *_args: release.wait()), \
+                patch("src.app.asyncio.ensure_future", track):
+            http_client.run(read_until_summary())
+        release.set()
+
+        # The scrapes are scheduled first
+        self.assertTrue(futures[-1].cancelled())
+
+    def test_movie_details_stream_missing_url(self):
+        """Test that validation errors are sent as an error event."""
+        response = self.client.post("/movie_details/stream", json={})
+        self.assertEqual(read_events(response),
+                         [("error", {"error": "film_url is required", "status": 400})])
+
+    @patch("src.app.scrape_user_stats_async")
+    @patch("src.app.scrape_user_reviews_async")
+    def test_roast_stream(self, mock_scrape_user_reviews, mock_scrape_user_stats):
+        """Test that the roast streams in chunks followed by the full roast."""
+        mock_scrape_user_reviews.return_value = [{"review_text": "Great movie!"}]
+        mock_scrape_user_stats.return_value = {}
+
+        with FakeGemini(reply="Roasted.", exhausted={None}):
+            events = read_events(self.client.post("/roast/stream", json={"username": "u"}))
+        self.assertEqual(events[-1][0], "error")
+        self.assertEqual(events[-1][1]["status"], 500)
+
+        with FakeGemini(reply="Your taste is a crime."):
+            events = read_events(self.client.post("/roast/stream", json={"username": "u"}))
+        self.assertEqual(len([event for event, _data in events if event == "roast"]), 5)
+        self.assertEqual(events[-1], ("done", {"roast": "Your taste is a crime."}))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,113 @@
+"""
+Unit tests for the ASGI application.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from src import asgi
+from src.helpers import http_client
+
+
+def post(path, **kwargs):
+    """Sends one request to the ASGI app and returns the response."""
+    async def send():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(kwargs.pop("method", "POST"), path, **kwargs)
+
+    return asyncio.run(send())
+
+
+class TestAsgiApp(unittest.TestCase):
+    """Unit tests for routing, CORS and the engine lifespan."""
+
+    def test_routes_to_async_handler(self):
+        """Test that a POST reaches its handler with the decoded JSON body."""
+        async def handler(data):
+            return {"username": data["username"]}, 201
+
+        with patch.dict(asgi.ROUTES, {"/roast": ("POST", handler)}):
+            response = post("/roast", json={"username": "test_user"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"username": "test_user"})
+        self.assertEqual(response.headers["access-control-allow-origin"], "*")
+
+    def test_stream_route_sends_events(self):
+        """Test that a stream handler's events are sent as Server-Sent Events."""
+        closed = []
+
+        async def handler(data):
+            try:
+                yield "roast", {"text": data["username"]}
+                yield "done", {"roast": data["username"]}
+            finally:
+                closed.append(True)
+
+        with patch.dict(asgi.STREAM_ROUTES, {"/roast/stream": ("POST", handler)}):
+            response = post("/roast/stream", json={"username": "test_user"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "text/event-stream")
+        self.assertEqual(response.text, (
+            'event: roast\ndata: {"text": "test_user"}\n\n'
+            'event: done\ndata: {"roast": "test_user"}\n\n'
+        ))
+        self.assertEqual(closed, [True])
+
+    def test_missing_username(self):
+        """Test that the real handler's validation errors are returned."""
+        response = post("/roast", json={})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+    def test_invalid_json(self):
+        """Test that a body that is not a JSON object is rejected."""
+        response = post("/taste", content=b"not json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_path_and_method(self):
+        """Test the 404 and 405 responses."""
+        self.assertEqual(post("/nope", json={}).status_code, 404)
+        self.assertEqual(post("/roast", method="GET").status_code, 405)
+
+    def test_cors_preflight(self):
+        """Test that OPTIONS requests are answered for browsers."""
+        response = post("/movie_details", method="OPTIONS")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("POST", response.headers["access-control-allow-methods"])
+
+    def test_metrics(self):
+        """Test that cache counters are exposed."""
+        response = post("/metrics", method="GET")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("scraper_cache", response.json())
+
+    def test_lifespan_adopts_server_loop(self):
+        """Test that the server's loop becomes the scraping engine until shutdown."""
+        async def serve():
+            messages = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await messages.put({"type": "lifespan.startup"})
+            lifespan = asyncio.ensure_future(
+                asgi.app({"type": "lifespan"}, messages.get, send)
+            )
+            while not sent:
+                await asyncio.sleep(0)
+            attached = http_client.get_engine().loop is asyncio.get_running_loop()
+            await messages.put({"type": "lifespan.shutdown"})
+            await lifespan
+            return attached, sent
+
+        attached, sent = asyncio.run(serve())
+        self.assertTrue(attached)
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+
+if __name__ == "__main__":
+    unittest.main()
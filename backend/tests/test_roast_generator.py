@@ -5,6 +5,7 @@ Unit tests for the LetterboxdRoastAnalyzer module.
 import unittest
 from unittest.mock import patch, MagicMock
 
+from src.helpers.gemini_clients import clear_models
 from src.helpers.roast_generator import (
     LetterboxdRoastAnalyzer,
     RoastGenerationError,
@@ -16,6 +17,7 @@ class TestLetterboxdRoastAnalyzer(unittest.TestCase):
 
     def setUp(self):
         """Create an instance of LetterboxdRoastAnalyzer for testing."""
+        clear_models()
         self.analyzer = LetterboxdRoastAnalyzer()
 
     # Tests for read_user_data
@@ -48,9 +50,8 @@ class TestLetterboxdRoastAnalyzer(unittest.TestCase):
         self.assertIn("No statistics available.", result)
 
     # Tests for generate_roast
-    @patch("src.helpers.roast_generator.genai.GenerativeModel")
-    @patch("src.helpers.roast_generator.genai.configure")
-    def test_generate_roast_too_long(self, _mock_configure, mock_model_class):
+    @patch("src.helpers.gemini_clients.genai.GenerativeModel")
+    def test_generate_roast_too_long(self, mock_model_class):
         """Test generate_roast raises RoastGenerationError if the roast is too long."""
         fake_response = MagicMock()
         fake_response.text = "word " * 711  # 711 words.
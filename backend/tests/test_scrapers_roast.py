@@ -2,10 +2,17 @@
 Test suite for the scrapers_roast module functions.
 """
 
+import asyncio
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
+import httpx
 from bs4 import BeautifulSoup
+from src.helpers import http_client
 from src.helpers.scrapers_roast import (
+    PROFILE_CACHE,
+    USER_CACHE,
     validate_letterboxd_user,
     fetch_html_content,
     parse_review_element,
@@ -22,31 +29,39 @@ class FakeResponse:
     """
     # pylint: disable=too-few-public-methods
 
-    def __init__(self, text, status_code):
-        """Initialize FakeResponse with the given text and status code."""
+    def __init__(self, text, status_code, headers=None):
+        """Initialize FakeResponse with the given text, status code and headers."""
         self.text = text
         self.status_code = status_code
+        self.headers = headers or {}
+        self.content = text.encode("utf-8")
 
 
-class TestScrapersRoast(unittest.TestCase):
-    """Unit tests for the scrapers_roast module functions."""
+class TestValidateLetterboxdUser(unittest.TestCase):
+    """Unit tests for validating Letterboxd user profiles."""
+
+    def setUp(self):
+        """Start every test with empty profile, user and validator caches."""
+        for cache in (PROFILE_CACHE, USER_CACHE, http_client.VALIDATOR_CACHE):
+            if cache is not None:
+                cache.clear()
 
     def test_validate_letterboxd_user_valid(self):
         """Test validate_letterboxd_user returns True for a valid user."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             html = "<html><body><h1>Welcome</h1></body></html>"
             mock_get.return_value = FakeResponse(html, 200)
             self.assertTrue(validate_letterboxd_user("validuser"))
 
     def test_validate_letterboxd_user_invalid_status(self):
         """Test validate_letterboxd_user returns False when status is not 200."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.return_value = FakeResponse("Not Found", 404)
             self.assertFalse(validate_letterboxd_user("invaliduser"))
 
     def test_validate_letterboxd_user_invalid_content(self):
         """Test validate_letterboxd_user returns False for error page content."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             html = (
                 '<html><body class="error message-dark">'
                 "<h1>Letterboxd</h1>"
@@ -56,22 +71,95 @@ class TestScrapersRoast(unittest.TestCase):
             mock_get.return_value = FakeResponse(html, 200)
             self.assertFalse(validate_letterboxd_user("invaliduser"))
 
+    def test_validate_letterboxd_user_cached(self):
+        """Test that a username is only probed once while its result is cached."""
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.return_value = FakeResponse("<html><body>Profile</body></html>", 200)
+            self.assertTrue(validate_letterboxd_user("validuser"))
+            self.assertTrue(validate_letterboxd_user("ValidUser"))
+            self.assertEqual(mock_get.call_count, 1)
+
+    def test_validate_letterboxd_user_unavailable_not_cached(self):
+        """Test that a throttled or failing profile check raises and is not cached."""
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = [
+                FakeResponse("", 503), FakeResponse("", 429), FakeResponse("", 200)
+            ]
+            for _ in range(2):
+                with self.assertRaises(ScraperError):
+                    validate_letterboxd_user("validuser")
+            self.assertTrue(validate_letterboxd_user("validuser"))
+            self.assertEqual(mock_get.call_count, 3)
+
+    def test_validate_letterboxd_user_head_request(self):
+        """Test that a profile is checked with a HEAD request, without its page."""
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.return_value = FakeResponse("", 200)
+            self.assertTrue(validate_letterboxd_user("validuser"))
+            mock_get.return_value = FakeResponse("", 404)
+            self.assertFalse(validate_letterboxd_user("missinguser"))
+        self.assertEqual(mock_get.call_args.kwargs["method"], "HEAD")
+
+    @unittest.skipIf(http_client.VALIDATOR_CACHE is None, "validator cache disabled")
+    def test_validate_letterboxd_user_head_refused(self):
+        """Test that a refused HEAD falls back to a revalidated GET of the page."""
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = [
+                FakeResponse("", 405),
+                FakeResponse("<html><body>Profile</body></html>", 200,
+                             {"Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"}),
+                FakeResponse("", 405),
+                FakeResponse("", 304),
+            ]
+            self.assertTrue(validate_letterboxd_user("validuser"))
+            if PROFILE_CACHE is not None:
+                PROFILE_CACHE.clear()
+            self.assertTrue(validate_letterboxd_user("validuser"))
+        self.assertNotIn("method", mock_get.call_args.kwargs)
+        self.assertEqual(
+            mock_get.call_args.kwargs["headers"]["If-Modified-Since"],
+            "Sat, 17 Oct 2026 10:00:00 GMT",
+        )
+
+    def test_validate_letterboxd_user_concurrent_single_probe(self):
+        """Test that concurrent validations of one username share a single fetch."""
+        async def slow_profile(*_args, **_kwargs):
+            await asyncio.sleep(0.1)
+            return FakeResponse("<html><body>Profile</body></html>", 200)
+
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = slow_profile
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(validate_letterboxd_user, ["validuser"] * 4))
+            self.assertEqual(results, [True] * 4)
+            self.assertEqual(mock_get.call_count, 1)
+
+
+class TestScrapersRoast(unittest.TestCase):
+    """Unit tests for the scrapers_roast module functions."""
+
+    def setUp(self):
+        """Start every test with empty profile, user and validator caches."""
+        for cache in (PROFILE_CACHE, USER_CACHE, http_client.VALIDATOR_CACHE):
+            if cache is not None:
+                cache.clear()
+
     def test_fetch_html_content_success(self):
         """Test fetch_html_content returns HTML for a successful response."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             html = "<html><body>Content</body></html>"
             mock_get.return_value = FakeResponse(html, 200)
             headers = {"User-Agent": "Mozilla/5.0"}
-            result = fetch_html_content("http://example.com", headers)
+            result = http_client.run(fetch_html_content("http://example.com", headers))
             self.assertEqual(result, html)
 
     def test_fetch_html_content_failure(self):
         """Test fetch_html_content raises ScraperError for a non-200 response."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.return_value = FakeResponse("Error", 500)
             headers = {"User-Agent": "Mozilla/5.0"}
             with self.assertRaises(ScraperError):
-                fetch_html_content("http://example.com", headers)
+                http_client.run(fetch_html_content("http://example.com", headers))
 
     def test_parse_review_element(self):
         """Test _parse_review_element extracts review details correctly."""
@@ -119,7 +207,7 @@ class TestScrapersRoast(unittest.TestCase):
                 return FakeResponse(html, 200)
             return FakeResponse("", 404)
 
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.side_effect = side_effect
             reviews = scrape_user_reviews("testuser", n_pages=1)
             self.assertEqual(len(reviews), 1)
@@ -133,9 +221,79 @@ class TestScrapersRoast(unittest.TestCase):
             }
             self.assertEqual(reviews[0], expected)
 
+    def test_scrape_user_reviews_fetches_pages_concurrently(self):
+        """Test that review pages are fetched at once and failed pages skipped."""
+        paginator = "".join(
+            f'<li class="paginate-page"><a>{page}</a></li>' for page in range(1, 6)
+        )
+        review = '<div class="film-detail-content"><div class="js-review-body">Ok</div></div>'
+
+        async def side_effect(url, **_kwargs):
+            await asyncio.sleep(0.05)
+            if url.endswith("/page/3/"):
+                return FakeResponse("Error", 500)
+            if "/films/reviews/" in url:
+                return FakeResponse(f"<ul>{paginator}</ul>{review}", 200)
+            return FakeResponse("<html><body>Profile</body></html>", 200)
+
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = side_effect
+            start = time.perf_counter()
+            reviews = scrape_user_reviews("testuser", n_pages=5)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(reviews), 4)
+        # Profile, first page, then the other four together: about three round trips
+        self.assertLess(elapsed, 0.3)
+
+    def test_scrape_user_reviews_connection_error_drops_page(self):
+        """Test that a page failing with a connection error is skipped and counted."""
+        paginator = "".join(
+            f'<li class="paginate-page"><a>{page}</a></li>' for page in range(1, 4)
+        )
+        review = '<div class="film-detail-content"><div class="js-review-body">Ok</div></div>'
+
+        def side_effect(url, **_kwargs):
+            if url.endswith("/page/2/"):
+                raise httpx.ConnectError("connection refused")
+            if "/films/reviews/" in url:
+                return FakeResponse(f"<ul>{paginator}</ul>{review}", 200)
+            return FakeResponse("<html><body>Profile</body></html>", 200)
+
+        dropped = http_client.RETRY_STATS.as_dict()["pages_dropped"]
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = side_effect
+            reviews = scrape_user_reviews("testuser", n_pages=3)
+
+        self.assertEqual(len(reviews), 2)
+        self.assertEqual(http_client.RETRY_STATS.as_dict()["pages_dropped"], dropped + 1)
+
+    @unittest.skipIf(USER_CACHE is None or PROFILE_CACHE is None, "caches disabled")
+    def test_scrape_user_reviews_warm_cache_does_not_parse(self):
+        """Test that cached review pages are served without fetching or parsing."""
+        review = '<div class="film-detail-content"><div class="js-review-body">Ok</div></div>'
+        paginator = '<li class="paginate-page"><a>1</a></li><li class="paginate-page"><a>2</a></li>'
+
+        def side_effect(url, **_kwargs):
+            if "/films/reviews/" in url:
+                return FakeResponse(f"<ul>{paginator}</ul>{review}", 200)
+            return FakeResponse("<html><body>Profile</body></html>", 200)
+
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = side_effect
+            cold = scrape_user_reviews("testuser", n_pages=2)
+            fetches = mock_get.call_count
+            with patch("src.helpers.scrapers_roast.make_soup",
+                       side_effect=AssertionError("parsed a cached page")):
+                warm = scrape_user_reviews("testuser", n_pages=2)
+
+        self.assertEqual(warm, cold)
+        self.assertEqual(len(warm), 2)
+        self.assertEqual(mock_get.call_count, fetches)
+
     def test_scrape_user_reviews_invalid_user(self):
         """Test scrape_user_reviews raises ValueError for an invalid user."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.return_value = FakeResponse("Not Found", 404)
             with self.assertRaises(ValueError):
                 scrape_user_reviews("nonexistentuser", n_pages=1)
@@ -159,7 +317,7 @@ class TestScrapersRoast(unittest.TestCase):
                 return FakeResponse(html, 200)
             return FakeResponse("", 404)
 
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.side_effect = side_effect
             stats = scrape_user_stats("testuser")
             expected_stats = {
@@ -172,6 +330,20 @@ class TestScrapersRoast(unittest.TestCase):
             }
             self.assertEqual(stats, expected_stats)
 
+    def test_user_reviews_and_stats_share_profile_fetch(self):
+        """Test that scraping reviews and stats for one user fetches the profile once."""
+        fetched = []
+
+        def side_effect(url, **_kwargs):
+            fetched.append(url)
+            return FakeResponse("<html><body></body></html>", 200)
+
+        with patch("src.helpers.http_client.get") as mock_get:
+            mock_get.side_effect = side_effect
+            scrape_user_reviews("testuser", n_pages=1)
+            scrape_user_stats("testuser")
+        self.assertEqual(fetched.count("https://letterboxd.com/testuser/"), 1)
+
     def test_scrape_user_stats_error_page(self):
         """Test scrape_user_stats returns empty dict when stats page has error."""
         def side_effect(url, **_kwargs):
@@ -187,14 +359,14 @@ class TestScrapersRoast(unittest.TestCase):
                 return FakeResponse(html, 200)
             return FakeResponse("", 404)
 
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.side_effect = side_effect
             stats = scrape_user_stats("testuser")
             self.assertEqual(stats, {})
 
     def test_scrape_user_stats_invalid_user(self):
         """Test scrape_user_stats raises ValueError for an invalid user."""
-        with patch("src.helpers.scrapers_roast.requests.get") as mock_get:
+        with patch("src.helpers.http_client.get") as mock_get:
             mock_get.return_value = FakeResponse("Not Found", 404)
             with self.assertRaises(ValueError):
                 scrape_user_stats("nonexistentuser")